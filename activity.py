@@ -0,0 +1,81 @@
+"""Rebuild of the materialised daily_activity table.
+
+The routes keep daily_activity up to date incrementally; this module derives
+it from scratch out of study_item and update_history, for existing databases
+(migration) and the `flask rebuild-activity` command. Compacted history holds
+one row per week or month, so the days it covers cannot be derived again;
+rebuilds pass the last compacted day as `after` and keep the rows up to it.
+"""
+from sqlalchemy import select
+
+
+def _number(value):
+    return value or 0
+
+
+def derive_rows(conn, metadata, after=None):
+    """Compute the daily_activity rows from items and their update history, skipping orphaned history.
+
+    With after, only the rows of later days.
+    """
+    items = metadata.tables['study_item']
+    history = metadata.tables['update_history']
+    rows = {}
+
+    def touch(day, item_id, operation_type, when, hours=0, progress=0, retrospective=False):
+        if after is not None and day <= after:
+            return
+        row = rows.setdefault((day, item_id), {
+            'date': day, 'item_id': item_id, 'operation_type': operation_type,
+            'hours_added': 0.0, 'progress_gained': 0, 'retrospective': False, 'last_activity': when,
+        })
+        if operation_type == 'add':
+            row['operation_type'] = 'add'
+        row['hours_added'] += hours
+        row['progress_gained'] += progress
+        row['retrospective'] = row['retrospective'] or retrospective
+        if when and (row['last_activity'] is None or when > row['last_activity']):
+            row['last_activity'] = when
+
+    first_snapshot = {}
+    statement = (select(
+        history.c.item_id, history.c.date, history.c.delta, history.c.previous_values,
+        history.c.created_at, history.c.updated_at)
+        # History of deleted items must not show up in the calendars
+        .join(items, items.c.id == history.c.item_id)
+        .order_by(history.c.item_id, history.c.date))
+    if after is not None:
+        # An item added later has all its history later, so its oldest snapshot is still read
+        statement = statement.where(history.c.date > after)
+    for record in conn.execute(statement).yield_per(1000):
+        delta = record.delta or {}
+        hours = delta.get('hours_spent', {})
+        progress = delta.get('progress', {})
+        touch(record.date, record.item_id, 'modify', record.updated_at or record.created_at,
+              hours=_number(hours.get('new')) - _number(hours.get('old')),
+              progress=_number(progress.get('new')) - _number(progress.get('old')),
+              retrospective=bool(record.created_at and record.created_at.date() > record.date))
+        first_snapshot.setdefault(record.item_id, record.previous_values or {})
+
+    for item in conn.execute(select(
+            items.c.id, items.c.created_at, items.c.last_modified, items.c.operation_type,
+            items.c.hours_spent, items.c.progress)).yield_per(1000):
+        # The values an item was created with are the oldest history snapshot, if any
+        initial = first_snapshot.get(item.id, {'hours_spent': item.hours_spent, 'progress': item.progress})
+        if item.created_at:
+            touch(item.created_at.date(), item.id, 'add', item.created_at,
+                  hours=_number(initial.get('hours_spent')), progress=_number(initial.get('progress')))
+        if item.last_modified:
+            touch(item.last_modified.date(), item.id, item.operation_type or 'modify', item.last_modified)
+
+    return list(rows.values())
+
+
+def rebuild(conn, metadata, after=None, batch_size=1000):
+    """Replace the daily_activity contents, or those of the days after after, returns the number of rows written."""
+    table = metadata.tables['daily_activity']
+    rows = derive_rows(conn, metadata, after)
+    conn.execute(table.delete() if after is None else table.delete().where(table.c.date > after))
+    for start in range(0, len(rows), batch_size):
+        conn.execute(table.insert(), rows[start:start + batch_size])
+    return len(rows)
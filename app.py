@@ -1,20 +1,37 @@
 import os
+import json
+import base64
+import hashlib
+import hmac
 import calendar
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify
+import importlib
+import threading
+import time
+import uuid
+import click
+from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+from flask import Flask, Blueprint, current_app, render_template, request, redirect, url_for, flash, session, jsonify, abort, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime, timedelta
-import pandas as pd
+from sqlalchemy import event
+from datetime import MAXYEAR, MINYEAR, date, datetime, timedelta
 from werkzeug.utils import secure_filename
 from config import Config
-
-
-app = Flask(__name__)
-app.config.from_object(Config)
-app.config['SQLALCHEMY_DATABASE_URI'] = f'{Config.DATABASE_URL}'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = f'{Config.DATABASE_TRACK_MODIFICATIONS}'
-app.config['UPLOAD_FOLDER'] = 'uploads'
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
-db = SQLAlchemy(app)
+import activity
+import assets
+import backup
+import cache
+import compaction
+import deletion
+import export
+import metrics
+import migrations
+import search
+import series
+
+
+db = SQLAlchemy()
+main = Blueprint('main', __name__, cli_group=None)
 
 class StudyItem(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -28,8 +45,22 @@ class StudyItem(db.Model):
     operation_type = db.Column(db.String(20), default='add')  # 'add', 'modify', 'delete'
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
-    # Relationship to update history with cascade delete
-    update_history = db.relationship('UpdateHistory', backref='study_item', cascade='all, delete-orphan')
+    # History and activity are deleted with the item by the database (ON DELETE CASCADE),
+    # passive_deletes keeps the ORM from loading them first
+    update_history = db.relationship('UpdateHistory', backref='study_item', cascade='all, delete-orphan',
+                                     passive_deletes=True)
+    daily_activity = db.relationship('DailyActivity', cascade='all, delete-orphan', passive_deletes=True)
+
+    # (column, id) indexes back the keyset pagination of every sortable column,
+    # last_modified also serves the calendar range scans
+    __table_args__ = (
+        db.Index('ix_study_item_last_modified', 'last_modified', 'id'),
+        db.Index('ix_study_item_title', 'title', 'id'),
+        db.Index('ix_study_item_hours_spent', 'hours_spent', 'id'),
+        db.Index('ix_study_item_progress', 'progress', 'id'),
+        db.Index('ix_study_item_theory_confidence', 'theory_confidence', 'id'),
+        db.Index('ix_study_item_practical_confidence', 'practical_confidence', 'id'),
+    )
 
     def __repr__(self):
         return f'<StudyItem {self.title}>'
@@ -50,16 +81,37 @@ class StudyItem(db.Model):
 class UpdateHistory(db.Model):
     """Track changes to study items with delta information."""
     id = db.Column(db.Integer, primary_key=True)
-    item_id = db.Column(db.Integer, db.ForeignKey('study_item.id'), nullable=False)
+    item_id = db.Column(db.Integer, db.ForeignKey('study_item.id', ondelete='CASCADE'), nullable=False)
     date = db.Column(db.Date, nullable=False)  # Date of update (one per day per item)
     delta = db.Column(db.JSON)  # Changes: {field: {old: value, new: value}, ...}
     previous_values = db.Column(db.JSON)  # Previous state before this update
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index('uq_update_history_item_date', 'item_id', 'date', unique=True),
+    )
+
     def __repr__(self):
         return f'<UpdateHistory item={self.item_id} date={self.date}>'
 
+class DailyActivity(db.Model):
+    """Materialised per-day activity of each item, the calendar views read from it."""
+    date = db.Column(db.Date, primary_key=True)
+    item_id = db.Column(db.Integer, db.ForeignKey('study_item.id', ondelete='CASCADE'), primary_key=True)
+    operation_type = db.Column(db.String(20), default='modify')  # First operation of the day: 'add', 'modify'
+    hours_added = db.Column(db.Float, default=0.0)
+    progress_gained = db.Column(db.Integer, default=0)
+    retrospective = db.Column(db.Boolean, default=False)  # Update recorded later for this past date
+    last_activity = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_daily_activity_item_id', 'item_id', 'date'),
+    )
+
+    def __repr__(self):
+        return f'<DailyActivity item={self.item_id} date={self.date}>'
+
 class KeyDate(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(200), nullable=False)
@@ -67,6 +119,10 @@ class KeyDate(db.Model):
     notes = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index('ix_key_date_date', 'date'),
+    )
+
     def __repr__(self):
         return f'<KeyDate {self.name} - {self.date}>'
 
@@ -81,26 +137,458 @@ class KeyDate(db.Model):
     def is_today(self):
         return self.days_remaining() == 0
 
-with app.app_context():
-    inspector = db.inspect(db.engine)
-    if not inspector.has_table('study_item'):
-        db.create_all()
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'date': self.date.isoformat(),
+            'notes': self.notes,
+            'days_remaining': self.days_remaining()
+        }
+
+class DataVersion(db.Model):
+    """Single-row counter bumped by every write, cached responses are keyed by it."""
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime)
+
+class HistoryCompaction(db.Model):
+    """Single row: update_history up to this day may hold weekly and monthly rows."""
+    id = db.Column(db.Integer, primary_key=True)
+    compacted_through = db.Column(db.Date, nullable=False)
+
+class ScheduledTask(db.Model):
+    """Last run of a periodic task, claimed by one worker process of any host at a time."""
+    name = db.Column(db.String(50), primary_key=True)
+    last_run = db.Column(db.DateTime, nullable=False)
+
+class ImportJob(db.Model):
+    """Background bulk import job, shared by all worker processes through the DB."""
+    id = db.Column(db.String(32), primary_key=True)
+    filename = db.Column(db.String(255))
+    status = db.Column(db.String(20), default='queued')  # 'queued', 'parsing', 'inserting', 'done', 'failed'
+    rows_total = db.Column(db.Integer)
+    rows_parsed = db.Column(db.Integer, default=0)
+    rows_inserted = db.Column(db.Integer, default=0)
+    errors = db.Column(db.JSON)  # Per-row problems: [{row, field, value, error}, ...]
+    error = db.Column(db.Text)  # Fatal error that failed the job
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    heartbeat_at = db.Column(db.DateTime, default=datetime.utcnow)  # Touched while the worker holding the job lives
+
+    def __repr__(self):
+        return f'<ImportJob {self.id} {self.status}>'
+
+    def eta_seconds(self):
+        if self.status in ('done', 'failed'):
+            return 0
+        if not self.started_at or not self.rows_total or not self.rows_parsed:
+            return None
+        elapsed = (datetime.utcnow() - self.started_at).total_seconds()
+        # Parsing dominates, inserting the parsed rows takes a fraction of it
+        remaining = max(self.rows_total - self.rows_parsed, 0)
+        return round(elapsed / self.rows_parsed * remaining, 1)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'filename': self.filename,
+            'status': self.status,
+            'rows_total': self.rows_total,
+            'rows_parsed': self.rows_parsed,
+            'rows_inserted': self.rows_inserted,
+            'errors': self.errors or [],
+            'error': self.error,
+            'eta_seconds': self.eta_seconds(),
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for pragma in Config.sqlite_pragmas():
+        cursor.execute(pragma)
+    cursor.close()
+
+# Item fields whose changes are recorded in UpdateHistory
+TRACKED_FIELDS = ('hours_spent', 'progress', 'theory_confidence', 'practical_confidence')
+
+def tracked_values(item):
+    return {field: getattr(item, field) for field in TRACKED_FIELDS}
+
+def compute_delta(previous_values, current_values):
+    """Changes between two snapshots: {field: {old: value, new: value}, ...}"""
+    return {
+        field: {'old': previous_values.get(field), 'new': current_values[field]}
+        for field in TRACKED_FIELDS
+        if previous_values.get(field) != current_values[field]
+    }
+
+def upsert(table, rows, keys, updates):
+    """INSERT rows, or UPDATE the row with the same keys when it already exists.
+
+    updates(excluded) returns the {column: expression} to set on conflict, where
+    excluded.<column> is the value that was about to be inserted. Runs in the
+    caller's transaction.
+    """
+    if not rows:
+        return
+    dialect = db.engine.dialect.name
+    # The engine has already loaded its own dialect, the others are not imported at all
+    if dialect in ('sqlite', 'postgresql'):
+        statement = importlib.import_module(f'sqlalchemy.dialects.{dialect}').insert(table)
+        statement = statement.on_conflict_do_update(index_elements=keys, set_=updates(statement.excluded))
+    elif dialect in ('mysql', 'mariadb'):
+        statement = importlib.import_module('sqlalchemy.dialects.mysql').insert(table)
+        statement = statement.on_duplicate_key_update(updates(statement.inserted))
+    else:
+        for row in rows:
+            excluded = SimpleNamespace(**{
+                name: db.literal(value, type_=table.c[name].type) for name, value in row.items()
+            })
+            result = db.session.execute(
+                table.update()
+                .where(*[table.c[key] == row[key] for key in keys])
+                .values(updates(excluded))
+            )
+            if result.rowcount == 0:
+                db.session.execute(table.insert(), [row])
+        return
+    db.session.execute(statement, rows)
+
+def upsert_history(rows):
+    """Write UpdateHistory rows with INSERT ... ON CONFLICT (item_id, date) DO UPDATE.
+
+    An existing row for the same item and day gets the new delta but keeps its
+    original previous_values.
+    """
+    now = datetime.utcnow()
+    upsert(
+        UpdateHistory.__table__,
+        [dict(row, created_at=now, updated_at=now) for row in rows],
+        ['item_id', 'date'],
+        lambda excluded: {'delta': excluded.delta, 'updated_at': excluded.updated_at}
+    )
+
+def record_activity(rows):
+    """Add item activity to the DailyActivity table.
+
+    rows are dicts with date, item_id, operation_type and optionally
+    hours_added, progress_gained and retrospective. Hours and progress add up
+    with an existing row for the same item and day; its operation_type is kept.
+    """
+    now = datetime.utcnow()
+    table = DailyActivity.__table__
+    upsert(
+        table,
+        [dict({'hours_added': 0.0, 'progress_gained': 0, 'retrospective': False}, last_activity=now, **row) for row in rows],
+        ['date', 'item_id'],
+        lambda excluded: {
+            'hours_added': table.c.hours_added + excluded.hours_added,
+            'progress_gained': table.c.progress_gained + excluded.progress_gained,
+            'retrospective': db.or_(table.c.retrospective, excluded.retrospective),
+            'last_activity': excluded.last_activity
+        }
+    )
+
+def delta_change(delta, field):
+    change = delta.get(field)
+    if not change:
+        return 0
+    return (change['new'] or 0) - (change['old'] or 0)
+
+def history_writes(saves, today):
+    """History and activity rows of item saves, the rules the edit form and the batch API share.
+
+    saves are (item, previous_values, update_date, backdated) tuples of items
+    already changed and flushed. Every save marks today's activity. One that
+    changed tracked values adds its change to the activity of update_date and
+    writes that day's history record; a record already there keeps its
+    original previous_values and the delta is measured from them. A
+    backdated save is refused when the item has a newer update. Both
+    lookups run as one statement.
+
+    Returns (history rows, activity rows, {item_id: date of the newer update} of refused saves).
+    """
+    deltas = {item.id: compute_delta(previous_values, tracked_values(item))
+              for item, previous_values, _, _ in saves}
+    changed = [save for save in saves if deltas[save[0].id]]
+    same_day, newest = {}, {}
+    if changed:
+        records = db.union_all(
+            db.select(db.literal('same_day').label('kind'), UpdateHistory.item_id, UpdateHistory.date,
+                      UpdateHistory.previous_values)
+            .where(db.tuple_(UpdateHistory.item_id, UpdateHistory.date).in_(
+                [(item.id, update_date) for item, _, update_date, _ in changed])),
+            db.select(db.literal('newest'), UpdateHistory.item_id, db.func.max(UpdateHistory.date), db.null())
+            .where(UpdateHistory.item_id.in_([item.id for item, _, _, _ in changed]))
+            .group_by(UpdateHistory.item_id)
+        )
+        for record in db.session.execute(records):
+            if record.kind == 'same_day':
+                same_day[record.item_id] = record.previous_values
+            else:
+                newest[record.item_id] = record.date
+
+    history, activity, refused = [], {}, {}
+    for item, previous_values, update_date, backdated in saves:
+        activity.setdefault((today, item.id), {'date': today, 'item_id': item.id, 'operation_type': 'modify'})
+        delta = deltas[item.id]
+        if not delta:
+            continue
+        if backdated and newest.get(item.id) and newest[item.id] > update_date:
+            refused[item.id] = newest[item.id]
+            continue
+        day = activity.setdefault((update_date, item.id),
+                                  {'date': update_date, 'item_id': item.id, 'operation_type': 'modify'})
+        day['hours_added'] = delta_change(delta, 'hours_spent')
+        day['progress_gained'] = delta_change(delta, 'progress')
+        day['retrospective'] = update_date < today
+        if item.id in same_day:
+            delta = compute_delta(same_day[item.id], tracked_values(item))
+        history.append({'item_id': item.id, 'date': update_date, 'delta': delta, 'previous_values': previous_values})
+    return history, list(activity.values()), refused
 
 def login_required(f):
     def wrapper(*args, **kwargs):
         if Config.ENABLE_PASSWORD_PROTECTION and 'logged_in' not in session:
-            return redirect(url_for('login'))
+            return redirect(url_for('main.login'))
         return f(*args, **kwargs)
     wrapper.__name__ = f.__name__
     return wrapper
 
-@app.route('/')
+def data_state():
+    """(version, updated_at) of the data version counter."""
+    return db.session.execute(db.select(DataVersion.version, DataVersion.updated_at)).one_or_none() or (0, None)
+
+def bump_data_version():
+    """Invalidate every cached response, call in the same transaction as the write."""
+    db.session.execute(DataVersion.__table__.update().values(
+        version=DataVersion.version + 1, updated_at=datetime.utcnow()))
+
+def not_modified(etag, last_modified):
+    """Whether the request's validators still match, If-None-Match wins over If-Modified-Since."""
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since:
+        return last_modified <= request.if_modified_since.replace(tzinfo=None)
+    return False
+
+def http_last_modified(moment):
+    """moment rounded up to the whole second an HTTP date can carry."""
+    if moment.microsecond:
+        return moment.replace(microsecond=0) + timedelta(seconds=1)
+    return moment
+
+def cached_response(build, *key_parts):
+    """Serve build()'s response conditionally and from the shared response cache.
+
+    The key covers the endpoint, key_parts, the theme, today's date and the
+    data version; it doubles as the ETag, so a revalidation costs one query
+    and returns 304 without calling build(). Any write changes the version,
+    which makes every cached response and ETag stale. Pages with pending
+    flash messages are always rendered.
+    """
+    if session.get('_flashes'):
+        return build()
+    version, changed_at = data_state()
+    today = datetime.utcnow().date()
+    key = hashlib.sha256(json.dumps([
+        request.endpoint, key_parts, session.get('theme', Config.DEFAULT_THEME), today, version
+    ], default=str).encode()).hexdigest()
+    # Pages show days remaining and today's marker, so they also change at midnight
+    last_modified = http_last_modified(max(changed_at or datetime.min, datetime.combine(today, datetime.min.time())))
+
+    response_cache = current_app.extensions['response_cache']
+    if not_modified(key, last_modified):
+        response = current_app.response_class(status=304)
+    else:
+        hit = response_cache.get(key) if response_cache else None
+        if hit:
+            mimetype, body = hit
+            response = current_app.response_class(body, mimetype=mimetype)
+            response.headers['X-Cache'] = 'HIT'
+        else:
+            response = current_app.make_response(build())
+            if response.status_code != 200:
+                return response
+            if response_cache:
+                response_cache.set(key, version, response.mimetype, response.get_data())
+                response.headers['X-Cache'] = 'MISS'
+    response.set_etag(key, weak=True)
+    # Until that second is over another write can land in it, revalidating by
+    # date could then hide it, so only the ETag is sent
+    if last_modified <= datetime.utcnow():
+        response.last_modified = last_modified
+    # Pages are per user, browsers must revalidate before reusing them
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+def cached_view(f):
+    """Cache a read-only view by its URL arguments and query string."""
+    def wrapper(*args, **kwargs):
+        return cached_response(lambda: f(*args, **kwargs), kwargs, sorted(request.args.items(multi=True)))
+    wrapper.__name__ = f.__name__
+    return wrapper
+
+def sort_columns():
+    return {
+        'title': StudyItem.title,
+        'hours_spent': StudyItem.hours_spent,
+        'progress': StudyItem.progress,
+        'theory_confidence': StudyItem.theory_confidence,
+        'practical_confidence': StudyItem.practical_confidence,
+        'last_modified': StudyItem.last_modified
+    }
+
+def apply_search(query, search_query):
+    # Full-text match on title and notes where the backend supports it, LIKE on the title otherwise
+    if search_query:
+        query = query.filter(search.match_clause(StudyItem, search_query, search.backend(db.engine)))
+    return query
+
+def apply_dashboard_filter(query, search_query, title_filter):
+    """The dashboard's items: a title filter typed in the browser replaces the search, matched the same way."""
+    if not title_filter:
+        return apply_search(query, search_query)
+    for term in title_filter.lower().split():
+        query = query.filter(db.func.lower(StudyItem.title).contains(term, autoescape=True))
+    return query
+
+def encode_cursor(item, sort_by):
+    value = getattr(item, sort_by)
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    payload = json.dumps([value, item.id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def decode_cursor(token, sort_by):
+    """Return the (sort value, id) pair of a page cursor, None if it is invalid."""
+    if not token:
+        return None
+    try:
+        value, item_id = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        if sort_by == 'last_modified' and value is not None:
+            value = datetime.fromisoformat(value)
+        return value, int(item_id)
+    except (ValueError, TypeError):
+        return None
+
+def seek_ranges(column, key, ascending, nulls_first):
+    """Filters of the rows past key in (column, id) order, in the order they come.
+
+    The rows with a NULL sort value form one run, before the others when
+    nulls_first, and each range stays within a run: an OR across both would
+    make the database scan the index instead of seeking into it.
+    """
+    value, item_id = key
+    id_past = StudyItem.id > item_id if ascending else StudyItem.id < item_id
+    if value is None:
+        return [db.and_(column.is_(None), id_past)] + ([column.isnot(None)] if nulls_first else [])
+    column_past = column > value if ascending else column < value
+    return [db.or_(column_past, db.and_(column == value, id_past))] + ([] if nulls_first else [column.is_(None)])
+
+def paginate_items(query, sort_by, sort_order, after=None, before=None):
+    """Keyset (seek) pagination ordered by the sort column with id as tiebreak.
+
+    after/before are cursors of the last/first row of the neighbouring page.
+    Returns (items, next_cursor, prev_cursor).
+    """
+    column = sort_columns()[sort_by]
+    page_size = Config.ITEMS_PER_PAGE
+    after_key = decode_cursor(after, sort_by)
+    before_key = decode_cursor(before, sort_by) if after_key is None else None
+    descending = sort_order != 'asc'
+    # Walking backwards flips the direction, the page is reversed afterwards
+    backwards = before_key is not None
+    ascending = descending == backwards
+    if ascending:
+        ordering = (column.asc(), StudyItem.id.asc())
+    else:
+        ordering = (column.desc(), StudyItem.id.desc())
+
+    key = before_key if backwards else after_key
+    if key is None:
+        items = query.order_by(*ordering).limit(page_size + 1).all()
+    else:
+        # NULLs sort lowest, except on PostgreSQL; a page crossing into the
+        # other run costs a second query
+        nulls_first = ascending == (db.engine.dialect.name != 'postgresql')
+        items = []
+        for seek in seek_ranges(column, key, ascending, nulls_first):
+            items += query.filter(seek).order_by(*ordering).limit(page_size + 1 - len(items)).all()
+            if len(items) > page_size:
+                break
+    has_more = len(items) > page_size
+    items = items[:page_size]
+    if backwards:
+        items.reverse()
+        has_next, has_prev = True, has_more
+    else:
+        has_next, has_prev = has_more, key is not None
+
+    next_cursor = encode_cursor(items[-1], sort_by) if items and has_next else None
+    prev_cursor = encode_cursor(items[0], sort_by) if items and has_prev else None
+    return items, next_cursor, prev_cursor
+
+EXPORT_DATASETS = ('items', 'history', 'key_dates')
+EXPORT_ITEM_FIELDS = ('id', 'title', 'notes', 'hours_spent', 'progress', 'theory_confidence',
+                      'practical_confidence', 'created_at', 'last_modified')
+EXPORT_HISTORY_FIELDS = ('id', 'item_id', 'date', 'previous_values', 'delta', 'created_at', 'updated_at')
+EXPORT_KEY_DATE_FIELDS = ('id', 'name', 'date', 'notes', 'created_at')
+EXPORT_BATCH = 1000  # Rows fetched per round trip, server-side cursors where the driver has them
+
+def export_rows(dataset, sort_by='last_modified', sort_order='desc', search_query='', title_filter=''):
+    """(columns, rows) of an export, rows is a result streamed in EXPORT_BATCH batches.
+
+    Items are filtered and sorted like the dashboard. History is filtered by
+    the same search or title filter and ordered by item and date, the order
+    of its unique index, so the database never sorts it.
+    """
+    if dataset == 'items':
+        column = sort_columns().get(sort_by, StudyItem.last_modified)
+        ordering = (column.asc(), StudyItem.id.asc()) if sort_order == 'asc' else (column.desc(), StudyItem.id.desc())
+        columns = EXPORT_ITEM_FIELDS
+        statement = apply_dashboard_filter(db.select(*(getattr(StudyItem, field) for field in columns)),
+                                           search_query, title_filter).order_by(*ordering)
+    elif dataset == 'history':
+        columns = EXPORT_HISTORY_FIELDS
+        statement = db.select(*(getattr(UpdateHistory, field) for field in columns)).order_by(UpdateHistory.item_id, UpdateHistory.date)
+        if search_query or title_filter:
+            statement = statement.where(UpdateHistory.item_id.in_(
+                apply_dashboard_filter(db.select(StudyItem.id), search_query, title_filter)))
+    else:
+        columns = EXPORT_KEY_DATE_FIELDS
+        statement = db.select(*(getattr(KeyDate, field) for field in columns)).order_by(KeyDate.date, KeyDate.id)
+    return columns, db.session.execute(statement.execution_options(yield_per=EXPORT_BATCH))
+
+@main.route('/export/<any(items, history, key_dates):dataset>.<any(csv, ndjson, xlsx):fmt>')
+@login_required
+def export_data(dataset, fmt):
+    """Download a dataset, streamed while it is read; sort/order/search/filter as on the dashboard."""
+    columns, rows = export_rows(dataset,
+                                request.args.get('sort') or session.get('sort', 'last_modified'),
+                                request.args.get('order') or session.get('order', 'desc'),
+                                (request.args.get('search') if request.args.get('search') is not None
+                                 else session.get('search', '')).strip(),
+                                (request.args.get('filter') if request.args.get('filter') is not None
+                                 else session.get('title_filter', '')).strip())
+    response = current_app.response_class(stream_with_context(export.write(fmt, columns, rows, dataset)),
+                                          mimetype=export.FORMATS[fmt])
+    response.headers['Content-Disposition'] = f'attachment; filename="{dataset}-{datetime.utcnow():%Y%m%d}.{fmt}"'
+    return response
+
+@main.route('/')
 @login_required
 def index():
     # Determine sorting/search parameters: prefer query args, else session, else defaults
     arg_sort = request.args.get('sort')
     arg_order = request.args.get('order')
     arg_search = request.args.get('search')
+    arg_filter = request.args.get('filter')
 
     if arg_sort:
         sort_by = arg_sort
@@ -117,43 +605,37 @@ def index():
     else:
         search_query = session.get('search', '').strip()
 
-    valid_sorts = ['title', 'hours_spent', 'progress', 'theory_confidence', 'practical_confidence', 'last_modified']
-    if sort_by not in valid_sorts:
-        sort_by = 'last_modified'
-    query = StudyItem.query
-    if search_query:
-        query = query.filter(StudyItem.title.ilike(f'%{search_query}%'))
-    if sort_order == 'asc':
-        if sort_by == 'title':
-            query = query.order_by(StudyItem.title.asc())
-        elif sort_by == 'hours_spent':
-            query = query.order_by(StudyItem.hours_spent.asc())
-        elif sort_by == 'progress':
-            query = query.order_by(StudyItem.progress.asc())
-        elif sort_by == 'theory_confidence':
-            query = query.order_by(StudyItem.theory_confidence.asc())
-        elif sort_by == 'practical_confidence':
-            query = query.order_by(StudyItem.practical_confidence.asc())
-        elif sort_by == 'last_modified':
-            query = query.order_by(StudyItem.last_modified.asc())
+    # The title filter typed in the browser, kept apart from the full-text search
+    if arg_filter is not None:
+        title_filter = arg_filter.strip()
+        session['title_filter'] = title_filter
     else:
-        if sort_by == 'title':
-            query = query.order_by(StudyItem.title.desc())
-        elif sort_by == 'hours_spent':
-            query = query.order_by(StudyItem.hours_spent.desc())
-        elif sort_by == 'progress':
-            query = query.order_by(StudyItem.progress.desc())
-        elif sort_by == 'theory_confidence':
-            query = query.order_by(StudyItem.theory_confidence.desc())
-        elif sort_by == 'practical_confidence':
-            query = query.order_by(StudyItem.practical_confidence.desc())
-        elif sort_by == 'last_modified':
-            query = query.order_by(StudyItem.last_modified.desc())
-
-    items = query.all()
-    total_items = len(items)
-    total_hours = sum(item.hours_spent for item in items)
-    avg_progress = sum(item.progress for item in items) / total_items if total_items > 0 else 0
+        title_filter = session.get('title_filter', '').strip()
+
+    if sort_by not in sort_columns():
+        sort_by = 'last_modified'
+    after = request.args.get('after')
+    before = request.args.get('before')
+    return cached_response(lambda: render_index(sort_by, sort_order, search_query, title_filter, after, before),
+                           sort_by, sort_order, search_query, title_filter, after, before)
+
+def render_index(sort_by, sort_order, search_query, title_filter, after, before):
+    query = apply_dashboard_filter(StudyItem.query, search_query, title_filter)
+    items, next_cursor, prev_cursor = paginate_items(query, sort_by, sort_order, after=after, before=before)
+
+    # Summary over the whole filtered set, not just the current page
+    total_items, total_hours, avg_progress = apply_dashboard_filter(db.session.query(
+        db.func.count(StudyItem.id),
+        db.func.coalesce(db.func.sum(StudyItem.hours_spent), 0),
+        db.func.coalesce(db.func.avg(StudyItem.progress), 0)
+    ), search_query, title_filter).one()
+
+    # Highlighted matches for the rows on this page
+    search_matches = {}
+    if search_query and not title_filter and items:
+        search_matches = {match['id']: match for match in search.ranked(
+            db.session, StudyItem, search_query, search.backend(db.engine),
+            ids=[item.id for item in items], limit=len(items))}
     today = datetime.utcnow().date()
     upcoming_dates = KeyDate.query.filter(
         KeyDate.date >= today
@@ -161,6 +643,8 @@ def index():
 
     return render_template('index.html',
                          items=items,
+                         next_cursor=next_cursor,
+                         prev_cursor=prev_cursor,
                          sort_by=sort_by,
                          sort_order=sort_order,
                          total_items=total_items,
@@ -168,30 +652,162 @@ def index():
                          avg_progress=round(avg_progress, 1),
                          password_enabled=Config.ENABLE_PASSWORD_PROTECTION,
                          search_query=search_query,
+                         title_filter=title_filter,
+                         search_matches=search_matches,
                          upcoming_key_dates=upcoming_dates)
 
-@app.route('/login', methods=['GET', 'POST'])
+# Columns of /api/items, what the dashboard table shows
+DATASET_FIELDS = ('id', 'title', 'hours_spent', 'progress', 'theory_confidence', 'practical_confidence',
+                  'last_modified')
+
+@main.route('/api/items')
+@login_required
+@cached_view
+def items_dataset():
+    """Every item matching ?search= as columns, the dashboard sorts and filters them in the browser.
+
+    Cached and revalidated by the data version like the dashboard, so a
+    browser refetches it only after a write.
+    """
+    search_query = request.args.get('search', '').strip()
+    rows = db.session.execute(apply_search(
+        db.select(*(getattr(StudyItem, field) for field in DATASET_FIELDS)), search_query
+    ).order_by(StudyItem.id)).all()
+    columns = {field: [getattr(row, field) for row in rows] for field in DATASET_FIELDS}
+    columns['last_modified'] = [value.isoformat() if value else None for value in columns['last_modified']]
+    return jsonify(dict(columns, search=search_query))
+
+@main.route('/dashboard_state', methods=['POST'])
+@login_required
+def dashboard_state():
+    """Remember the sort, search and title filter chosen in the browser for the next dashboard load."""
+    data = request.get_json(silent=True) or {}
+    if data.get('sort') in sort_columns():
+        session['sort'] = data['sort']
+        session['order'] = 'asc' if data.get('order') == 'asc' else 'desc'
+    if isinstance(data.get('search'), str):
+        session['search'] = data['search'].strip()
+    if isinstance(data.get('filter'), str):
+        session['title_filter'] = data['filter'].strip()
+    return '', 204
+
+@main.route('/search')
+@login_required
+@cached_view
+def search_items():
+    """Ranked full-text search with highlighted snippets, as JSON."""
+    search_query = request.args.get('q', '').strip()
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+    matches = search.ranked(db.session, StudyItem, search_query, search.backend(db.engine), limit=limit)
+    return jsonify({
+        'query': search_query,
+        'backend': search.backend(db.engine),
+        'results': [{
+            'id': match['id'],
+            'title': str(match['title']),
+            'snippet': str(match['snippet']),
+            'url': url_for('main.edit_item', item_id=match['id'])
+        } for match in matches]
+    })
+
+health_results = {}
+health_lock = threading.Lock()
+readiness_executor = None
+
+def cached_health(name, check):
+    """check()'s (ok, detail), reused by this worker for HEALTH_CACHE_SECONDS."""
+    with health_lock:
+        expires, result = health_results.get(name, (0, None))
+        if time.monotonic() < expires:
+            return result
+    result = check()
+    with health_lock:
+        health_results[name] = (time.monotonic() + Config.HEALTH_CACHE_SECONDS, result)
+    return result
+
+def check_database(engine):
+    with engine.connect() as conn:
+        conn.execute(db.text('SELECT 1'))
+        version = migrations.applied_version(conn)
+    if version < migrations.LATEST_VERSION:
+        return False, f'schema version {version}, expected {migrations.LATEST_VERSION}'
+    return True, f'schema version {version}'
+
+def check_readiness(engine):
+    # The query runs on its own thread so a hung database or an exhausted pool
+    # only costs READYZ_TIMEOUT; while it hangs, later checks queue behind it and fail too
+    global readiness_executor
+    if readiness_executor is None:
+        readiness_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='readyz')
+    try:
+        return readiness_executor.submit(check_database, engine).result(timeout=Config.READYZ_TIMEOUT)
+    except FuturesTimeoutError:
+        return False, f'database did not answer within {Config.READYZ_TIMEOUT:g} s'
+    except Exception as e:
+        return False, f'database error: {e}'
+
+# Neither check is login protected nor reads or writes the session
+
+@main.route('/healthz')
+def healthz():
+    """Liveness for the container healthcheck, the database is not touched."""
+    return current_app.response_class('ok\n', mimetype='text/plain')
+
+@main.route('/readyz')
+def readyz():
+    """Readiness: the database answers and its schema is fully migrated."""
+    engine = db.engine
+    ok, detail = cached_health('readyz', lambda: check_readiness(engine))
+    return jsonify({'status': 'ready' if ok else 'unavailable', 'detail': detail}), 200 if ok else 503
+
+def assets_dir():
+    return Config.ASSETS_DIR or os.path.join(current_app.static_folder, 'build')
+
+@main.route('/assets/<path:filename>')
+def asset(filename):
+    """Files written by build-assets, their names change with their content so browsers keep them a year."""
+    return assets.send(assets_dir(), filename)
+
+@main.route('/metrics')
+def prometheus_metrics():
+    """Prometheus text exposition, totals of all worker processes."""
+    metrics_store = current_app.extensions['metrics_store']
+    response_cache = current_app.extensions['response_cache']
+    if metrics_store is None:
+        abort(404)
+    extra = []
+    if response_cache:
+        stats = response_cache.stats()
+        extra = [
+            ('response_cache_hits_total', 'counter', 'Response cache hits.', stats['hits']),
+            ('response_cache_misses_total', 'counter', 'Response cache misses.', stats['misses']),
+            ('response_cache_entries', 'gauge', 'Responses held in the cache.', stats['entries']),
+            ('response_cache_bytes', 'gauge', 'Size of the cached responses.', stats['bytes']),
+        ]
+    return current_app.response_class(metrics_store.render(extra), mimetype='text/plain; version=0.0.4')
+
+@main.route('/login', methods=['GET', 'POST'])
 def login():
     if not Config.ENABLE_PASSWORD_PROTECTION:
         session['logged_in'] = True
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index'))
 
     if request.method == 'POST':
         password = request.form.get('password')
         if password == Config.PASSWORD:
             session['logged_in'] = True
-            return redirect(url_for('index'))
+            return redirect(url_for('main.index'))
         else:
             flash('Invalid password', 'error')
 
     return render_template('login.html')
 
-@app.route('/logout')
+@main.route('/logout')
 def logout():
     session.pop('logged_in', None)
-    return redirect(url_for('login'))
+    return redirect(url_for('main.login'))
 
-@app.route('/add', methods=['GET', 'POST'])
+@main.route('/add', methods=['GET', 'POST'])
 @login_required
 def add_item():
     if request.method == 'POST':
@@ -204,7 +820,7 @@ def add_item():
 
         if not title:
             flash('Title is required', 'error')
-            return redirect(url_for('add_item'))
+            return redirect(url_for('main.add_item'))
 
         new_item = StudyItem(
             title=title,
@@ -217,17 +833,28 @@ def add_item():
         )
 
         db.session.add(new_item)
+        db.session.flush()
+        record_activity([{
+            'date': datetime.utcnow().date(),
+            'item_id': new_item.id,
+            'operation_type': 'add',
+            'hours_added': new_item.hours_spent,
+            'progress_gained': new_item.progress
+        }])
+        bump_data_version()
         db.session.commit()
 
         flash('Item added successfully', 'success')
-        return redirect(url_for('index', sort=session.get('sort', 'last_modified'), order=session.get('order', 'desc'), search=session.get('search', '')))
+        return redirect(url_for('main.index', sort=session.get('sort', 'last_modified'), order=session.get('order', 'desc'), search=session.get('search', '')))
 
     return render_template('add_edit.html', item=None, action='Add')
 
-@app.route('/edit/<int:item_id>', methods=['GET', 'POST'])
+@main.route('/edit/<int:item_id>', methods=['GET', 'POST'])
 @login_required
 def edit_item(item_id):
-    item = StudyItem.query.get_or_404(item_id)
+    # Saves lock the item row (PostgreSQL/MySQL) so concurrent saves see each other's history
+    query = StudyItem.query.with_for_update() if request.method == 'POST' else StudyItem.query
+    item = query.get_or_404(item_id)
     sort_by = request.args.get('sort') or session.get('sort', 'last_modified')
     sort_order = request.args.get('order') or session.get('order', 'desc')
     search_query = request.args.get('search')
@@ -235,104 +862,59 @@ def edit_item(item_id):
         search_query = session.get('search', '')
 
     if request.method == 'POST':
+        if not request.form.get('title'):
+            flash('Title is required', 'error')
+            return redirect(url_for('main.edit_item', item_id=item_id, sort=sort_by, order=sort_order, search=search_query))
+
+        # Check for optional update_date for retrospective data
+        today = datetime.utcnow().date()
+        update_date = today
+        update_date_str = request.form.get('update_date')
+        if update_date_str:
+            try:
+                update_date = datetime.strptime(update_date_str, '%Y-%m-%d').date()
+            except ValueError:
+                flash('Invalid date format', 'error')
+                return redirect(url_for('main.edit_item', item_id=item_id, sort=sort_by, order=sort_order, search=search_query))
+            # Validate: cannot be in the future
+            if update_date > today:
+                flash('Update date cannot be in the future', 'error')
+                return redirect(url_for('main.edit_item', item_id=item_id, sort=sort_by, order=sort_order, search=search_query))
+
         # Store previous values before updating
-        previous_values = {
-            'hours_spent': item.hours_spent,
-            'progress': item.progress,
-            'theory_confidence': item.theory_confidence,
-            'practical_confidence': item.practical_confidence
-        }
+        previous_values = tracked_values(item)
 
         item.title = request.form.get('title')
         item.notes = request.form.get('notes')
         item.hours_spent = float(request.form.get('hours_spent', 0))
         item.progress = int(request.form.get('progress', 0))
-        item.theory_confidence = int(request.form.get('theory_confidence', 0))
-        item.practical_confidence = int(request.form.get('practical_confidence', 0))
+        item.theory_confidence = min(max(int(request.form.get('theory_confidence', 0)), 0), 5)
+        item.practical_confidence = min(max(int(request.form.get('practical_confidence', 0)), 0), 5)
         item.last_modified = datetime.utcnow()
-
-        if not item.title:
-            flash('Title is required', 'error')
-            return redirect(url_for('edit_item', item_id=item_id, sort=sort_by, order=sort_order, search=search_query))
-
-        item.theory_confidence = min(max(item.theory_confidence, 0), 5)
-        item.practical_confidence = min(max(item.practical_confidence, 0), 5)
         item.operation_type = 'modify'
 
-        # Calculate delta for tracked fields
-        delta = {}
-        if previous_values['hours_spent'] != item.hours_spent:
-            delta['hours_spent'] = {'old': previous_values['hours_spent'], 'new': item.hours_spent}
-        if previous_values['progress'] != item.progress:
-            delta['progress'] = {'old': previous_values['progress'], 'new': item.progress}
-        if previous_values['theory_confidence'] != item.theory_confidence:
-            delta['theory_confidence'] = {'old': previous_values['theory_confidence'], 'new': item.theory_confidence}
-        if previous_values['practical_confidence'] != item.practical_confidence:
-            delta['practical_confidence'] = {'old': previous_values['practical_confidence'], 'new': item.practical_confidence}
-
+        # The item, its history row and the day's activity are written in one transaction;
+        # flushing the item first takes the SQLite write lock before the history is read
+        db.session.flush()
+        history, activity_rows, refused = history_writes(
+            [(item, previous_values, update_date, bool(update_date_str))], today)
+        if refused:
+            db.session.rollback()
+            flash(f'Cannot add update for {update_date}. A newer update exists on {refused[item_id]}.', 'error')
+            return redirect(url_for('main.edit_item', item_id=item_id, sort=sort_by, order=sort_order, search=search_query))
+        if history:
+            upsert_history(history)
+        record_activity(activity_rows)
+        bump_data_version()
         db.session.commit()
 
-        # Record update history if there are changes
-        if delta:
-            today = datetime.utcnow().date()
-            
-            # Check for optional update_date for retrospective data
-            update_date_str = request.form.get('update_date')
-            if update_date_str:
-                try:
-                    update_date = datetime.strptime(update_date_str, '%Y-%m-%d').date()
-                    # Validate: cannot be in the future
-                    if update_date > today:
-                        flash('Update date cannot be in the future', 'error')
-                        return redirect(url_for('edit_item', item_id=item_id, sort=sort_by, order=sort_order, search=search_query))
-                    # Validate: must not have a newer update for this item
-                    newer_update = UpdateHistory.query.filter(
-                        UpdateHistory.item_id == item.id,
-                        UpdateHistory.date > update_date
-                    ).first()
-                    if newer_update:
-                        flash(f'Cannot add update for {update_date}. A newer update exists on {newer_update.date}.', 'error')
-                        return redirect(url_for('edit_item', item_id=item_id, sort=sort_by, order=sort_order, search=search_query))
-                except ValueError:
-                    flash('Invalid date format', 'error')
-                    return redirect(url_for('edit_item', item_id=item_id, sort=sort_by, order=sort_order, search=search_query))
-            else:
-                update_date = today
-            
-            # Check for existing update record for this date for this specific item
-            update_record = UpdateHistory.query.filter_by(item_id=item.id, date=update_date).first()
-            if update_record:
-                # Update existing record: preserve original previous_values, recalculate delta from original
-                original_previous = update_record.previous_values
-                new_delta = {}
-                if original_previous['hours_spent'] != item.hours_spent:
-                    new_delta['hours_spent'] = {'old': original_previous['hours_spent'], 'new': item.hours_spent}
-                if original_previous['progress'] != item.progress:
-                    new_delta['progress'] = {'old': original_previous['progress'], 'new': item.progress}
-                if original_previous['theory_confidence'] != item.theory_confidence:
-                    new_delta['theory_confidence'] = {'old': original_previous['theory_confidence'], 'new': item.theory_confidence}
-                if original_previous['practical_confidence'] != item.practical_confidence:
-                    new_delta['practical_confidence'] = {'old': original_previous['practical_confidence'], 'new': item.practical_confidence}
-                update_record.delta = new_delta
-                update_record.updated_at = datetime.utcnow()
-            else:
-                # Create new record for this item on this date
-                update_record = UpdateHistory(
-                    item_id=item.id,
-                    date=update_date,
-                    delta=delta,
-                    previous_values=previous_values
-                )
-                db.session.add(update_record)
-            db.session.commit()
-
         flash('Item updated successfully', 'success')
-        return redirect(url_for('index', sort=sort_by, order=sort_order, search=search_query))
+        return redirect(url_for('main.index', sort=sort_by, order=sort_order, search=search_query))
 
     today = datetime.utcnow().date()
     return render_template('add_edit.html', item=item, action='Edit', today=today)
 
-@app.route('/delete/<int:item_id>', methods=['POST'])
+@main.route('/delete/<int:item_id>', methods=['POST'])
 @login_required
 def delete_item(item_id):
     item = StudyItem.query.get_or_404(item_id)
@@ -343,12 +925,19 @@ def delete_item(item_id):
         search_query = session.get('search', '')
     
     db.session.delete(item)
+    bump_data_version()
     db.session.commit()
 
     flash('Item deleted successfully', 'success')
-    return redirect(url_for('index', sort=sort_by, order=sort_order, search=search_query))
+    return redirect(url_for('main.index', sort=sort_by, order=sort_order, search=search_query))
 
-@app.route('/bulk_delete', methods=['POST'])
+def delete_in_batches(item_ids):
+    """Delete items and, by cascade, their history and activity, a batch per transaction."""
+    db.session.commit()  # The batches commit on their own connections, end the session's transaction first
+    return deletion.delete_items(db.engine, db.metadata, item_ids,
+                                 batch_items=Config.DELETE_BATCH_ITEMS, pause=Config.DELETE_PAUSE_MS / 1000)
+
+@main.route('/bulk_delete', methods=['POST'])
 @login_required
 def bulk_delete():
     action = request.form.get('action')
@@ -359,24 +948,19 @@ def bulk_delete():
     sort_order = request.form.get('order') or session.get('order', 'desc')
 
     if action == 'all':
-        query = StudyItem.query
-        if search_query:
-            query = query.filter(StudyItem.title.ilike(f'%{search_query}%'))
-        deleted_count = query.delete()
-        db.session.commit()
+        deleted_count = delete_in_batches(db.session.scalars(apply_search(db.select(StudyItem.id), search_query)).all())
         flash(f'All {deleted_count} items deleted successfully', 'success')
 
     elif action == 'selected':
-        item_ids = request.form.getlist('item_ids')
+        item_ids = request.form.getlist('item_ids', type=int)
         if item_ids:
-            deleted_count = StudyItem.query.filter(StudyItem.id.in_(item_ids)).delete()
-            db.session.commit()
+            deleted_count = delete_in_batches(item_ids)
             flash(f'{deleted_count} selected items deleted successfully', 'success')
         else:
             flash('No items selected', 'error')
-    return redirect(url_for('delete_items', search=search_query, sort=sort_by, order=sort_order))
+    return redirect(url_for('main.delete_items', search=search_query, sort=sort_by, order=sort_order))
 
-@app.route('/delete')
+@main.route('/delete')
 @login_required
 def delete_items():
     sort_by = request.args.get('sort') or session.get('sort', 'last_modified')
@@ -385,48 +969,22 @@ def delete_items():
     if search_query is None:
         search_query = session.get('search', '')
     search_query = search_query.strip()
-    valid_sorts = ['title', 'hours_spent', 'progress', 'theory_confidence', 'practical_confidence', 'last_modified']
-    if sort_by not in valid_sorts:
+    if sort_by not in sort_columns():
         sort_by = 'last_modified'
-    query = StudyItem.query
-    if search_query:
-        query = query.filter(StudyItem.title.ilike(f'%{search_query}%'))
-    if sort_order == 'asc':
-        if sort_by == 'title':
-            query = query.order_by(StudyItem.title.asc())
-        elif sort_by == 'hours_spent':
-            query = query.order_by(StudyItem.hours_spent.asc())
-        elif sort_by == 'progress':
-            query = query.order_by(StudyItem.progress.asc())
-        elif sort_by == 'theory_confidence':
-            query = query.order_by(StudyItem.theory_confidence.asc())
-        elif sort_by == 'practical_confidence':
-            query = query.order_by(StudyItem.practical_confidence.asc())
-        elif sort_by == 'last_modified':
-            query = query.order_by(StudyItem.last_modified.asc())
-    else:
-        if sort_by == 'title':
-            query = query.order_by(StudyItem.title.desc())
-        elif sort_by == 'hours_spent':
-            query = query.order_by(StudyItem.hours_spent.desc())
-        elif sort_by == 'progress':
-            query = query.order_by(StudyItem.progress.desc())
-        elif sort_by == 'theory_confidence':
-            query = query.order_by(StudyItem.theory_confidence.desc())
-        elif sort_by == 'practical_confidence':
-            query = query.order_by(StudyItem.practical_confidence.desc())
-        elif sort_by == 'last_modified':
-            query = query.order_by(StudyItem.last_modified.desc())
-
-    items = query.all()
+    query = apply_search(StudyItem.query, search_query)
+    items, next_cursor, prev_cursor = paginate_items(query, sort_by, sort_order,
+                                                     after=request.args.get('after'),
+                                                     before=request.args.get('before'))
 
     return render_template('delete.html',
                          items=items,
+                         next_cursor=next_cursor,
+                         prev_cursor=prev_cursor,
                          sort_by=sort_by,
                          sort_order=sort_order,
                          search_query=search_query)
 
-@app.route('/toggle_theme', methods=['POST'])
+@main.route('/toggle_theme', methods=['POST'])
 @login_required
 def toggle_theme():
     current_theme = session.get('theme', Config.DEFAULT_THEME)
@@ -435,7 +993,139 @@ def toggle_theme():
     session.modified = True  
     return jsonify({'theme': new_theme})
 
-@app.route('/bulk_import', methods=['GET', 'POST'])
+import_executor = None
+
+def get_import_executor():
+    # Created lazily so each gunicorn worker gets its own threads after the fork
+    global import_executor
+    if import_executor is None:
+        import_executor = ThreadPoolExecutor(max_workers=Config.IMPORT_WORKERS, thread_name_prefix='import')
+    return import_executor
+
+import_jobs = set()  # Ids of the jobs queued or running in this process
+import_heartbeat_lock = threading.Lock()
+import_heartbeat_pid = None
+
+def submit_import_job(app, job_id, *args):
+    """Queue run_import_job, the job's heartbeat is kept fresh until it finishes."""
+    global import_heartbeat_pid
+    import_jobs.add(job_id)
+    with import_heartbeat_lock:
+        if import_heartbeat_pid != os.getpid():
+            import_heartbeat_pid = os.getpid()
+            threading.Thread(target=import_heartbeat_loop, args=(app,), name='import-heartbeat', daemon=True).start()
+    future = get_import_executor().submit(run_import_job, app, job_id, *args)
+    future.add_done_callback(lambda _: import_jobs.discard(job_id))
+
+def import_heartbeat_loop(app):
+    while True:
+        time.sleep(Config.IMPORT_STALE_SECONDS / 4)
+        job_ids = list(import_jobs)
+        if not job_ids:
+            continue
+        with app.app_context():
+            try:
+                # Waits for the write lock while a job inserts its items, the interval leaves room for that
+                with db.engine.begin() as conn:
+                    conn.execute(ImportJob.__table__.update().where(ImportJob.id.in_(job_ids)).values(
+                        heartbeat_at=datetime.utcnow()))
+            except Exception:
+                app.logger.exception('Import heartbeat failed')
+
+def upload_path(job_id, filename):
+    return os.path.join(current_app.config['UPLOAD_FOLDER'], f'{job_id}_{filename}')
+
+def import_job_stale(job):
+    """Whether an unfinished job's worker stopped heartbeating, as when gunicorn kills it."""
+    cutoff = datetime.utcnow() - timedelta(seconds=Config.IMPORT_STALE_SECONDS)
+    return job.status not in ('done', 'failed') and (job.heartbeat_at or job.created_at) < cutoff
+
+def fail_import_job(job):
+    """Mark a stale job failed and delete its upload; the caller commits."""
+    job.status = 'failed'
+    job.error = 'The worker running the import stopped, please upload the file again'
+    job.rows_inserted = 0
+    job.finished_at = datetime.utcnow()
+    filepath = upload_path(job.id, job.filename)
+    if os.path.exists(filepath):
+        os.remove(filepath)
+
+def fail_stale_import_jobs():
+    """Fail every stale job, returns how many."""
+    cutoff = datetime.utcnow() - timedelta(seconds=Config.IMPORT_STALE_SECONDS)
+    jobs = ImportJob.query.filter(ImportJob.status.in_(('queued', 'parsing', 'inserting')),
+                                  db.func.coalesce(ImportJob.heartbeat_at, ImportJob.created_at) < cutoff).all()
+    for job in jobs:
+        fail_import_job(job)
+    if jobs:
+        db.session.commit()
+    return len(jobs)
+
+def run_import_job(app, job_id, filepath, sheet_name, data_start_row, mapping):
+    """Parse an uploaded workbook and insert its items in a single transaction."""
+    import excel_import  # pandas and numpy are only loaded by the workers that import
+    with app.app_context():
+        try:
+            job = db.session.get(ImportJob, job_id)
+            job.status = 'parsing'
+            job.started_at = datetime.utcnow()
+            row_count, rows = excel_import.open_sheet(filepath, sheet_name, data_start_row)
+            job.rows_total = row_count
+            db.session.commit()
+
+            # Progress is committed per chunk while parsing, the items themselves are
+            # only written once the whole sheet parsed
+            parsed_chunks = []
+            errors = []
+            for rows_read, items, chunk_errors in excel_import.iter_item_chunks(rows, mapping, first_row=data_start_row):
+                parsed_chunks.append(items)
+                errors.extend(chunk_errors)
+                job.rows_parsed += rows_read
+                job.errors = errors[:Config.IMPORT_MAX_ERRORS]
+                db.session.commit()
+
+            job.status = 'inserting'
+            db.session.commit()
+            last_id = db.session.query(db.func.coalesce(db.func.max(StudyItem.id), 0)).scalar()
+            for items in parsed_chunks:
+                if items:
+                    db.session.execute(StudyItem.__table__.insert(), items)
+                    job.rows_inserted += len(items)
+            # The imported items are today's additions in the activity table
+            today = datetime.utcnow().date()
+            db.session.execute(DailyActivity.__table__.insert().from_select(
+                ['date', 'item_id', 'operation_type', 'hours_added', 'progress_gained', 'retrospective', 'last_activity'],
+                db.select(
+                    db.literal(today),
+                    StudyItem.id,
+                    db.literal('add'),
+                    StudyItem.hours_spent,
+                    StudyItem.progress,
+                    db.literal(False),
+                    db.literal(datetime.utcnow())
+                ).where(
+                    StudyItem.id > last_id,
+                    ~db.exists().where(DailyActivity.item_id == StudyItem.id, DailyActivity.date == today)
+                )
+            ))
+            job.status = 'done'
+            job.finished_at = datetime.utcnow()
+            bump_data_version()
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            job = db.session.get(ImportJob, job_id)
+            job.status = 'failed'
+            job.error = str(e)
+            job.rows_inserted = 0
+            job.finished_at = datetime.utcnow()
+            db.session.commit()
+        finally:
+            if os.path.exists(filepath):
+                os.remove(filepath)
+            db.session.remove()
+
+@main.route('/bulk_import', methods=['GET', 'POST'])
 @login_required
 def bulk_import():
     if request.method == 'POST':
@@ -452,142 +1142,66 @@ def bulk_import():
             flash('Please upload an Excel file (.xlsx or .xls)', 'error')
             return redirect(request.url)
 
-        try:
-            filename = secure_filename(file.filename)
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-            file.save(filepath)
-            df = pd.read_excel(filepath)
-            title_cols = request.form.getlist('title_columns')
-            notes_cols = request.form.getlist('notes_columns')
-            hours_col = request.form.get('hours_column')
-            progress_col = request.form.get('progress_column')
-            theory_col = request.form.get('theory_column')
-            practical_col = request.form.get('practical_column')
-            sheet_name = request.form.get('sheet_name')
-            data_start_row = int(request.form.get('data_start_row', 2)) - 1
-            if sheet_name:
-                df = pd.read_excel(filepath, sheet_name=sheet_name, header=None)
-            else:
-                df = pd.read_excel(filepath, header=None)
-            if data_start_row > 0:
-                df = df.iloc[data_start_row:].reset_index(drop=True)
-            def col_letter_to_index(col_letter):
-                if not col_letter:
-                    return None
-                index = 0
-                for char in col_letter.upper():
-                    index = index * 26 + (ord(char) - ord('A') + 1)
-                return index - 1
-
-            title_indices = [col_letter_to_index(col) for col in title_cols if col]
-            notes_indices = [col_letter_to_index(col) for col in notes_cols if col]
-            hours_index = col_letter_to_index(hours_col)
-            progress_index = col_letter_to_index(progress_col)
-            theory_index = col_letter_to_index(theory_col)
-            practical_index = col_letter_to_index(practical_col)
-
-            imported_count = 0
-
-            for _, row in df.iterrows():
-                title_parts = []
-                for idx in title_indices:
-                    if idx is not None and idx < len(row) and pd.notna(row.iloc[idx]):
-                        title_parts.append(str(row.iloc[idx]))
-                title = ' '.join(title_parts) if title_parts else ''
-                if not title.strip():
-                    continue
-                notes_parts = []
-                for idx in notes_indices:
-                    if idx is not None and idx < len(row) and pd.notna(row.iloc[idx]):
-                        notes_parts.append(str(row.iloc[idx]))
-                notes = '\n'.join(notes_parts) if notes_parts else None
-                hours_spent = 0.0
-                if hours_index is not None and hours_index < len(row) and pd.notna(row.iloc[hours_index]):
-                    try:
-                        hours_spent = float(row.iloc[hours_index])
-                    except (ValueError, TypeError):
-                        hours_spent = 0.0
-
-                progress = 0
-                if progress_index is not None and progress_index < len(row) and pd.notna(row.iloc[progress_index]):
-                    try:
-                        progress = int(float(row.iloc[progress_index]))
-                        progress = min(max(progress, 0), 100)
-                    except (ValueError, TypeError):
-                        progress = 0
-
-                theory_confidence = 0
-                if theory_index is not None and theory_index < len(row) and pd.notna(row.iloc[theory_index]):
-                    try:
-                        theory_confidence = int(float(row.iloc[theory_index]))
-                        theory_confidence = min(max(theory_confidence, 0), 5)
-                    except (ValueError, TypeError):
-                        theory_confidence = 0
-
-                practical_confidence = 0
-                if practical_index is not None and practical_index < len(row) and pd.notna(row.iloc[practical_index]):
-                    try:
-                        practical_confidence = int(float(row.iloc[practical_index]))
-                        practical_confidence = min(max(practical_confidence, 0), 5)
-                    except (ValueError, TypeError):
-                        practical_confidence = 0
-                new_item = StudyItem(
-                    title=title,
-                    notes=notes,
-                    hours_spent=hours_spent,
-                    progress=progress,
-                    theory_confidence=theory_confidence,
-                    practical_confidence=practical_confidence
-                )
-
-                db.session.add(new_item)
-                imported_count += 1
-
-            db.session.commit()
+        job_id = uuid.uuid4().hex
+        filename = secure_filename(file.filename)
+        filepath = upload_path(job_id, filename)
+        os.makedirs(current_app.config['UPLOAD_FOLDER'], exist_ok=True)
+        file.save(filepath)
 
-            os.remove(filepath)
+        db.session.add(ImportJob(id=job_id, filename=filename, status='queued', errors=[]))
+        db.session.commit()
+        import excel_import
+        submit_import_job(
+            current_app._get_current_object(),
+            job_id,
+            filepath,
+            request.form.get('sheet_name'),
+            request.form.get('data_start_row', 2, type=int),
+            excel_import.build_mapping(request.form)
+        )
 
-            flash(f'Successfully imported {imported_count} items', 'success')
-            return redirect(url_for('index', sort=session.get('sort', 'last_modified'), order=session.get('order', 'desc'), search=session.get('search', '')))
+        if request.accept_mimetypes.best == 'application/json':
+            return jsonify({'job_id': job_id, 'status_url': url_for('main.import_job_status', job_id=job_id)}), 202
+        flash('Import started', 'success')
+        return redirect(url_for('main.bulk_import', job=job_id))
 
-        except Exception as e:
-            flash(f'Error importing file: {str(e)}', 'error')
-            return redirect(request.url)
+    fail_stale_import_jobs()
+    return render_template('bulk_import.html', job_id=request.args.get('job'))
 
-    return render_template('bulk_import.html')
+@main.route('/bulk_import/jobs/<job_id>')
+@login_required
+def import_job_status(job_id):
+    job = ImportJob.query.get_or_404(job_id)
+    if import_job_stale(job):
+        fail_import_job(job)
+        db.session.commit()
+    return jsonify(job.to_dict())
 
-@app.route('/calendar')
+@main.route('/calendar')
 @login_required
+@cached_view
 def calendar_view():
     year = request.args.get('year', datetime.utcnow().year, type=int)
     month = request.args.get('month', datetime.utcnow().month, type=int)
-    key_dates = KeyDate.query.all()
+    key_dates = KeyDate.query.order_by(KeyDate.date.asc()).all()
     start_date = datetime(year, month, 1).date()
     if month == 12:
         end_date = datetime(year + 1, 1, 1).date() - timedelta(days=1)
     else:
         end_date = datetime(year, month + 1, 1).date() - timedelta(days=1)
-    start_dt = datetime.combine(start_date, datetime.min.time())
-    end_dt = datetime.combine(end_date, datetime.max.time())
-    updates = db.session.query(StudyItem.id, StudyItem.title, StudyItem.last_modified, StudyItem.operation_type).filter(
-        StudyItem.last_modified.between(start_dt, end_dt)
-    ).all()
-
-    update_dates = {}
-    for update in updates:
-        if update[2]:
-            date_key = update[2].date()
-            if date_key not in update_dates:
-                update_dates[date_key] = True
 
-    # Also include dates from update history (includes retrospective updates)
-    retrospective_updates = UpdateHistory.query.filter(
-        UpdateHistory.date.between(start_date, end_date)
-    ).all()
-    for retro_update in retrospective_updates:
-        if retro_update.date not in update_dates:
-            update_dates[retro_update.date] = True
+    # Activity summary per day of the month, one range query on the activity table
+    update_dates = {
+        row.date: row for row in db.session.query(
+            DailyActivity.date,
+            db.func.count(DailyActivity.item_id).label('items'),
+            db.func.sum(DailyActivity.hours_added).label('hours'),
+            db.func.sum(DailyActivity.progress_gained).label('progress'),
+            db.func.max(db.case((DailyActivity.retrospective, 1), else_=0)).label('retrospective')
+        ).filter(
+            DailyActivity.date.between(start_date, end_date)
+        ).group_by(DailyActivity.date).all()
+    }
 
     key_dates_map = {}
     for key_date in key_dates:
@@ -619,6 +1233,7 @@ def calendar_view():
                     'day': day,
                     'date': day_date,
                     'has_updates': has_updates,
+                    'activity': update_dates.get(day_date),
                     'key_date': key_date,
                     'is_today': is_today
                 })
@@ -635,102 +1250,419 @@ def calendar_view():
                          next_month=next_month,
                          next_year=next_year)
 
-@app.route('/calendar/day/<date_str>')
+def year_activity(year):
+    """Items active per day of a year, from one grouped query over the activity table.
+
+    daily_activity keeps one row per item and active day even once the update
+    history has been compacted into weeks and months.
+    """
+    rows = db.session.execute(
+        db.select(DailyActivity.date, db.func.count())
+        .where(DailyActivity.date.between(date(year, 1, 1), date(year, 12, 31)))
+        .group_by(DailyActivity.date)
+        .order_by(DailyActivity.date)
+    ).all()
+    return dict(rows)
+
+def activity_level(count, max_count):
+    """Intensity bucket 0-4 of a day, relative to the busiest day of the year."""
+    if not count or not max_count:
+        return 0
+    return -(-count * 4 // max_count)  # Ceiling, so any activity is at least level 1
+
+# Years the date type can hold; the grid runs into the next year's first week, so not the last one
+YEAR_RANGE = f'int(min={MINYEAR}, max={MAXYEAR - 1})'
+
+@main.route(f'/calendar/year/<{YEAR_RANGE}:year>')
 @login_required
+@cached_view
+def calendar_year_view(year):
+    counts = year_activity(year)
+    max_count = max(counts.values(), default=0)
+
+    # Weeks as columns, Monday first, padded to whole weeks like the month view
+    first_day = datetime(year, 1, 1).date()
+    day = first_day - timedelta(days=first_day.weekday())
+    today = datetime.utcnow().date()
+    weeks = []
+    while day.year <= year:
+        week = []
+        for _ in range(7):
+            if day.year == year:
+                count = counts.get(day, 0)
+                week.append({'date': day, 'count': count, 'level': activity_level(count, max_count),
+                             'is_today': day == today})
+            else:
+                week.append(None)
+            day += timedelta(days=1)
+        weeks.append(week)
+
+    return render_template('calendar_year.html',
+                         year=year,
+                         weeks=weeks,
+                         active_days=len(counts),
+                         max_count=max_count,
+                         total_updates=sum(counts.values()))
+
+@main.route(f'/calendar/year/<{YEAR_RANGE}:year>.json')
+@login_required
+@cached_view
+def calendar_year_data(year):
+    counts = year_activity(year)
+    max_count = max(counts.values(), default=0)
+    return jsonify({
+        'year': year,
+        'max': max_count,
+        'active_days': len(counts),
+        'dates': [day.isoformat() for day in counts],
+        'counts': list(counts.values()),
+        'levels': [activity_level(count, max_count) for count in counts.values()]
+    })
+
+@main.route('/calendar/day/<date_str>')
+@login_required
+@cached_view
 def calendar_day_view(date_str):
     try:
         day_date = datetime.strptime(date_str, '%Y-%m-%d').date()
     except ValueError:
         flash('Invalid date format', 'error')
-        return redirect(url_for('calendar_view'))
-    start_datetime = datetime.combine(day_date, datetime.min.time())
-    end_datetime = datetime.combine(day_date, datetime.max.time())
-    
-    # Fetch updates modified on this day
-    updates = db.session.query(StudyItem).filter(
-        StudyItem.last_modified.between(start_datetime, end_datetime)
-    ).order_by(StudyItem.last_modified.desc()).all()
-    
-    # Fetch update history records for this day to show deltas
-    update_history = UpdateHistory.query.filter_by(date=day_date).all()
-    history_by_item = {uh.item_id: uh for uh in update_history}
-    
-    # Collect item IDs from history
-    items_from_history = set(uh.item_id for uh in update_history)
-    
-    # Get StudyItem objects for items in history that aren't already in updates
-    items_in_updates = set(u.id for u in updates)
-    missing_item_ids = items_from_history - items_in_updates
-    
-    if missing_item_ids:
-        missing_items = StudyItem.query.filter(StudyItem.id.in_(missing_item_ids)).all()
-        updates = list(updates) + missing_items
-        updates = sorted(updates, key=lambda x: x.last_modified, reverse=True)
-    
-    # Determine which updates are retrospective (added to a past date)
-    retrospective_items = set()
-    for uh in update_history:
-        # If created_at is on a later date than the update date, it's retrospective
-        created_date = uh.created_at.date()
-        if created_date > uh.date:
-            retrospective_items.add(uh.item_id)
-    
+        return redirect(url_for('main.calendar_view'))
+
+    # Items active on this day with their history record, one indexed query on the activity table
+    rows = db.session.query(DailyActivity, StudyItem, UpdateHistory).join(
+        StudyItem, StudyItem.id == DailyActivity.item_id
+    ).outerjoin(
+        UpdateHistory, db.and_(UpdateHistory.item_id == DailyActivity.item_id, UpdateHistory.date == DailyActivity.date)
+    ).filter(
+        DailyActivity.date == day_date
+    ).order_by(DailyActivity.last_activity.desc()).all()
+
+    updates = [item for _, item, _ in rows]
+    activity_by_item = {day_activity.item_id: day_activity for day_activity, _, _ in rows}
+    history_by_item = {history.item_id: history for _, _, history in rows if history}
+    retrospective_items = {day_activity.item_id for day_activity, _, _ in rows if day_activity.retrospective}
+
     key_date = KeyDate.query.filter_by(date=day_date).first()
 
     return render_template('calendar_day.html',
                          date=day_date,
                          updates=updates,
+                         activity=activity_by_item,
                          update_history=history_by_item,
                          retrospective_items=retrospective_items,
                          key_date=key_date)
 
-@app.route('/item/<int:item_id>/history')
+@main.route('/item/<int:item_id>/history')
 @login_required
+@cached_view
 def item_history(item_id):
     """Show progress graph for an item over time."""
-    item = StudyItem.query.get_or_404(item_id)
-    
-    # Fetch all update history for this item, ordered by date
-    updates = UpdateHistory.query.filter_by(item_id=item_id).order_by(UpdateHistory.date.asc()).all()
-    
-    # Build data structure for chart
-    chart_data = {
-        'dates': [],
-        'progress': [],
-        'hours_spent': [],
-        'theory_confidence': [],
-        'practical_confidence': []
-    }
-    
-    # If no history, start with current item values
-    if not updates:
-        today = datetime.utcnow().date()
-        chart_data['dates'].append(today.isoformat())
-        chart_data['progress'].append(item.progress)
-        chart_data['hours_spent'].append(item.hours_spent)
-        chart_data['theory_confidence'].append(item.theory_confidence)
-        chart_data['practical_confidence'].append(item.practical_confidence)
-    else:
-        # Build series from update history
-        for update in updates:
-            chart_data['dates'].append(update.date.isoformat())
-            
-            # Use the delta 'new' values to show progression
-            if update.delta:
-                delta = update.delta
-                chart_data['progress'].append(delta.get('progress', {}).get('new', item.progress))
-                chart_data['hours_spent'].append(delta.get('hours_spent', {}).get('new', item.hours_spent))
-                chart_data['theory_confidence'].append(delta.get('theory_confidence', {}).get('new', item.theory_confidence))
-                chart_data['practical_confidence'].append(delta.get('practical_confidence', {}).get('new', item.practical_confidence))
-            else:
-                chart_data['progress'].append(item.progress)
-                chart_data['hours_spent'].append(item.hours_spent)
-                chart_data['theory_confidence'].append(item.theory_confidence)
-                chart_data['practical_confidence'].append(item.practical_confidence)
-    
-    return render_template('item_history.html', item=item, chart_data=chart_data)
+    item_series = series.load(db.session, db.metadata, [item_id]).get(item_id)
+    if item_series is None:
+        abort(404)
+    return render_template('item_history.html', item=item_series, chart_data=item_series)
+
+SERIES_MAX_ITEMS = 100  # Items per /api/series request
 
-@app.route('/key_date/add', methods=['GET', 'POST'])
+def parse_series_fields():
+    fields = request.args.get('fields')
+    if not fields:
+        return series.FIELDS
+    return tuple(field for field in series.FIELDS if field in fields.split(','))
+
+@main.route('/api/items/<int:item_id>/series')
+@login_required
+@cached_view
+def item_series(item_id):
+    """Columnar history of one item: dates plus one array per field."""
+    item_series = series.load(db.session, db.metadata, [item_id], parse_series_fields()).get(item_id)
+    if item_series is None:
+        return jsonify({'error': 'Item not found'}), 404
+    return jsonify(item_series)
+
+@main.route('/api/series')
+@login_required
+@cached_view
+def items_series():
+    """History of several items (?ids=1,2,3) on one shared date axis."""
+    try:
+        item_ids = sorted({int(item_id) for item_id in request.args.get('ids', '').split(',') if item_id.strip()})
+    except ValueError:
+        return jsonify({'error': 'ids must be a comma separated list of item ids'}), 400
+    if not item_ids or len(item_ids) > SERIES_MAX_ITEMS:
+        return jsonify({'error': f'Give between 1 and {SERIES_MAX_ITEMS} item ids'}), 400
+    fields = parse_series_fields()
+    loaded = series.load(db.session, db.metadata, item_ids, fields)
+    return jsonify(series.align([loaded[item_id] for item_id in item_ids if item_id in loaded], fields))
+
+# Versioned JSON API for automation, every batch is a single transaction
+
+API_ITEM_FIELDS = ('title', 'notes', 'hours_spent', 'progress', 'theory_confidence', 'practical_confidence')
+API_KEY_DATE_FIELDS = ('name', 'date', 'notes')
+API_LIMITS = {'progress': (0, 100), 'theory_confidence': (0, 5), 'practical_confidence': (0, 5)}
+
+def api_login_required(f):
+    """login_required for the JSON API: a session or the API token, 401 instead of a redirect."""
+    def wrapper(*args, **kwargs):
+        authorization = request.headers.get('Authorization', '')
+        authorized = (not Config.ENABLE_PASSWORD_PROTECTION or 'logged_in' in session or (
+            Config.API_TOKEN and hmac.compare_digest(authorization, f'Bearer {Config.API_TOKEN}')))
+        if not authorized:
+            return jsonify({'error': 'Authentication required'}), 401
+        return f(*args, **kwargs)
+    wrapper.__name__ = f.__name__
+    return wrapper
+
+def api_id(value):
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ValueError('id must be an integer')
+    return value
+
+def api_date(value):
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ValueError('date must be YYYY-MM-DD')
+
+def api_text(entry, field, required=False):
+    value = entry[field]
+    if required and (not isinstance(value, str) or not value.strip()):
+        raise ValueError(f'{field} must be a non-empty string')
+    if value is not None and not isinstance(value, str):
+        raise ValueError(f'{field} must be a string')
+    return value
+
+def api_values(entry, fields, extra=(), required=()):
+    """Validated column values of a batch entry, raises ValueError."""
+    if not isinstance(entry, dict):
+        raise ValueError('Expected an object')
+    unknown = set(entry) - set(fields) - set(extra)
+    if unknown:
+        raise ValueError(f'Unknown field(s): {", ".join(sorted(unknown))}')
+    values = {}
+    for field in fields:
+        if field not in entry:
+            if field in required:
+                raise ValueError(f'{field} is required')
+        elif field in ('title', 'name'):
+            values[field] = api_text(entry, field, required=True)
+        elif field == 'notes':
+            values[field] = api_text(entry, field)
+        elif field == 'date':
+            values[field] = api_date(entry[field])
+        else:
+            value = entry[field]
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise ValueError(f'{field} must be a number')
+            if field in API_LIMITS:
+                low, high = API_LIMITS[field]
+                value = min(max(int(value), low), high)
+            values[field] = float(value) if field == 'hours_spent' else value
+    return values
+
+def api_batch():
+    """The create/update/delete lists of a batch request, or an error response."""
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return None, (jsonify({'error': 'Expected a JSON object'}), 400)
+    batch = {op: payload.get(op) or [] for op in ('create', 'update', 'delete')}
+    if not all(isinstance(entries, list) for entries in batch.values()):
+        return None, (jsonify({'error': 'create, update and delete must be lists'}), 400)
+    if sum(len(entries) for entries in batch.values()) > Config.API_BATCH_LIMIT:
+        return None, (jsonify({'error': f'At most {Config.API_BATCH_LIMIT} entries per batch'}), 413)
+    return batch, None
+
+def api_validate_ids(batch, errors):
+    """{id: (index, entry)} of the updates and the list of ids to delete, collecting errors."""
+    updates = {}
+    for index, entry in enumerate(batch['update']):
+        try:
+            item_id = api_id(entry.get('id') if isinstance(entry, dict) else None)
+            if item_id in updates:
+                raise ValueError('id is updated more than once')
+            updates[item_id] = (index, entry)
+        except ValueError as e:
+            errors.append({'op': 'update', 'index': index, 'error': str(e)})
+    deletes = []
+    for index, item_id in enumerate(batch['delete']):
+        try:
+            api_id(item_id)
+            if item_id in updates:
+                raise ValueError('id is both updated and deleted')
+            deletes.append(item_id)
+        except ValueError as e:
+            errors.append({'op': 'delete', 'index': index, 'error': str(e)})
+    return updates, deletes
+
+def api_errors(errors):
+    db.session.rollback()
+    return jsonify({'errors': errors}), 422
+
+@main.route('/api/v1/items/<int:item_id>')
+@api_login_required
+def api_get_item(item_id):
+    item = db.session.get(StudyItem, item_id)
+    if item is None:
+        return jsonify({'error': 'Item not found'}), 404
+    return jsonify(item.to_dict())
+
+@main.route('/api/v1/items/batch', methods=['POST'])
+@api_login_required
+def api_items_batch():
+    """Create, patch and delete many items in one transaction.
+
+    Body: {"create": [{title, ...}], "update": [{id, date?, field: value, ...}], "delete": [id, ...]}.
+    Updates record history and daily activity like the edit form, an optional
+    past date makes them retrospective. Nothing is written unless every entry
+    is valid; the response lists a result per entry.
+    """
+    batch, error = api_batch()
+    if error:
+        return error
+    errors = []
+    today = datetime.utcnow().date()
+    now = datetime.utcnow()
+
+    creates = []
+    for index, entry in enumerate(batch['create']):
+        try:
+            creates.append(api_values(entry, API_ITEM_FIELDS, required=('title',)))
+        except ValueError as e:
+            errors.append({'op': 'create', 'index': index, 'error': str(e)})
+    updates, deletes = api_validate_ids(batch, errors)
+    changes = {}
+    for item_id, (index, entry) in updates.items():
+        try:
+            values = api_values(entry, API_ITEM_FIELDS, extra=('id', 'date'))
+            update_date = api_date(entry['date']) if 'date' in entry else today
+            if update_date > today:
+                raise ValueError('Update date cannot be in the future')
+            changes[item_id] = (index, values, update_date, 'date' in entry)
+        except ValueError as e:
+            errors.append({'op': 'update', 'index': index, 'id': item_id, 'error': str(e)})
+    if errors:
+        return api_errors(errors)
+
+    # Saves lock the item rows (PostgreSQL/MySQL) so concurrent saves see each other's history
+    locked = set(changes) | set(deletes)
+    items = {item.id: item for item in StudyItem.query.filter(StudyItem.id.in_(locked)).with_for_update()} if locked else {}
+    for op, ids in (('update', changes), ('delete', deletes)):
+        for item_id in ids:
+            if item_id not in items:
+                index = changes[item_id][0] if op == 'update' else batch['delete'].index(item_id)
+                errors.append({'op': op, 'index': index, 'id': item_id, 'error': 'Item not found'})
+    if errors:
+        return api_errors(errors)
+
+    deltas = {}
+    previous = {}
+    for item_id, (index, values, update_date, backdated) in changes.items():
+        item = items[item_id]
+        previous[item_id] = tracked_values(item)
+        for field, value in values.items():
+            setattr(item, field, value)
+        item.last_modified = now
+        item.operation_type = 'modify'
+        deltas[item_id] = compute_delta(previous[item_id], tracked_values(item))
+    # Flushing the items first takes the SQLite write lock before the history is read
+    db.session.flush()
+
+    history, activity_rows, refused = history_writes(
+        [(items[item_id], previous[item_id], update_date, backdated)
+         for item_id, (index, values, update_date, backdated) in changes.items()], today)
+    for item_id, newer in refused.items():
+        index, _, update_date, _ = changes[item_id]
+        errors.append({'op': 'update', 'index': index, 'id': item_id,
+                       'error': f'Cannot add update for {update_date}. A newer update exists on {newer}.'})
+    day_activity = {(row['date'], row['item_id']): row for row in activity_rows}
+    if errors:
+        return api_errors(errors)
+
+    new_items = [StudyItem(operation_type='add', **values) for values in creates]
+    if new_items:
+        db.session.add_all(new_items)
+        db.session.flush()
+        for item in new_items:
+            day_activity[(today, item.id)] = {
+                'date': today, 'item_id': item.id, 'operation_type': 'add',
+                'hours_added': item.hours_spent or 0, 'progress_gained': item.progress or 0
+            }
+    if history:
+        upsert_history(history)
+    if day_activity:
+        record_activity(list(day_activity.values()))
+    if deletes:
+        # History and activity go with the items (ON DELETE CASCADE)
+        StudyItem.query.filter(StudyItem.id.in_(deletes)).delete(synchronize_session=False)
+    # Serialised before the commit expires the objects, which would reload them one by one
+    results = [{'op': 'create', 'index': index, 'status': 'created', 'item': item.to_dict()}
+               for index, item in enumerate(new_items)]
+    results += [{'op': 'update', 'index': index, 'status': 'updated', 'changes': sorted(deltas[item_id]),
+                 'item': items[item_id].to_dict()}
+                for item_id, (index, values, update_date, backdated) in sorted(changes.items(), key=lambda change: change[1][0])]
+    results += [{'op': 'delete', 'index': index, 'id': item_id, 'status': 'deleted'}
+                for index, item_id in enumerate(deletes)]
+    bump_data_version()
+    db.session.commit()
+    return jsonify({'results': results})
+
+@main.route('/api/v1/key_dates')
+@api_login_required
+def api_key_dates():
+    return jsonify({'key_dates': [key_date.to_dict() for key_date in KeyDate.query.order_by(KeyDate.date.asc())]})
+
+@main.route('/api/v1/key_dates/batch', methods=['POST'])
+@api_login_required
+def api_key_dates_batch():
+    """Create, patch and delete many key dates in one transaction, same body shape as the items batch."""
+    batch, error = api_batch()
+    if error:
+        return error
+    errors = []
+    creates = []
+    for index, entry in enumerate(batch['create']):
+        try:
+            creates.append(api_values(entry, API_KEY_DATE_FIELDS, required=('name', 'date')))
+        except ValueError as e:
+            errors.append({'op': 'create', 'index': index, 'error': str(e)})
+    updates, deletes = api_validate_ids(batch, errors)
+    changes = {}
+    for key_date_id, (index, entry) in updates.items():
+        try:
+            changes[key_date_id] = (index, api_values(entry, API_KEY_DATE_FIELDS, extra=('id',)))
+        except ValueError as e:
+            errors.append({'op': 'update', 'index': index, 'id': key_date_id, 'error': str(e)})
+    existing = set(changes) | set(deletes)
+    key_dates = {key_date.id: key_date for key_date in KeyDate.query.filter(KeyDate.id.in_(existing))} if existing else {}
+    for key_date_id, (index, values) in changes.items():
+        if key_date_id not in key_dates:
+            errors.append({'op': 'update', 'index': index, 'id': key_date_id, 'error': 'Key date not found'})
+    for index, key_date_id in enumerate(deletes):
+        if key_date_id not in key_dates:
+            errors.append({'op': 'delete', 'index': index, 'id': key_date_id, 'error': 'Key date not found'})
+    if errors:
+        return api_errors(errors)
+
+    new_key_dates = [KeyDate(**values) for values in creates]
+    db.session.add_all(new_key_dates)
+    for key_date_id, (index, values) in changes.items():
+        for field, value in values.items():
+            setattr(key_dates[key_date_id], field, value)
+    if deletes:
+        KeyDate.query.filter(KeyDate.id.in_(deletes)).delete(synchronize_session=False)
+    db.session.flush()
+    results = [{'op': 'create', 'index': index, 'status': 'created', 'key_date': key_date.to_dict()}
+               for index, key_date in enumerate(new_key_dates)]
+    results += [{'op': 'update', 'index': index, 'status': 'updated', 'key_date': key_dates[key_date_id].to_dict()}
+                for key_date_id, (index, values) in sorted(changes.items(), key=lambda change: change[1][0])]
+    results += [{'op': 'delete', 'index': index, 'id': key_date_id, 'status': 'deleted'}
+                for index, key_date_id in enumerate(deletes)]
+    bump_data_version()
+    db.session.commit()
+    return jsonify({'results': results})
+
+@main.route('/key_date/add', methods=['GET', 'POST'])
 @login_required
 def add_key_date():
     if request.method == 'POST':
@@ -740,7 +1672,7 @@ def add_key_date():
 
         if not name or not date_str:
             flash('Name and date are required', 'error')
-            return redirect(url_for('add_key_date'))
+            return redirect(url_for('main.add_key_date'))
 
         try:
             if 'T' not in date_str and '.' in date_str:
@@ -753,16 +1685,17 @@ def add_key_date():
                 notes=notes
             )
             db.session.add(key_date)
+            bump_data_version()
             db.session.commit()
             flash('Key date added successfully', 'success')
-            return redirect(url_for('calendar_view'))
+            return redirect(url_for('main.calendar_view'))
         except ValueError:
             flash('Invalid date format', 'error')
-            return redirect(url_for('add_key_date'))
+            return redirect(url_for('main.add_key_date'))
 
     return render_template('add_key_date.html')
 
-@app.route('/key_date/edit/<int:date_id>', methods=['GET', 'POST'])
+@main.route('/key_date/edit/<int:date_id>', methods=['GET', 'POST'])
 @login_required
 def edit_key_date(date_id):
     key_date = KeyDate.query.get_or_404(date_id)
@@ -774,30 +1707,355 @@ def edit_key_date(date_id):
 
         if not key_date.name or not date_str:
             flash('Name and date are required', 'error')
-            return redirect(url_for('edit_key_date', date_id=date_id))
+            return redirect(url_for('main.edit_key_date', date_id=date_id))
 
         try:
             if 'T' not in date_str and '.' in date_str:
                 key_date.date = datetime.strptime(date_str, '%Y.%m.%d').date()
             else:
                 key_date.date = datetime.strptime(date_str, '%Y-%m-%d').date()
+            bump_data_version()
             db.session.commit()
             flash('Key date updated successfully', 'success')
-            return redirect(url_for('calendar_view'))
+            return redirect(url_for('main.calendar_view'))
         except ValueError:
             flash('Invalid date format', 'error')
-            return redirect(url_for('edit_key_date', date_id=date_id))
+            return redirect(url_for('main.edit_key_date', date_id=date_id))
 
     return render_template('edit_key_date.html', key_date=key_date)
 
-@app.route('/key_date/delete/<int:date_id>', methods=['POST'])
+@main.route('/key_date/delete/<int:date_id>', methods=['POST'])
 @login_required
 def delete_key_date(date_id):
     key_date = KeyDate.query.get_or_404(date_id)
     db.session.delete(key_date)
+    bump_data_version()
     db.session.commit()
     flash('Key date deleted successfully', 'success')
-    return redirect(url_for('calendar_view'))
+    return redirect(url_for('main.calendar_view'))
+
+@main.cli.command('rebuild-activity')
+def rebuild_activity_command():
+    """Rebuild the calendar's daily activity table from items and history.
+
+    Days whose history was compacted keep their activity, it cannot be derived again.
+    """
+    with db.engine.begin() as conn:
+        through = compaction.compacted_through(conn, db.metadata)
+        count = activity.rebuild(conn, db.metadata, after=through)
+        conn.execute(DataVersion.__table__.update().values(
+            version=DataVersion.version + 1, updated_at=datetime.utcnow()))
+    if through:
+        print(f'Rebuilt daily activity after {through}: {count} rows, earlier days are compacted and kept')
+    else:
+        print(f'Rebuilt daily activity: {count} rows')
+
+def compact_history(daily_days=None, weekly_days=None, full_vacuum=False):
+    """Compact the update history with the configured retention, returns the report."""
+    sqlite = db.engine.dialect.name == 'sqlite'
+    if sqlite:
+        with db.engine.connect() as conn:
+            size_before, _ = compaction.sqlite_size(conn)
+            history_before = compaction.sqlite_table_bytes(conn, 'update_history')
+    report = compaction.compact(db.engine, db.metadata, datetime.utcnow().date(),
+                                daily_days or Config.HISTORY_DAILY_DAYS, weekly_days or Config.HISTORY_WEEKLY_DAYS)
+    if report['rows_removed']:
+        with db.engine.begin() as conn:
+            conn.execute(DataVersion.__table__.update().values(
+                version=DataVersion.version + 1, updated_at=datetime.utcnow()))
+    if sqlite:
+        report['vacuumed'] = compaction.sqlite_vacuum(db.engine, full=full_vacuum)
+        with db.engine.connect() as conn:
+            size_after, free = compaction.sqlite_size(conn)
+            history_after = compaction.sqlite_table_bytes(conn, 'update_history')
+        report.update(bytes_before=size_before, bytes_after=size_after, bytes_free=free,
+                      history_bytes_before=history_before, history_bytes_after=history_after)
+    return report
+
+def scheduled_tasks():
+    """{name: (interval in hours, task)} of the periodic tasks, an interval of 0 disables one."""
+    return {
+        'compact-history': (Config.HISTORY_COMPACTION_HOURS, compact_history),
+        'backup': (Config.BACKUP_HOURS, scheduled_backup),
+    }
+
+scheduler_lock = threading.Lock()
+scheduler_pid = None
+
+@main.before_app_request
+def start_scheduler():
+    # Started in each worker process, threads do not survive gunicorn's fork
+    global scheduler_pid
+    if scheduler_pid == os.getpid() or not any(hours for hours, _ in scheduled_tasks().values()):
+        return
+    with scheduler_lock:
+        if scheduler_pid != os.getpid():
+            scheduler_pid = os.getpid()
+            threading.Thread(target=scheduler_loop, args=(current_app._get_current_object(),),
+                             name='scheduler', daemon=True).start()
+
+def scheduler_loop(app):
+    tasks = {name: (timedelta(hours=hours), task) for name, (hours, task) in scheduled_tasks().items() if hours}
+    while True:
+        for name, (interval, task) in tasks.items():
+            with app.app_context():
+                try:
+                    # Only the worker whose update claims the run runs the task, the others find last_run fresh
+                    now = datetime.utcnow()
+                    with db.engine.begin() as conn:
+                        claimed = conn.execute(ScheduledTask.__table__.update().where(
+                            ScheduledTask.name == name, ScheduledTask.last_run <= now - interval
+                        ).values(last_run=now)).rowcount == 1
+                    if claimed:
+                        app.logger.info('Scheduled %s: %s', name, task())
+                except Exception:
+                    app.logger.exception('Scheduled %s failed', name)
+        time.sleep(min(min(interval.total_seconds() for interval, _ in tasks.values()), 600))
+
+@main.cli.command('delete-orphans')
+@click.option('--dry-run', is_flag=True, help='Only count the orphaned rows.')
+def delete_orphans_command(dry_run):
+    """Delete history and calendar activity left behind by items that no longer exist."""
+    with db.engine.connect() as conn:
+        orphans = deletion.count_orphans(conn, db.metadata)
+    for name, count in orphans.items():
+        print(f'{name}: {count} orphaned rows')
+    if dry_run or not any(orphans.values()):
+        return
+    deleted = deletion.delete_orphans(db.engine, db.metadata, batch_items=Config.DELETE_BATCH_ITEMS,
+                                      pause=Config.DELETE_PAUSE_MS / 1000)
+    with db.engine.begin() as conn:
+        conn.execute(DataVersion.__table__.update().values(
+            version=DataVersion.version + 1, updated_at=datetime.utcnow()))
+    print('Deleted ' + ', '.join(f'{count} from {name}' for name, count in deleted.items()))
+
+@main.cli.command('compact-history')
+@click.option('--daily-days', type=int, help='Keep daily history for this many days (default: HISTORY_DAILY_DAYS).')
+@click.option('--weekly-days', type=int, help='Keep weekly history up to this many days (default: HISTORY_WEEKLY_DAYS).')
+@click.option('--full-vacuum', is_flag=True, help='Rewrite the SQLite file to enable incremental vacuum, locks it meanwhile.')
+def compact_history_command(daily_days, weekly_days, full_vacuum):
+    """Roll old update history into weekly and monthly rows and reclaim the space."""
+    report = compact_history(daily_days, weekly_days, full_vacuum)
+    print(f"History rows: {report['rows_before']} -> {report['rows_after']} ({report['rows_removed']} removed)")
+    if report.get('history_bytes_before') is not None:
+        print(f"History data: {report['history_bytes_before'] / 1e6:.1f} MB -> {report['history_bytes_after'] / 1e6:.1f} MB")
+    if 'bytes_before' in report:
+        print(f"Database file: {report['bytes_before'] / 1e6:.1f} MB -> {report['bytes_after'] / 1e6:.1f} MB, "
+              f"{report['bytes_free'] / 1e6:.1f} MB free inside it")
+        if not report['vacuumed']:
+            print('Incremental vacuum is off for this database, run once with --full-vacuum to enable it')
+
+def backup_location():
+    """(database file, backup directory), None unless the database is a SQLite file."""
+    if db.engine.dialect.name != 'sqlite' or db.engine.url.database in (None, '', ':memory:'):
+        return None
+    database_path = os.path.abspath(db.engine.url.database)
+    return database_path, Config.BACKUP_DIR or os.path.join(os.path.dirname(database_path), 'backups')
+
+def run_backup(lock):
+    """Back the database up with the configured settings, then release the lock from backup.lock()."""
+    database_path, directory = backup_location()
+    try:
+        return backup.create(database_path, directory, keep=Config.BACKUP_KEEP,
+                             pages=Config.BACKUP_PAGES_PER_STEP, pause=Config.BACKUP_STEP_PAUSE_MS / 1000)
+    finally:
+        backup.unlock(lock)
+
+def scheduled_backup():
+    location = backup_location()
+    if location is None:
+        return 'skipped, backups need a SQLite database'
+    lock = backup.lock(location[1])
+    if lock is None:
+        return 'skipped, a backup is already running'
+    return run_backup(lock)
+
+def backup_in_background(app, lock):
+    with app.app_context():
+        try:
+            run_backup(lock)
+        except Exception:
+            app.logger.exception('Backup failed')
+
+def backup_to_dict(entry):
+    return {'file': entry['file'], 'bytes': entry['bytes'], 'created_at': entry['created_at'].isoformat()}
+
+@main.route('/admin/backups', methods=['GET', 'POST'])
+@api_login_required
+def admin_backups():
+    """GET: the running or last backup's progress and the backups kept; POST: start a backup."""
+    location = backup_location()
+    if location is None:
+        return jsonify({'error': "Backups need a SQLite database, use the database server's own tools"}), 400
+    database_path, directory = location
+    if request.method == 'POST':
+        lock = backup.lock(directory)
+        if lock is None:
+            return jsonify({'error': 'A backup is already running', 'status': backup.read_status(directory)}), 409
+        threading.Thread(target=backup_in_background, args=(current_app._get_current_object(), lock),
+                         name='backup', daemon=True).start()
+        return jsonify({'status_url': url_for('main.admin_backups')}), 202
+    return jsonify({'status': backup.read_status(directory),
+                    'backups': [backup_to_dict(entry) for entry in backup.list_backups(directory, database_path)]})
+
+@main.cli.command('backup')
+def backup_command():
+    """Back the SQLite database up while the app keeps running."""
+    location = backup_location()
+    if location is None:
+        raise click.ClickException("Backups need a SQLite database, use the database server's own tools")
+    lock = backup.lock(location[1])
+    if lock is None:
+        raise click.ClickException('A backup is already running')
+    result = run_backup(lock)
+    print(f"Backed up {result['pages']} pages to {result['path']} ({result['bytes'] / 1e6:.1f} MB) "
+          f"in {result['seconds']:.1f}s, {result['restarts']} restarts")
+
+@main.cli.command('list-backups')
+def list_backups_command():
+    """List the backups kept, newest first."""
+    location = backup_location()
+    if location is None:
+        raise click.ClickException("Backups need a SQLite database, use the database server's own tools")
+    for entry in backup.list_backups(location[1], location[0]):
+        print(f"{entry['created_at']:%Y-%m-%d %H:%M:%S}  {entry['bytes'] / 1e6:8.1f} MB  {entry['path']}")
+
+@main.cli.command('restore-backup')
+@click.argument('file', required=False)
+@click.option('--at', type=click.DateTime(), help='Restore the last backup made at or before this UTC time.')
+@click.option('--no-safety-backup', is_flag=True, help='Do not back the current database up first.')
+@click.option('--yes', is_flag=True, help='Do not ask for confirmation.')
+def restore_backup_command(file, at, no_safety_backup, yes):
+    """Replace the database with FILE, the last backup before --at, or the latest backup."""
+    location = backup_location()
+    if location is None:
+        raise click.ClickException("Backups need a SQLite database, use the database server's own tools")
+    database_path, directory = location
+    backups = backup.list_backups(directory, database_path)
+    if file:
+        path = file if os.path.exists(file) else os.path.join(directory, file)
+    else:
+        candidates = [entry for entry in backups if at is None or entry['created_at'] <= at]
+        if not candidates:
+            raise click.ClickException('No backup to restore' + (f' made before {at}' if at else ''))
+        path = candidates[0]['path']
+    if not yes:
+        click.confirm(f'Replace {database_path} with {path}?', abort=True)
+
+    lock = backup.lock(directory)
+    if lock is None:
+        raise click.ClickException('A backup is running, restore once it finished')
+    try:
+        if not no_safety_backup:
+            # Kept out of the rotation, which could otherwise remove the backup being restored
+            safety = backup.create(database_path, directory, keep=max(Config.BACKUP_KEEP, len(backups) + 1),
+                                   pages=Config.BACKUP_PAGES_PER_STEP, pause=Config.BACKUP_STEP_PAUSE_MS / 1000)
+            print(f"Current database saved to {safety['path']}")
+        with db.engine.connect() as conn:
+            version_before = conn.execute(db.select(DataVersion.version)).scalar() or 0
+        try:
+            backup.restore(path, database_path)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+    finally:
+        backup.unlock(lock)
+
+    # The backup may predate migrations; its data version must not repeat one
+    # that cached responses and ETags were made from
+    db.engine.dispose()
+    migrations.upgrade(db.engine, db.metadata)
+    with db.engine.begin() as conn:
+        restored = conn.execute(db.select(DataVersion.version)).scalar() or 0
+        conn.execute(DataVersion.__table__.update().values(
+            version=max(version_before, restored) + 1, updated_at=datetime.utcnow()))
+    if current_app.extensions['response_cache'] is not None:
+        current_app.extensions['response_cache'].clear()
+    print(f'Restored {path}')
+
+@main.cli.command('export')
+@click.argument('dataset', type=click.Choice(EXPORT_DATASETS))
+@click.option('--format', 'fmt', type=click.Choice(list(export.FORMATS)), default='csv', show_default=True)
+@click.option('--output', '-o', type=click.File('wb'), default='-', help='File to write, standard output by default.')
+@click.option('--sort', 'sort_by', type=click.Choice(list(sort_columns())), default='last_modified', show_default=True)
+@click.option('--order', 'sort_order', type=click.Choice(['asc', 'desc']), default='desc', show_default=True)
+@click.option('--search', 'search_query', default='', help='Only items matching this search, and their history.')
+def export_command(dataset, fmt, output, sort_by, sort_order, search_query):
+    """Export items, their update history or key dates as CSV, NDJSON or XLSX."""
+    columns, rows = export_rows(dataset, sort_by, sort_order, search_query)
+    for chunk in export.write(fmt, columns, rows, dataset):
+        output.write(chunk)
+
+@main.cli.command('build-assets')
+@click.option('--vendor', 'download', is_flag=True, help='Download Chart.js and SheetJS into static/vendor first, unless they are there.')
+def build_assets_command(download):
+    """Fingerprint and precompress the static files, restart the app to serve them."""
+    if download:
+        try:
+            for path in assets.vendor(current_app.static_folder):
+                print(f'Downloaded {path}')
+        except OSError as e:
+            raise click.ClickException(f'Download failed: {e}')
+    build_dir = assets_dir()
+    manifest = assets.build(current_app.static_folder, build_dir)
+    for name, hashed in sorted(manifest.items()):
+        sizes = [f'{suffix or "raw"} {os.path.getsize(os.path.join(build_dir, hashed + suffix)):,}'
+                 for suffix in ('', '.gz', '.br') if os.path.exists(os.path.join(build_dir, hashed + suffix))]
+        print(f"{hashed}: {', '.join(sizes)} bytes")
+    if current_app.extensions['response_cache']:
+        # Cached pages link the previous build's files
+        current_app.extensions['response_cache'].clear()
+    print(f'Built {len(manifest)} assets into {build_dir}')
+
+@main.cli.command('cache-stats')
+@click.option('--clear', is_flag=True, help='Empty the cache and reset its counters.')
+def cache_stats_command(clear):
+    """Show the response cache's hit/miss counters and size."""
+    response_cache = current_app.extensions['response_cache']
+    if response_cache is None:
+        print('Response cache is disabled (RESPONSE_CACHE=false)')
+        return
+    if clear:
+        response_cache.clear()
+    for name, value in response_cache.stats().items():
+        print(f'{name}: {value}')
+
+def create_app(overrides=None):
+    """Build the app: configuration, database upgrades, response cache, metrics and assets."""
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'{Config.DATABASE_URL}'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = f'{Config.DATABASE_TRACK_MODIFICATIONS}'
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = Config.engine_options()
+    app.config['UPLOAD_FOLDER'] = 'uploads'
+    app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+    app.config.update(overrides or {})
+    db.init_app(app)
+    app.register_blueprint(main)
+
+    with app.app_context():
+        if db.engine.dialect.name == 'sqlite':
+            event.listen(db.engine, 'connect', apply_sqlite_pragmas)
+        migrations.upgrade(db.engine, db.metadata)
+
+    app.extensions['response_cache'] = cache.ResponseCache(
+        Config.RESPONSE_CACHE_PATH or os.path.join(app.instance_path, 'response_cache.db'),
+        max_entries=Config.RESPONSE_CACHE_MAX_ENTRIES,
+        max_bytes=Config.RESPONSE_CACHE_MAX_BYTES
+    ) if Config.RESPONSE_CACHE else None
+
+    metrics_store = metrics.MetricsStore(
+        Config.METRICS_PATH or os.path.join(app.instance_path, 'metrics.db'),
+        flush_seconds=Config.METRICS_FLUSH_SECONDS
+    ) if Config.METRICS_ENABLED else None
+    app.extensions['metrics_store'] = metrics_store
+    if metrics_store:
+        with app.app_context():
+            metrics.install(app, db.engine, metrics_store, slow_request_ms=Config.SLOW_REQUEST_MS)
+
+    with app.app_context():
+        assets.install(app, assets_dir(), compress=Config.COMPRESS_RESPONSES,
+                       min_bytes=Config.COMPRESS_MIN_BYTES, level=Config.COMPRESS_LEVEL)
+    return app
 
 if __name__ == '__main__':
-    app.run(debug=Config.DEBUG)
+    create_app().run(debug=Config.DEBUG)
@@ -0,0 +1,187 @@
+"""Fingerprinted, precompressed static assets and compression of dynamic responses.
+
+build() copies every file of the static folder into the build directory
+under a name carrying a hash of its content (style.css becomes
+style.3f2a9c1b04de.css), with gzip and, when the brotli package is
+installed, brotli variants beside the text files, and writes manifest.json
+mapping the original names to the hashed ones. A hashed name changes
+whenever its content does, so send() lets browsers keep it for a year
+without revalidating. install() makes asset_url() return the hashed URLs
+once a manifest exists and the plain static ones before (and in debug
+mode, where the files change under it).
+
+The third-party libraries in VENDOR are fetched once into static/vendor by
+vendor(), committed, and then built like the app's own files; while one is
+missing, install() logs a warning and vendor_url() points at its public CDN.
+
+install() also compresses HTML, JSON and other text responses of the app
+on the fly, for clients that accept it.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import urllib.request
+
+from flask import request, send_from_directory, url_for
+
+try:
+    import brotli
+except ImportError:  # Optional, without it only gzip is used
+    brotli = None
+
+MANIFEST = 'manifest.json'
+VENDOR_DIR = 'vendor'
+VENDOR = {
+    'chart.min.js': 'https://cdn.jsdelivr.net/npm/chart.js@3.9.1/dist/chart.min.js',
+    'xlsx.full.min.js': 'https://cdnjs.cloudflare.com/ajax/libs/xlsx/0.18.5/xlsx.full.min.js',
+}
+COMPRESSIBLE = ('.css', '.js', '.json', '.map', '.svg', '.txt', '.html')
+COMPRESSIBLE_MIMETYPES = {'text/html', 'text/css', 'text/plain', 'text/csv', 'application/json',
+                          'application/javascript', 'text/javascript', 'image/svg+xml'}
+MAX_AGE = 365 * 24 * 3600
+BROTLI_QUALITY = 5  # Per response: about as fast as gzip level 6, and smaller
+
+
+def _fingerprint(path, content):
+    stem, extension = os.path.splitext(path)
+    return f'{stem}.{hashlib.sha256(content).hexdigest()[:12]}{extension}'
+
+
+def build(static_folder, build_dir):
+    """Write the hashed and compressed copies of static_folder into build_dir, returns the manifest.
+
+    Files of earlier builds are left in place, pages rendered before still find theirs.
+    """
+    manifest = {}
+    build_dir = os.path.abspath(build_dir)
+    for root, dirs, files in os.walk(os.path.abspath(static_folder)):
+        dirs[:] = [name for name in dirs if os.path.join(root, name) != build_dir]
+        for name in files:
+            source = os.path.join(root, name)
+            path = os.path.relpath(source, os.path.abspath(static_folder)).replace(os.sep, '/')
+            with open(source, 'rb') as f:
+                content = f.read()
+            manifest[path] = _fingerprint(path, content)
+            target = os.path.join(build_dir, manifest[path])
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, 'wb') as f:
+                f.write(content)
+            if not name.endswith(COMPRESSIBLE):
+                continue
+            # Built once, so the slowest and smallest settings; kept only when they save something
+            variants = {'.gz': gzip.compress(content, 9, mtime=0)}
+            if brotli:
+                variants['.br'] = brotli.compress(content, quality=11)
+            for suffix, compressed in variants.items():
+                if len(compressed) < len(content):
+                    with open(target + suffix, 'wb') as f:
+                        f.write(compressed)
+    os.makedirs(build_dir, exist_ok=True)
+    with open(os.path.join(build_dir, f'{MANIFEST}.tmp'), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(os.path.join(build_dir, f'{MANIFEST}.tmp'), os.path.join(build_dir, MANIFEST))
+    return manifest
+
+
+def load_manifest(build_dir):
+    try:
+        with open(os.path.join(build_dir, MANIFEST)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def vendor(static_folder):
+    """Download the VENDOR libraries missing from static/vendor, returns the paths written."""
+    directory = os.path.join(static_folder, VENDOR_DIR)
+    os.makedirs(directory, exist_ok=True)
+    written = []
+    for name, url in VENDOR.items():
+        if os.path.isfile(os.path.join(directory, name)):
+            continue
+        with urllib.request.urlopen(url, timeout=60) as response:
+            content = response.read()
+        with open(os.path.join(directory, name), 'wb') as f:
+            f.write(content)
+        written.append(os.path.join(directory, name))
+    return written
+
+
+def _encoding(accept_encodings, available):
+    # Brotli is smaller than gzip for the same text
+    for encoding in ('br', 'gzip'):
+        if encoding in available and accept_encodings[encoding]:
+            return encoding
+    return None
+
+
+def send(build_dir, filename):
+    """A built file for the current request: precompressed if accepted, cacheable for a year."""
+    variants = {'br': '.br', 'gzip': '.gz'}
+    available = [encoding for encoding, suffix in variants.items()
+                 if os.path.isfile(os.path.join(build_dir, filename + suffix))]
+    encoding = _encoding(request.accept_encodings, available)
+    # The mimetype of the original, not of the .gz or .br file
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    response = send_from_directory(build_dir, filename + variants[encoding] if encoding else filename,
+                                   mimetype=mimetype, max_age=MAX_AGE)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    if available:
+        response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+def install(app, build_dir, compress=True, min_bytes=512, level=6):
+    """Add the asset_url() and vendor_url() template globals and, with compress, response compression.
+
+    Responses under min_bytes are left alone, level is gzip's.
+    """
+    manifest = load_manifest(build_dir)
+
+    def asset_url(filename):
+        if filename in manifest and not app.debug:
+            return url_for('main.asset', filename=manifest[filename])
+        return url_for('static', filename=filename)
+
+    def vendored(name):
+        return (f'{VENDOR_DIR}/{name}' in manifest
+                or os.path.isfile(os.path.join(app.static_folder, VENDOR_DIR, name)))
+
+    def vendor_url(name):
+        if vendored(name):
+            return asset_url(f'{VENDOR_DIR}/{name}')
+        return VENDOR[name]
+
+    missing = [name for name in VENDOR if not vendored(name)]
+    if missing:
+        app.logger.warning('%s missing from static/%s, pages load them from public CDNs; '
+                           'run flask --app app build-assets --vendor and commit them',
+                           ', '.join(missing), VENDOR_DIR)
+
+    app.add_template_global(asset_url)
+    app.add_template_global(vendor_url)
+
+    if not compress:
+        return
+
+    @app.after_request
+    def compress_response(response):
+        # Files are sent as they are and streams can't be compressed as a whole
+        if (response.direct_passthrough or response.is_streamed or response.status_code != 200
+                or 'Content-Encoding' in response.headers or response.mimetype not in COMPRESSIBLE_MIMETYPES
+                or response.content_length is not None and response.content_length < min_bytes):
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = _encoding(request.accept_encodings, ('br', 'gzip') if brotli else ('gzip',))
+        if encoding is None:
+            return response
+        data = response.get_data()
+        response.set_data(brotli.compress(data, quality=BROTLI_QUALITY) if encoding == 'br'
+                          else gzip.compress(data, level))
+        response.headers['Content-Encoding'] = encoding
+        return response
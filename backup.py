@@ -0,0 +1,256 @@
+"""Online backups of the SQLite database, and restores from them.
+
+create() copies the live database with SQLite's backup API a few pages per
+step, pausing between steps so requests keep their share of the disk and
+the GIL. In WAL mode the copy runs inside one read transaction: it is a
+consistent snapshot of the moment it started, and writers carry on
+meanwhile. Other journal modes cannot hold a read lock that long without
+blocking writers, so every write restarts the copy; after MAX_RESTARTS the
+rest is copied in a single step. The copy is checked, gzipped and
+checksummed next to the previous generations, the oldest beyond `keep` are
+removed.
+
+Backups are named <database>-<UTC time>.db.gz with a <file>.sha256 in
+sha256sum format beside them; one without its checksum file is incomplete
+and ignored. Progress goes to STATUS_FILE in the backup directory, which
+every worker process can read.
+"""
+import fcntl
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+import sqlite3
+import time
+from datetime import datetime
+
+PAGES_PER_STEP = 256
+STEP_PAUSE = 0.005  # Seconds between steps
+MAX_RESTARTS = 10
+STATUS_FILE = 'backup-status.json'
+STATUS_INTERVAL = 0.5  # Seconds between status file updates while copying
+LOCK_FILE = '.backup.lock'
+TIME_FORMAT = '%Y%m%dT%H%M%SZ'
+READ_SIZE = 1024 * 1024
+COMPRESS_LEVEL = 6  # gzip's default of 9 takes three times as long for a few % smaller files
+
+
+class _Restarted(Exception):
+    pass
+
+
+def _stem(database_path):
+    return os.path.splitext(os.path.basename(database_path))[0]
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while chunk := f.read(READ_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _quick_check(path):
+    conn = sqlite3.connect(path)
+    try:
+        result = conn.execute('PRAGMA quick_check').fetchone()[0]
+    finally:
+        conn.close()
+    if result != 'ok':
+        raise ValueError(f'{os.path.basename(path)} failed the integrity check: {result}')
+
+
+def lock(directory):
+    """Lock the backup directory, returns the lock to pass to unlock(), None when a backup is running."""
+    os.makedirs(directory, exist_ok=True)
+    handle = open(os.path.join(directory, LOCK_FILE), 'w')
+    try:
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        handle.close()
+        return None
+    return handle
+
+
+def unlock(handle):
+    fcntl.flock(handle, fcntl.LOCK_UN)
+    handle.close()
+
+
+def write_status(directory, **status):
+    path = os.path.join(directory, STATUS_FILE)
+    with open(f'{path}.tmp', 'w') as f:
+        json.dump(status, f)
+    os.replace(f'{path}.tmp', path)
+
+
+def read_status(directory):
+    """The running or last backup's status with its percentage done, None before the first one."""
+    try:
+        with open(os.path.join(directory, STATUS_FILE)) as f:
+            status = json.load(f)
+    except FileNotFoundError:
+        return None
+    if status['status'] == 'running':
+        # A process stopped mid-backup leaves 'running' behind, but not its lock
+        handle = lock(directory)
+        if handle:
+            unlock(handle)
+            status['status'] = 'interrupted'
+    status['percent'] = round(100 * status['pages_done'] / status['pages_total'], 1) if status['pages_total'] else 0
+    return status
+
+
+def list_backups(directory, database_path):
+    """Complete backups of a database, newest first: [{file, path, created_at, bytes}]."""
+    pattern = re.compile(rf'^{re.escape(_stem(database_path))}-(\d{{8}}T\d{{6}}Z)\.db\.gz$')
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    backups = []
+    for name in names:
+        match = pattern.match(name)
+        path = os.path.join(directory, name)
+        if match and os.path.exists(f'{path}.sha256'):
+            backups.append({'file': name, 'path': path, 'bytes': os.path.getsize(path),
+                            'created_at': datetime.strptime(match.group(1), TIME_FORMAT)})
+    return sorted(backups, key=lambda backup: backup['created_at'], reverse=True)
+
+
+def snapshot(database_path, target_path, pages=PAGES_PER_STEP, pause=STEP_PAUSE, progress=None):
+    """Copy the database to target_path in steps, returns (pages, restarts).
+
+    progress(done, total) is called after every step.
+    """
+    source = sqlite3.connect(database_path, isolation_level=None)
+    target = sqlite3.connect(target_path)
+    state = {'remaining': None, 'restarts': 0}
+
+    def step(status, remaining, total):
+        if state['remaining'] is not None and remaining > state['remaining']:
+            state['restarts'] += 1
+            if state['restarts'] > MAX_RESTARTS:
+                raise _Restarted
+        state['remaining'] = remaining
+        if progress:
+            progress(total - remaining, total)
+        time.sleep(pause)
+
+    try:
+        if source.execute('PRAGMA journal_mode').fetchone()[0] == 'wal':
+            # Any read starts the transaction the steps then share
+            source.execute('BEGIN')
+            source.execute('SELECT COUNT(*) FROM sqlite_master').fetchone()
+        try:
+            source.backup(target, pages=pages, progress=step)
+        except _Restarted:
+            source.backup(target)
+        total = target.execute('PRAGMA page_count').fetchone()[0]
+        if progress:
+            progress(total, total)
+        return total, state['restarts']
+    finally:
+        if source.in_transaction:
+            source.execute('COMMIT')
+        source.close()
+        target.close()
+
+
+def create(database_path, directory, keep=7, pages=PAGES_PER_STEP, pause=STEP_PAUSE):
+    """Back the database up into directory and rotate the old backups.
+
+    Call with the directory locked. Returns the backup's {file, path,
+    created_at, bytes, sha256, pages, restarts, seconds}.
+    """
+    os.makedirs(directory, exist_ok=True)
+    started = datetime.utcnow()
+    name = f'{_stem(database_path)}-{started.strftime(TIME_FORMAT)}.db.gz'
+    while os.path.exists(os.path.join(directory, name)):
+        # Names have a resolution of a second, never overwrite a backup
+        time.sleep(1)
+        started = datetime.utcnow()
+        name = f'{_stem(database_path)}-{started.strftime(TIME_FORMAT)}.db.gz'
+    path = os.path.join(directory, name)
+    copy_path = os.path.join(directory, f'.{name}.db')
+    status = {'status': 'running', 'phase': 'copying', 'file': name, 'pages_done': 0, 'pages_total': None,
+              'started_at': started.isoformat(), 'finished_at': None, 'error': None}
+    last_write = [0]
+
+    def progress(done, total):
+        status.update(pages_done=done, pages_total=total)
+        if time.monotonic() - last_write[0] >= STATUS_INTERVAL or done == total:
+            last_write[0] = time.monotonic()
+            write_status(directory, **status)
+
+    write_status(directory, **status)
+    try:
+        page_count, restarts = snapshot(database_path, copy_path, pages, pause, progress)
+        write_status(directory, **dict(status, phase='checking'))
+        _quick_check(copy_path)
+        write_status(directory, **dict(status, phase='compressing'))
+        with open(copy_path, 'rb') as source, gzip.open(f'{path}.tmp', 'wb', COMPRESS_LEVEL) as target:
+            shutil.copyfileobj(source, target, READ_SIZE)
+        os.replace(f'{path}.tmp', path)
+        checksum = _sha256(path)
+        with open(f'{path}.sha256', 'w') as f:
+            f.write(f'{checksum}  {name}\n')
+    except Exception as e:
+        for leftover in (path, f'{path}.tmp'):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+        write_status(directory, **dict(status, status='failed', finished_at=datetime.utcnow().isoformat(), error=str(e)))
+        raise
+    finally:
+        if os.path.exists(copy_path):
+            os.remove(copy_path)
+
+    for old in list_backups(directory, database_path)[keep:]:
+        os.remove(f"{old['path']}.sha256")
+        os.remove(old['path'])
+
+    finished = datetime.utcnow()
+    write_status(directory, **dict(status, status='done', phase=None, finished_at=finished.isoformat(),
+                                   bytes=os.path.getsize(path), sha256=checksum, restarts=restarts))
+    return {'file': name, 'path': path, 'created_at': started, 'bytes': os.path.getsize(path), 'sha256': checksum,
+            'pages': page_count, 'restarts': restarts, 'seconds': (finished - started).total_seconds()}
+
+
+def verify(path):
+    """Raise ValueError unless the backup matches its checksum file."""
+    try:
+        with open(f'{path}.sha256') as f:
+            expected = f.read().split()[0]
+    except FileNotFoundError:
+        raise ValueError(f'{os.path.basename(path)} has no checksum file, the backup is incomplete')
+    if _sha256(path) != expected:
+        raise ValueError(f'{os.path.basename(path)} does not match its checksum')
+
+
+def restore(path, database_path):
+    """Replace the database's content with a backup's.
+
+    The backup is verified and unpacked beside the database first, then
+    copied in with the backup API in a single step: other connections, the
+    app's included, wait on the lock and see either the old or the restored
+    database, never a mix.
+    """
+    verify(path)
+    copy_path = os.path.join(os.path.dirname(os.path.abspath(database_path)), f'.restore-{os.getpid()}.db')
+    try:
+        with gzip.open(path, 'rb') as source, open(copy_path, 'wb') as target:
+            shutil.copyfileobj(source, target, READ_SIZE)
+        _quick_check(copy_path)
+        source = sqlite3.connect(copy_path)
+        target = sqlite3.connect(database_path, timeout=30)
+        try:
+            source.backup(target)
+        finally:
+            source.close()
+            target.close()
+    finally:
+        if os.path.exists(copy_path):
+            os.remove(copy_path)
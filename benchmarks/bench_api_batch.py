@@ -0,0 +1,77 @@
+"""Measure the throughput of the batch JSON API against one edit per item.
+
+Seeds a file-backed SQLite database with ITEMS items, then posts CALLS
+batches of BATCH hour/progress updates to /api/v1/items/batch and reports
+updates/sec and SQL statements per call. For comparison the same number of
+updates is timed through the /edit form for the first --edits items.
+
+    python benchmarks/bench_api_batch.py --items 1000 --batch 1000 --calls 10
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+from sqlalchemy import event
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import dataset
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--items', type=int, default=1000)
+    parser.add_argument('--batch', type=int, default=1000)
+    parser.add_argument('--calls', type=int, default=10)
+    parser.add_argument('--edits', type=int, default=200)
+    args = parser.parse_args()
+
+    with dataset.temp_app('bench') as (app, _):
+        from app import db, StudyItem, UpdateHistory
+
+        with app.app_context():
+            db.session.execute(StudyItem.__table__.insert(),
+                               [{'title': f'Topic {i}'} for i in range(args.items)])
+            db.session.commit()
+            item_ids = [item_id for (item_id,) in db.session.query(StudyItem.id)]
+            statements = []
+            event.listen(db.engine, 'before_cursor_execute',
+                         lambda conn, cursor, statement, *rest: statements.append(statement))
+
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['logged_in'] = True
+        rng = random.Random(1)
+
+        statements.clear()
+        started = time.perf_counter()
+        for _ in range(args.calls):
+            response = client.post('/api/v1/items/batch', json={'update': [
+                {'id': item_id, 'hours_spent': rng.randint(0, 400) / 4, 'progress': rng.randint(0, 100)}
+                for item_id in rng.sample(item_ids, min(args.batch, len(item_ids)))
+            ]})
+            assert response.status_code == 200, response.get_json()
+        elapsed = time.perf_counter() - started
+        updates = args.calls * min(args.batch, len(item_ids))
+        print(f'batch API: {updates} updates in {elapsed:.2f}s = {updates / elapsed:.0f} updates/s, '
+              f'{len(statements) / args.calls:.1f} statements per call')
+
+        statements.clear()
+        started = time.perf_counter()
+        for item_id in item_ids[:args.edits]:
+            client.post(f'/edit/{item_id}', data={
+                'title': f'Topic {item_id}', 'hours_spent': str(rng.randint(0, 400) / 4),
+                'progress': str(rng.randint(0, 100)), 'theory_confidence': '0', 'practical_confidence': '0'})
+        elapsed = time.perf_counter() - started
+        print(f'edit form: {args.edits} updates in {elapsed:.2f}s = {args.edits / elapsed:.0f} updates/s, '
+              f'{len(statements) / args.edits:.1f} statements per update')
+
+        with app.app_context():
+            print(f'history rows: {db.session.query(UpdateHistory).count()}')
+
+
+if __name__ == '__main__':
+    main()
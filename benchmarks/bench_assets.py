@@ -0,0 +1,76 @@
+"""Report the bytes sent for static assets and pages, with and without compression.
+
+Builds the assets into a temporary ASSETS_DIR, then requests every page's
+stylesheets and scripts and a few dynamic pages of a temporary database
+seeded with the synthetic dataset, once per Accept-Encoding. Prints the
+size of each and fails when an asset comes back without its hashed name,
+the immutable Cache-Control or the requested Content-Encoding, or a page
+comes back uncompressed.
+
+    python benchmarks/bench_assets.py --scale 1k
+"""
+import argparse
+import os
+import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import dataset
+
+PAGES = ['/', '/?sort=progress&order=asc', '/calendar', '/item/1/history', '/api/items/1/series']
+ENCODINGS = ['identity', 'gzip', 'br, gzip']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', choices=sorted(dataset.SCALES), default='1k')
+    args = parser.parse_args()
+
+    with dataset.temp_app('assets', ENABLE_PASSWORD_PROTECTION=False) as (app, tmp):
+        from app import create_app, db
+        import assets
+        result = app.test_cli_runner().invoke(args=['build-assets'])
+        if result.exit_code:
+            sys.exit(result.output)
+        app = create_app({'UPLOAD_FOLDER': os.path.join(tmp, 'uploads')})  # Reads the new manifest
+        with app.app_context():
+            dataset.seed(db.engine, db.metadata, **dataset.SCALES[args.scale], seed=1)
+        client = app.test_client()
+        failures = []
+        print(f"{'':<48}" + ''.join(f'{encoding:>12}' for encoding in ENCODINGS))
+
+        html = client.get('/').get_data(as_text=True)
+        urls = re.findall(r'(?:href|src)="(/(?:assets|static)/[^"]+)"', html)
+        for url in urls:
+            sizes = []
+            for encoding in ENCODINGS:
+                response = client.get(url, headers={'Accept-Encoding': encoding})
+                sizes.append(len(response.get_data()))
+                expected = encoding.split(',')[0] if encoding != 'identity' else None
+                if expected == 'br' and not assets.brotli:
+                    expected = 'gzip'
+                if (not url.startswith('/assets/') or 'immutable' not in response.headers.get('Cache-Control', '')
+                        or response.headers.get('Content-Encoding') != expected):
+                    failures.append(f'{url} [{encoding}]: {response.headers.get("Content-Encoding")}, '
+                                    f'{response.headers.get("Cache-Control")}')
+                response.close()
+            print(f'{url:<48}' + ''.join(f'{size:>12,}' for size in sizes))
+
+        for page in PAGES:
+            sizes = []
+            for encoding in ENCODINGS:
+                response = client.get(page, headers={'Accept-Encoding': encoding})
+                sizes.append(len(response.get_data()))
+                if encoding != 'identity' and response.status_code == 200 and 'Content-Encoding' not in response.headers:
+                    failures.append(f'{page} [{encoding}]: not compressed')
+            print(f'{page:<48}' + ''.join(f'{size:>12,}' for size in sizes))
+
+    for failure in failures:
+        print(f'FAIL {failure}')
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
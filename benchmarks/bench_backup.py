@@ -0,0 +1,158 @@
+"""Check that dashboard latency stays flat while an online backup runs.
+
+Loads the dashboard from --concurrency threads, with edits posted alongside,
+for --seconds as a baseline. Then starts a backup through POST
+/admin/backups under the same load and keeps measuring until it has
+finished. Prints p50/p95/p99 latency and the edits saved in both phases,
+and fails when the p95 during the backup exceeds the baseline's by more than
+--max-ratio or a request fails. By default the app runs in process on a
+temporary SQLite database seeded with the synthetic dataset; with --url the
+load goes to a running server (whose database must be SQLite).
+
+    python benchmarks/bench_backup.py --scale 10k --concurrency 4 --seconds 10
+    python benchmarks/bench_backup.py --url http://127.0.0.1:5000 --items 10000
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import dataset
+from load_test import HttpSession, TestClientSession, percentile
+
+
+def admin(session, method):
+    """(status code, JSON) of /admin/backups."""
+    if isinstance(session, TestClientSession):
+        response = session.client.open('/admin/backups', method=method)
+        return response.status_code, response.get_json()
+    request = urllib.request.Request(session.base_url + '/admin/backups', b'' if method == 'POST' else None,
+                                     method=method)
+    try:
+        with session.opener.open(request) as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as error:
+        return error.code, json.load(error)
+
+
+def under_load(new_session, args, until):
+    """Load the dashboard and post edits until until() is true, returns (latencies, edits, errors)."""
+    latencies, counts, lock = [], {'edits': 0, 'errors': 0}, threading.Lock()
+    stop = threading.Event()
+
+    def reader():
+        session = new_session()
+        while not stop.is_set():
+            started = time.perf_counter()
+            status = session.request('GET', '/')
+            with lock:
+                latencies.append(time.perf_counter() - started)
+                counts['errors'] += status >= 400
+
+    def writer():
+        session, rng = new_session(), random.Random(1)
+        while not stop.is_set():
+            item = rng.randint(1, args.items)
+            status = session.request('POST', f'/edit/{item}', {
+                'title': f'Backup test {item}', 'hours_spent': str(rng.randint(0, 400) / 4),
+                'progress': str(rng.randint(0, 100)), 'theory_confidence': '2', 'practical_confidence': '2'})
+            with lock:
+                counts['edits'] += status < 400
+                counts['errors'] += status >= 400
+            time.sleep(args.edit_interval)
+
+    threads = [threading.Thread(target=reader) for _ in range(args.concurrency)] + [threading.Thread(target=writer)]
+    for thread in threads:
+        thread.start()
+    until()
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return sorted(latencies), counts['edits'], counts['errors']
+
+
+def report(name, latencies, edits, errors, seconds):
+    print(f'{name:<14} {len(latencies):6d} requests  p50 {percentile(latencies, 50) * 1000:7.1f} ms  '
+          f'p95 {percentile(latencies, 95) * 1000:7.1f} ms  p99 {percentile(latencies, 99) * 1000:7.1f} ms  '
+          f'{edits} edits, {errors} errors in {seconds:.1f}s')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help='base URL of a running server, otherwise the app runs in process')
+    parser.add_argument('--password', default=os.getenv('APP_PASSWORD', 'admin'))
+    parser.add_argument('--scale', choices=sorted(dataset.SCALES), default='10k')
+    parser.add_argument('--items', type=int, help='item count of the dataset, defaults to that of --scale')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=10, help='length of the baseline')
+    parser.add_argument('--edit-interval', type=float, default=0.2, help='seconds between edits')
+    parser.add_argument('--max-ratio', type=float, default=1.5, help='p95 allowed during the backup, times the baseline')
+    args = parser.parse_args()
+    args.items = args.items or dataset.SCALES[args.scale]['items']
+
+    with contextlib.ExitStack() as stack:
+        if args.url:
+            def new_session():
+                return HttpSession(args.url, args.password)
+        else:
+            # The response cache stays off, every dashboard load reads the database
+            app, _ = stack.enter_context(dataset.temp_app('backup'))
+            from app import db
+            with app.app_context():
+                dataset.seed(db.engine, db.metadata, **dataset.SCALES[args.scale], seed=1)
+
+            def new_session():
+                return TestClientSession(app)
+
+        session = new_session()
+        status, body = admin(session, 'GET')
+        if status != 200:
+            sys.exit(f'GET /admin/backups: {status} {body}')
+        previous = (body['status'] or {}).get('file')
+
+        started = time.perf_counter()
+        baseline = under_load(new_session, args, lambda: time.sleep(args.seconds))
+        baseline_seconds = time.perf_counter() - started
+
+        result, failure = {}, []
+
+        def backup_runs():
+            status, body = admin(session, 'POST')
+            if status != 202:
+                failure.append(f'POST /admin/backups: {status} {body}')
+                return
+            while True:
+                time.sleep(0.1)
+                current = admin(session, 'GET')[1]['status'] or {}
+                if current.get('file') != previous and current.get('status') not in (None, 'running'):
+                    result.update(current)
+                    return
+
+        started = time.perf_counter()
+        during = under_load(new_session, args, backup_runs)
+        backup_seconds = time.perf_counter() - started
+
+    report('baseline', *baseline, baseline_seconds)
+    report('during backup', *during, backup_seconds)
+    if failure:
+        sys.exit(failure[0])
+    print(f"backup {result['status']}: {result['file']}, {result['pages_total']} pages, "
+          f"{result.get('bytes', 0) / 1e6:.1f} MB compressed, {result.get('restarts')} restarts"
+          + (f", {result['error']}" if result.get('error') else ''))
+    ratio = percentile(during[0], 95) / percentile(baseline[0], 95)
+    print(f'p95 during backup / baseline: {ratio:.2f} (max {args.max_ratio})')
+    failed = result['status'] != 'done' or ratio > args.max_ratio or baseline[2] or during[2]
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""Compare the requests and server CPU of an interactive dashboard session.
+
+Replays the same session twice against a temporary SQLite database seeded
+with the synthetic dataset: a dashboard load followed by --clicks sort
+header clicks and a few title searches. The "server" replay requests a
+fully rendered page for every interaction, like the dashboard used to; the
+"browser" replay loads the page, fetches /api/items once and posts the
+final sort and title filter to /dashboard_state, as the page does when it is
+left. Both then reload the dashboard, and the browser revalidates its
+dataset. Prints requests, bytes and the CPU time spent serving them per
+replay.
+
+    python benchmarks/bench_dashboard_session.py --scale 10k
+    python benchmarks/bench_dashboard_session.py --scale 10k --response-cache
+"""
+import argparse
+import itertools
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import dataset
+
+SORTS = ['title', 'hours_spent', 'progress', 'theory_confidence', 'practical_confidence', 'last_modified']
+SEARCHES = ['ospf', 'bgp', '']
+
+
+def interactions(clicks):
+    """[(sort, order, search)] of one session, a search every few clicks."""
+    steps, search = [], ''
+    orders = itertools.cycle(['asc', 'desc'])
+    for number, sort in zip(range(clicks), itertools.cycle(SORTS)):
+        if number and number % 4 == 0:
+            search = SEARCHES[(number // 4 - 1) % len(SEARCHES)]
+            steps.append((sort, next(orders), search))
+        steps.append((sort, next(orders), search))
+    return steps
+
+
+class Replay:
+    """Requests of one replay with their bytes and the CPU time spent on them."""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+        self.requests = self.bytes = 0
+        self.cpu = 0.0
+        self.statuses = []
+
+    def request(self, method, url, **kwargs):
+        started = time.process_time()
+        response = self.client.open(url, method=method, **kwargs)
+        body = response.get_data()
+        self.cpu += time.process_time() - started
+        self.requests += 1
+        self.bytes += len(body)
+        self.statuses.append(response.status_code)
+        return response
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', choices=sorted(dataset.SCALES), default='10k')
+    parser.add_argument('--clicks', type=int, default=20)
+    parser.add_argument('--response-cache', action='store_true', help='serve repeated pages from the response cache')
+    args = parser.parse_args()
+
+    with dataset.temp_app('session', RESPONSE_CACHE=args.response_cache,
+                          ENABLE_PASSWORD_PROTECTION=False) as (app, _):
+        from app import db
+        with app.app_context():
+            dataset.seed(db.engine, db.metadata, **dataset.SCALES[args.scale], seed=1)
+        steps = interactions(args.clicks)
+
+        # Warm-up: the first requests of a process import and compile templates
+        warm = Replay(app)
+        warm.request('GET', '/')
+        warm.request('GET', '/api/items')
+
+        server = Replay(app)
+        server.request('GET', '/')
+        for sort, order, search in steps:
+            server.request('GET', f'/?sort={sort}&order={order}&search={search}')
+        server.request('GET', '/')
+
+        browser = Replay(app)
+        browser.request('GET', '/')
+        etag = browser.request('GET', '/api/items').headers['ETag']
+        sort, order, search = steps[-1]
+        browser.request('POST', '/dashboard_state', json={'sort': sort, 'order': order, 'search': '', 'filter': search})
+        browser.request('GET', '/')
+        browser.request('GET', '/api/items', headers={'If-None-Match': etag})
+
+    print(f'{len(steps)} interactions ({args.clicks} sorts, {len(steps) - args.clicks} searches), '
+          f"response cache {'on' if args.response_cache else 'off'}")
+    for name, replay in (('server', server), ('browser', browser)):
+        print(f'{name:<8} {replay.requests:4d} requests  {replay.bytes / 1024:9.1f} KB  '
+              f'{replay.cpu * 1000:8.1f} ms CPU')
+    print(f'browser / server: {browser.requests / server.requests:.2f} requests, '
+          f'{browser.cpu / server.cpu:.2f} CPU')
+    failed = [status for status in server.statuses + browser.statuses if status >= 400]
+    sys.exit(1 if failed or browser.requests >= server.requests or browser.cpu >= server.cpu else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""Measure how long edits wait while a large "delete all" runs.
+
+Seeds a temporary SQLite database with the synthetic dataset, then deletes
+every item matching --search through the delete page's "delete all" while
+another thread keeps saving edits to items that stay. Reports the delete's
+duration, the edits' p50/p95/max latency during it, and checks that no
+history or activity of the deleted items is left. Run it with
+--batch-items larger than the match count to see one single transaction.
+
+    python benchmarks/bench_delete.py --scale 10k --search review
+    python benchmarks/bench_delete.py --scale 10k --search review --batch-items 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import dataset
+from load_test import TestClientSession, percentile
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', choices=sorted(dataset.SCALES), default='10k')
+    parser.add_argument('--search', default='review', help='the items to delete')
+    parser.add_argument('--batch-items', type=int, help='DELETE_BATCH_ITEMS, defaults to the configured one')
+    parser.add_argument('--edit-interval', type=float, default=0.02, help='seconds between edits')
+    args = parser.parse_args()
+
+    settings = {'DELETE_BATCH_ITEMS': args.batch_items} if args.batch_items else {}
+    with dataset.temp_app('delete', **settings) as (app, _):
+        from app import db, apply_search, StudyItem
+        from config import Config
+        import deletion
+        with app.app_context():
+            dataset.seed(db.engine, db.metadata, **dataset.SCALES[args.scale], seed=1)
+            doomed = set(db.session.scalars(apply_search(db.select(StudyItem.id), args.search)))
+            kept = sorted(set(db.session.scalars(db.select(StudyItem.id))) - doomed)
+            history = db.session.execute(db.select(db.func.count()).where(
+                db.text('item_id IN (SELECT id FROM study_item)')).select_from(db.text('update_history'))).scalar()
+        print(f'deleting {len(doomed)} of {len(doomed) + len(kept)} items ({history} history rows in all), '
+              f'{Config.DELETE_BATCH_ITEMS} per transaction')
+
+        stop = threading.Event()
+        latencies = []
+
+        def editor():
+            session, rng = TestClientSession(app), random.Random(1)
+            while not stop.is_set():
+                item = rng.choice(kept)
+                started = time.perf_counter()
+                session.request('POST', f'/edit/{item}', {
+                    'title': f'Delete test {item}', 'hours_spent': str(rng.randint(0, 400) / 4),
+                    'progress': str(rng.randint(0, 100)), 'theory_confidence': '2', 'practical_confidence': '2'})
+                latencies.append(time.perf_counter() - started)
+                time.sleep(args.edit_interval)
+
+        thread = threading.Thread(target=editor)
+        thread.start()
+        time.sleep(0.5)
+        latencies.clear()
+        started = time.perf_counter()
+        TestClientSession(app).request('POST', '/bulk_delete', {'action': 'all', 'search': args.search})
+        elapsed = time.perf_counter() - started
+        stop.set()
+        thread.join()
+
+        with app.app_context():
+            left = db.session.scalar(db.select(db.func.count()).where(StudyItem.id.in_(doomed)))
+            with db.engine.connect() as conn:
+                orphans = deletion.count_orphans(conn, db.metadata)
+
+    latencies.sort()
+    print(f'deleted in {elapsed:.2f}s; {len(latencies)} edits meanwhile, p50 {percentile(latencies, 50) * 1000:.1f} ms, '
+          f'p95 {percentile(latencies, 95) * 1000:.1f} ms, max {latencies[-1] * 1000:.1f} ms')
+    print(f'items left {left}, orphaned rows {orphans}')
+    sys.exit(1 if left or any(orphans.values()) else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""Measure item saves per second with concurrent writers.
+
+Starts N writer threads (default 8) that keep posting the edit form for
+random items of a file-backed SQLite database through the Flask test client,
+then reports saves/sec, failed saves and history rows written.
+
+    python benchmarks/bench_edit.py --writers 8 --seconds 10
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import dataset
+
+
+def writer(app, item_ids, deadline, results, seed):
+    rng = random.Random(seed)
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['logged_in'] = True
+    saves = failures = 0
+    while time.perf_counter() < deadline:
+        item_id = rng.choice(item_ids)
+        try:
+            response = client.post(f'/edit/{item_id}', data={
+                'title': f'Topic {item_id}',
+                'notes': 'benchmark',
+                'hours_spent': str(rng.randint(0, 400) / 4),
+                'progress': str(rng.randint(0, 100)),
+                'theory_confidence': str(rng.randint(0, 5)),
+                'practical_confidence': str(rng.randint(0, 5)),
+            })
+            if response.status_code == 302 and '/edit/' not in response.location:
+                saves += 1
+            else:
+                failures += 1
+        except Exception:
+            failures += 1
+    results.append((saves, failures))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--writers', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--items', type=int, default=50)
+    args = parser.parse_args()
+
+    with dataset.temp_app('bench') as (app, _):
+        from app import db, StudyItem, UpdateHistory
+
+        with app.app_context():
+            db.session.execute(StudyItem.__table__.insert(),
+                               [{'title': f'Topic {i}'} for i in range(args.items)])
+            db.session.commit()
+            item_ids = [row.id for row in db.session.query(StudyItem.id)]
+
+        results = []
+        deadline = time.perf_counter() + args.seconds
+        threads = [threading.Thread(target=writer, args=(app, item_ids, deadline, results, seed))
+                   for seed in range(args.writers)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        saves = sum(result[0] for result in results)
+        failures = sum(result[1] for result in results)
+        with app.app_context():
+            history_rows = db.session.query(UpdateHistory).count()
+            items_without_history = db.session.query(StudyItem).filter(
+                StudyItem.operation_type == 'modify', ~StudyItem.update_history.any()).count()
+
+    print(f'{args.writers} writers, {elapsed:.1f}s: {saves} saves ({saves / elapsed:.1f} saves/sec), '
+          f'{failures} failed')
+    print(f'history rows: {history_rows}, modified items without history: {items_without_history}')
+
+
+if __name__ == '__main__':
+    main()
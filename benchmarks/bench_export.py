@@ -0,0 +1,77 @@
+"""Export a large update history in every format and check memory stays flat.
+
+Seeds a temporary SQLite database with the synthetic dataset (close to a million
+update_history rows by default), then downloads /export/history in CSV,
+NDJSON and XLSX through the test client, reading the streamed response chunk
+by chunk as a browser would. Reports rows per second, bytes and how much the
+process' resident memory grew while exporting, which must stay under
+--max-mb however many rows there are.
+
+    python benchmarks/bench_export.py --items 10000 --updates 100 --max-mb 64
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import dataset
+
+
+def rss_mb():
+    with open('/proc/self/status') as f:
+        return next(int(line.split()[1]) for line in f if line.startswith('VmRSS:')) / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--items', type=int, default=10000)
+    parser.add_argument('--days', type=int, default=730)
+    parser.add_argument('--updates', type=int, default=100)
+    parser.add_argument('--formats', default='csv,ndjson,xlsx')
+    parser.add_argument('--max-mb', type=float, default=64, help='resident memory growth allowed per export')
+    args = parser.parse_args()
+
+    # SQLite's page cache and memory map count as resident memory too and
+    # fill up with the first export, keep them small to measure the export
+    with dataset.temp_app('export', SQLITE_CACHE_SIZE=-2000, SQLITE_MMAP_SIZE=0) as (app, _):
+        from app import db
+
+        started = time.perf_counter()
+        with app.app_context():
+            counts = dataset.seed(db.engine, db.metadata, items=args.items, days=args.days, updates=args.updates)
+        rows = counts['update_history']
+        print(f'seeded {rows} history rows in {time.perf_counter() - started:.1f}s')
+
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['logged_in'] = True
+
+        failed = False
+        for fmt in args.formats.split(','):
+            baseline = peak = rss_mb()
+            started = time.perf_counter()
+            response = client.get(f'/export/history.{fmt}', buffered=False)
+            size = lines = 0
+            for count, chunk in enumerate(response.response):
+                size += len(chunk)
+                lines += chunk.count(b'\n')
+                if count % 10 == 0:
+                    peak = max(peak, rss_mb())
+            response.close()
+            elapsed = time.perf_counter() - started
+            peak = max(peak, rss_mb()) - baseline
+            # History fields hold no line breaks: one line per row, plus the CSV header
+            expected = {'csv': rows + 1, 'ndjson': rows}.get(fmt)
+            ok = response.status_code == 200 and peak <= args.max_mb and expected in (None, lines)
+            failed = failed or not ok
+            print(f"{'ok  ' if ok else 'FAIL'} {fmt:<6} {rows / elapsed:9.0f} rows/s  {size / 1024 / 1024:7.1f} MB  "
+                  f'memory +{peak:5.1f} MB  {elapsed:5.1f}s' + (f'  {lines} lines' if expected is not None else ''))
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
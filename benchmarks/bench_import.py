@@ -0,0 +1,99 @@
+"""Benchmark the bulk import job on a synthetic workbook.
+
+Builds a synthetic workbook (default 100k rows) and runs it through
+run_import_job, the job the /bulk_import route queues, against a temporary
+SQLite database: open_sheet, the chunked parsing with its progress commits,
+the insert and the daily activity rows. The timed run is not traced; peak
+Python memory is taken by tracemalloc in a second run on a fresh database.
+
+    python benchmarks/bench_import.py --rows 100000
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from openpyxl import Workbook  # noqa: E402
+
+import dataset  # noqa: E402
+
+# Columns of build_workbook, as the import form maps them
+MAPPING = {
+    'title': [0, 1], 'notes': [2], 'hours_spent': 3,
+    'progress': 4, 'theory_confidence': 5, 'practical_confidence': 6,
+}
+
+
+def build_workbook(path, rows):
+    workbook = Workbook(write_only=True)
+    workbook.create_sheet('Blueprint')
+    sheet = workbook.create_sheet('Tracking')
+    sheet.append(['Section', 'Topic', 'Notes', 'Hours', 'Progress', 'Theory', 'Practical'])
+    for i in range(rows):
+        sheet.append([
+            f'{i % 7 + 1}.{i % 13}',
+            f'Topic {i}',
+            f'Notes for topic {i}' if i % 3 else None,
+            (i % 50) / 4,
+            str(i % 130) if i % 11 else 'n/a',
+            i % 8 - 1,
+            None if i % 5 == 0 else i % 6,
+        ])
+    workbook.save(path)
+
+
+def run_job(workbook, name):
+    """Import the workbook into a new database like an uploaded file, returns (job, seconds)."""
+    with dataset.temp_app(name) as (app, tmp):
+        from app import db, run_import_job, ImportJob
+        job_id = uuid.uuid4().hex
+        # The job deletes its upload when done
+        upload = os.path.join(tmp, f'{job_id}_synthetic.xlsx')
+        shutil.copyfile(workbook, upload)
+        with app.app_context():
+            db.session.add(ImportJob(id=job_id, filename='synthetic.xlsx', status='queued', errors=[]))
+            db.session.commit()
+        started = time.perf_counter()
+        run_import_job(app, job_id, upload, 'Tracking', 2, MAPPING)
+        elapsed = time.perf_counter() - started
+        with app.app_context():
+            job = db.session.get(ImportJob, job_id)
+            db.session.expunge(job)
+    return job, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        import excel_import  # noqa: F401  pandas and numpy load outside the timed run
+        workbook = os.path.join(tmp, 'synthetic.xlsx')
+        build_workbook(workbook, args.rows)
+        print(f'workbook: {args.rows} rows, {os.path.getsize(workbook) / 1e6:.1f} MB')
+
+        job, elapsed = run_job(workbook, 'timed')
+        if job.status != 'done':
+            sys.exit(f'import {job.status}: {job.error}')
+        print(f'inserted: {job.rows_inserted} rows in {elapsed:.2f}s ({job.rows_inserted / elapsed:,.0f} rows/sec), '
+              f'{len(job.errors)} row errors kept')
+
+        tracemalloc.start()
+        job, _ = run_job(workbook, 'traced')
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        if job.status != 'done':
+            sys.exit(f'import {job.status}: {job.error}')
+    print(f'peak traced memory: {peak / 1e6:.1f} MB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""Compare full-text search with the LIKE fallback.
+
+Fills an SQLite database with synthetic study items (default 50k) and times
+the dashboard search filter (COUNT over the matches plus the first page) for
+the FTS5 backend and for LIKE on title and notes.
+
+    python benchmarks/bench_search.py --items 50000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import dataset
+
+WORDS = ('ospf bgp eigrp isis mpls ldp rsvp vxlan evpn lisp multicast pim igmp qos '
+         'netconf restconf yang ansible python sdwan vmanage dmvpn ipsec nat dhcp '
+         'ipv6 route reflector redistribution summarization filtering troubleshooting').split()
+QUERIES = ['ospf', 'redistrib', 'bgp route reflector', 'vxlan evpn', 'yang netconf python']
+
+
+def fill(db, StudyItem, count):
+    rng = random.Random(42)
+    # Technology keywords are rare among a large filler vocabulary, like real notes
+    filler = [''.join(rng.choices('abcdefghijklmnopqrstuvwxyz', k=rng.randint(3, 9))) for _ in range(5000)]
+    rows = [{
+        'title': f'{rng.randint(1, 9)}.{rng.randint(1, 20)} ' + ' '.join(rng.sample(WORDS, 2)),
+        'notes': ' '.join(rng.choices(filler, k=60) + rng.sample(WORDS, 2)),
+    } for _ in range(count)]
+    db.session.execute(StudyItem.__table__.insert(), rows)
+    db.session.commit()
+
+
+def timed(db, StudyItem, clause, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        matches = db.session.query(db.func.count(StudyItem.id)).filter(clause).scalar()
+        db.session.query(StudyItem).filter(clause).order_by(
+            StudyItem.last_modified.desc(), StudyItem.id.desc()).limit(100).all()
+    return matches, (time.perf_counter() - started) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--items', type=int, default=50_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with dataset.temp_app('bench') as (app, _):
+        import search
+        from app import db, StudyItem
+
+        with app.app_context():
+            fill(db, StudyItem, args.items)
+            print(f'{args.items} items, search backend: {search.backend(db.engine)}')
+            print(f"{'query':<24}{'matches':>9}{'fts ms':>10}{'like ms':>10}{'speedup':>9}")
+            for query in QUERIES:
+                fts_clause = search.match_clause(StudyItem, query, 'fts5')
+                like_clause = db.and_(*[db.or_(StudyItem.title.ilike(f'%{term}%'), StudyItem.notes.ilike(f'%{term}%'))
+                                        for term in search.tokenize(query)])
+                fts_matches, fts_ms = timed(db, StudyItem, fts_clause, args.repeat)
+                _, like_ms = timed(db, StudyItem, like_clause, args.repeat)
+                print(f'{query:<24}{fts_matches:>9}{fts_ms:>10.1f}{like_ms:>10.1f}{like_ms / fts_ms:>8.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""Load test for "database is locked" errors on SQLite.
+
+Runs the shipped deployment shape (4 processes x 2 threads) against one
+SQLite file twice: once with the previous behaviour (rollback journal, full
+sync, only the driver's default 5s busy wait) and once with the connection
+profile defaults from Config. Every thread mixes
+dashboard reads with item saves through the Flask test client and the
+occasional large write transaction, and counts requests that failed with a
+lock error.
+
+    python benchmarks/bench_sqlite_locks.py --seconds 10
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+PROFILES = {
+    'before': {'SQLITE_JOURNAL_MODE': 'DELETE', 'SQLITE_SYNCHRONOUS': 'FULL', 'SQLITE_BUSY_TIMEOUT': '5000',
+               'SQLITE_CACHE_SIZE': '-2000', 'SQLITE_MMAP_SIZE': '0', 'SQLITE_TEMP_STORE': 'DEFAULT'},
+    'after': {},
+}
+
+
+def bulk_write(app):
+    # A large write transaction, like a bulk import or a bulk delete
+    from app import db, StudyItem
+    with app.app_context():
+        db.session.execute(StudyItem.__table__.insert(), [{'title': 'bulk'}] * 5000)
+        db.session.query(StudyItem).filter(StudyItem.title == 'bulk').delete()
+        db.session.commit()
+
+
+def worker_thread(app, seconds, item_ids, counts, seed):
+    rng = random.Random(seed)
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['logged_in'] = True
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        try:
+            roll = rng.random()
+            if roll < 0.02:
+                bulk_write(app)
+                counts['ok'] += 1
+                continue
+            if roll < 0.3:
+                item_id = rng.choice(item_ids)
+                response = client.post(f'/edit/{item_id}', data={
+                    'title': f'Topic {item_id}', 'notes': '',
+                    'hours_spent': str(rng.randint(0, 100)), 'progress': str(rng.randint(0, 100)),
+                    'theory_confidence': '1', 'practical_confidence': '1'})
+            else:
+                response = client.get('/')
+            counts['ok' if response.status_code < 500 else 'error'] += 1
+        except Exception as e:
+            counts['locked' if 'database is locked' in str(e) else 'error'] += 1
+
+
+def run_worker(seconds, threads, seed):
+    """Entry point of one worker process, prints its counters."""
+    from app import create_app, db, StudyItem
+    app = create_app()
+    app.config['PROPAGATE_EXCEPTIONS'] = True
+    with app.app_context():
+        item_ids = [row.id for row in db.session.query(StudyItem.id)]
+    counts = {'ok': 0, 'locked': 0, 'error': 0}
+    workers = [threading.Thread(target=worker_thread, args=(app, seconds, item_ids, counts, seed * 100 + i))
+               for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    print(counts['ok'], counts['locked'], counts['error'])
+
+
+def run_profile(name, args):
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.db')}", **PROFILES[name])
+        seed = ('import sys; sys.path.insert(0, %r); from app import db, create_app, StudyItem\n'
+                'app = create_app()\n'
+                'with app.app_context():\n'
+                '    db.session.execute(StudyItem.__table__.insert(), [{"title": f"Topic {i}"} for i in range(%d)])\n'
+                '    db.session.commit()') % (ROOT, args.items)
+        subprocess.run([sys.executable, '-c', seed], env=env, check=True)
+
+        processes = [subprocess.Popen(
+            [sys.executable, __file__, '--worker', '--seconds', str(args.seconds),
+             '--threads', str(args.threads), '--seed', str(i)],
+            env=env, stdout=subprocess.PIPE, text=True) for i in range(args.processes)]
+        totals = [0, 0, 0]
+        for process in processes:
+            output, _ = process.communicate()
+            for i, value in enumerate(output.split()[-3:]):
+                totals[i] += int(value)
+    ok, locked, errors = totals
+    print(f'{name:<7} requests ok: {ok:>6} ({ok / args.seconds:.0f}/s)  locked: {locked:>5}  other errors: {errors}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=2)
+    parser.add_argument('--items', type=int, default=500)
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--seed', type=int, default=0, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.seconds, args.threads, args.seed)
+        return
+    print(f'{args.processes} processes x {args.threads} threads, {args.seconds:.0f}s per profile, '
+          f'{multiprocessing.cpu_count()} CPUs')
+    for name in PROFILES:
+        run_profile(name, args)
+
+
+if __name__ == '__main__':
+    main()
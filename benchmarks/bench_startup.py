@@ -0,0 +1,80 @@
+"""Measure the cold start of a worker: import and app creation time and resident memory.
+
+Every run starts a fresh interpreter that imports app and builds the app on
+an existing SQLite database, like a gunicorn worker or a flask CLI command
+does, and reports the time taken and the process' resident set size. With
+--ref the same is measured on another git revision of the repo (exported to
+a temporary directory), for a before/after comparison.
+
+    python benchmarks/bench_startup.py --runs 10 --ref 545b16b
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = '''
+import json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+if hasattr(app, 'create_app'):
+    app.create_app()
+created = time.perf_counter()
+with open('/proc/self/status') as f:
+    rss = next(int(line.split()[1]) for line in f if line.startswith('VmRSS:'))
+print(json.dumps({'import_ms': (imported - started) * 1000, 'total_ms': (created - started) * 1000,
+                  'rss_mb': rss / 1024, 'pandas': 'pandas' in sys.modules, 'modules': len(sys.modules)}))
+'''
+
+
+def measure(source, runs):
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'startup.db')}",
+                   RESPONSE_CACHE_PATH=os.path.join(tmp, 'response_cache.db'),
+                   METRICS_PATH=os.path.join(tmp, 'metrics.db'), PYTHONDONTWRITEBYTECODE='')
+        samples = []
+        # The first run creates the database and warms the bytecode cache
+        for _ in range(runs + 1):
+            output = subprocess.run([sys.executable, '-c', PROBE], cwd=source, env=env,
+                                    check=True, capture_output=True, text=True).stdout
+            samples.append(json.loads(output.strip().splitlines()[-1]))
+        samples = samples[1:]
+    return {
+        'import_ms': statistics.median(sample['import_ms'] for sample in samples),
+        'total_ms': statistics.median(sample['total_ms'] for sample in samples),
+        'rss_mb': statistics.median(sample['rss_mb'] for sample in samples),
+        'pandas_loaded': samples[0]['pandas'],
+        'modules': samples[0]['modules'],
+    }
+
+
+def report(name, result):
+    print(f"{name:<12} import {result['import_ms']:7.1f} ms  ready {result['total_ms']:7.1f} ms  "
+          f"RSS {result['rss_mb']:6.1f} MB  {result['modules']} modules, "
+          f"pandas {'loaded' if result['pandas_loaded'] else 'not loaded'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--ref', help='git revision to compare with, e.g. the commit before the app factory')
+    args = parser.parse_args()
+
+    results = {'working tree': measure(ROOT, args.runs)}
+    if args.ref:
+        with tempfile.TemporaryDirectory() as tmp:
+            archive = subprocess.run(['git', 'archive', args.ref], cwd=ROOT, check=True, capture_output=True).stdout
+            subprocess.run(['tar', '-x', '-C', tmp], input=archive, check=True)
+            results[args.ref] = measure(tmp, args.runs)
+    for name, result in results.items():
+        report(name, result)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""Check the year heatmap stays within a query and latency budget.
+
+Seeds a file-backed SQLite database with update history for ITEMS items
+over the DAYS days up to the end of YEAR, a third of the items active on
+each day (defaults 2000 items x 1500 days = 1M rows), and derives the
+daily_activity rows the year view reads from it. Then requests the year view
+and its JSON endpoint through the Flask test client with the response cache
+off, so every request runs the query, counting the SQL statements each one
+runs. Exits non-zero when a request runs more statements or takes longer
+than allowed.
+
+    python benchmarks/bench_year_view.py --items 2000 --days 1500 --max-queries 2 --max-ms 2000
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import event
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import activity  # noqa: E402
+import dataset  # noqa: E402
+
+
+def seed(db, StudyItem, UpdateHistory, items, days, year):
+    first_day = date(year, 12, 31) - timedelta(days=days - 1)
+    now = datetime(year, 12, 31, 12)
+    db.session.execute(StudyItem.__table__.insert(), [
+        {'title': f'Topic {i}', 'last_modified': now - timedelta(days=i % 365), 'created_at': now}
+        for i in range(items)
+    ])
+    batch = []
+    for item_id in range(1, items + 1):
+        for offset in range(days):
+            if (item_id + offset) % 3:
+                continue
+            batch.append({'item_id': item_id, 'date': first_day + timedelta(days=offset),
+                          'delta': {}, 'previous_values': {}, 'created_at': now, 'updated_at': now})
+            if len(batch) >= 50000:
+                db.session.execute(UpdateHistory.__table__.insert(), batch)
+                batch = []
+    if batch:
+        db.session.execute(UpdateHistory.__table__.insert(), batch)
+    db.session.commit()
+    with db.engine.begin() as conn:
+        activity_rows = activity.rebuild(conn, db.metadata)
+    return db.session.query(UpdateHistory).count(), activity_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--items', type=int, default=2000)
+    parser.add_argument('--days', type=int, default=1500)
+    parser.add_argument('--year', type=int, default=2025)
+    parser.add_argument('--max-queries', type=int, default=2, help='the data version and the year query')
+    parser.add_argument('--max-ms', type=float, default=2000)
+    args = parser.parse_args()
+
+    with dataset.temp_app('bench') as (app, _):
+        from app import db, StudyItem, UpdateHistory
+
+        with app.app_context():
+            started = time.perf_counter()
+            rows, activity_rows = seed(db, StudyItem, UpdateHistory, args.items, args.days, args.year)
+            db.session.execute(db.text('ANALYZE'))
+            print(f'seeded {rows} history and {activity_rows} daily activity rows '
+                  f'in {time.perf_counter() - started:.1f}s')
+
+            statements = []
+            event.listen(db.engine, 'before_cursor_execute',
+                         lambda conn, cursor, statement, *rest: statements.append(statement))
+
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['logged_in'] = True
+
+        failed = False
+        for url in (f'/calendar/year/{args.year}', f'/calendar/year/{args.year}.json'):
+            client.get(url)  # Loads the template and SQLite's page cache, the response itself is not cached
+            statements.clear()
+            started = time.perf_counter()
+            response = client.get(url)
+            elapsed = (time.perf_counter() - started) * 1000
+            ok = response.status_code == 200 and len(statements) <= args.max_queries and elapsed <= args.max_ms
+            failed = failed or not ok
+            print(f"{'ok  ' if ok else 'FAIL'} {url}: {response.status_code}, "
+                  f'{len(statements)} queries, {elapsed:.0f} ms')
+            if not ok:
+                for statement in statements:
+                    print('    ' + ' '.join(statement.split()))
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""Check that history compaction keeps every series identical at its resolution.
+
+Seeds a temporary SQLite database with the synthetic dataset, loads every
+item's history series, runs `compact-history` and loads them again. Each
+series is then read at the end of every period (every day in the daily
+window, every Sunday in the weekly one and every month end before that) and
+must give the same values as before. Reports the rows and space reclaimed,
+and checks that a second run finds nothing left to compact and that
+`rebuild-activity` leaves the calendar activity of compacted days as it was.
+
+    python benchmarks/check_compaction.py --items 1000 --days 730 --updates 100
+"""
+import argparse
+import bisect
+import calendar
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def is_period_end(day, today, daily_days, weekly_days):
+    """Whether day closes its own period: any day of the daily window, a Sunday, the end of a month."""
+    import compaction
+    key = compaction.period(day, today, daily_days, weekly_days)
+    if key is None:
+        return True
+    resolution, start = key
+    if resolution == 'week':
+        return day == start + timedelta(days=6)
+    return day.day == calendar.monthrange(day.year, day.month)[1]
+
+
+def value_at(series, day):
+    # The point in force on day, values carry forward
+    position = bisect.bisect_right(series['dates'], day.isoformat())
+    if not position:
+        return None
+    return tuple(series[field][position - 1] for field in ('hours_spent', 'progress',
+                                                           'theory_confidence', 'practical_confidence'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--items', type=int, default=1000)
+    parser.add_argument('--days', type=int, default=730)
+    parser.add_argument('--updates', type=int, default=100)
+    args = parser.parse_args()
+
+    import dataset
+    with dataset.temp_app('compaction') as (app, _):
+        from app import db, DailyActivity
+        from config import Config
+        import series
+
+        with app.app_context():
+            dataset.seed(db.engine, db.metadata, items=args.items, days=args.days, updates=args.updates)
+            with db.engine.connect() as conn:
+                item_ids = list(range(1, args.items + 1))
+                before = series.load(conn, db.metadata, item_ids)
+            today = datetime.utcnow().date()
+
+            started = time.perf_counter()
+            report = app.test_cli_runner().invoke(args=['compact-history'])
+            elapsed = time.perf_counter() - started
+            print(report.output.rstrip())
+            print(f'compacted in {elapsed:.1f}s')
+            with db.engine.connect() as conn:
+                after = series.load(conn, db.metadata, item_ids)
+            again = app.test_cli_runner().invoke(args=['compact-history']).output.splitlines()[0]
+
+            # The calendars' activity of compacted days must survive a rebuild
+            cutoff = today - timedelta(days=Config.HISTORY_DAILY_DAYS)
+            compacted_activity = select(DailyActivity.date, DailyActivity.item_id, DailyActivity.hours_added,
+                                        DailyActivity.progress_gained).where(DailyActivity.date <= cutoff)
+            activity_before = set(db.session.execute(compacted_activity).all())
+            print(app.test_cli_runner().invoke(args=['rebuild-activity']).output.rstrip())
+            activity_lost = len(activity_before ^ set(db.session.execute(compacted_activity).all()))
+
+        first_day = today - timedelta(days=args.days)
+        samples = [day for day in (first_day + timedelta(days=offset) for offset in range(args.days + 1))
+                   if is_period_end(day, today, Config.HISTORY_DAILY_DAYS, Config.HISTORY_WEEKLY_DAYS)]
+        mismatches = 0
+        for item_id in item_ids:
+            for day in samples:
+                if value_at(before[item_id], day) != value_at(after[item_id], day):
+                    mismatches += 1
+                    if mismatches <= 10:
+                        print(f'FAIL item {item_id} on {day}: {value_at(before[item_id], day)} '
+                              f'before, {value_at(after[item_id], day)} after')
+        points = sum(len(item['dates']) for item in before.values()), sum(len(item['dates']) for item in after.values())
+        print(f'series points: {points[0]} -> {points[1]}, {mismatches} mismatches')
+        print(f'second run: {again}')
+        print(f'activity of compacted days changed by rebuild-activity: {activity_lost} rows')
+        failed = mismatches or activity_lost or '(0 removed)' not in again
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
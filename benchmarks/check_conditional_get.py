@@ -0,0 +1,120 @@
+"""Check that revalidating an unchanged page returns 304 without rendering it.
+
+Seeds a temporary SQLite database, then for each read route requests the
+page once and again with its ETag and Last-Modified. The first must render
+the route's own template (or JSON) and content, the second must
+return 304 Not Modified, run at most --max-queries SQL statements and render
+no template. After an edit, the old ETag must yield a fresh 200, and so must
+the Last-Modified of a page served between two edits in the same second.
+tests/test_conditional_get.py runs the same check under pytest.
+
+    python benchmarks/check_conditional_get.py
+"""
+import argparse
+import os
+import sys
+import time
+
+from flask import template_rendered
+from sqlalchemy import event
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import dataset  # noqa: E402
+
+# (url, template the first request must render, text its body must contain); JSON routes render none
+ROUTES = [
+    ('/', 'index.html', 'Total Items'),
+    ('/?sort=title&order=asc', 'index.html', 'Total Items'),
+    ('/calendar', 'calendar.html', 'class="calendar-grid"'),
+    ('/calendar/year/2026', 'calendar_year.html', 'class="year-heatmap"'),
+    ('/calendar/year/2026.json', None, '"year":2026'),
+    ('/item/1/history', 'item_history.html', 'Topic one'),
+    ('/api/items/1/series', None, '"title":"Topic one"'),
+    ('/api/series?ids=1,2', None, '"dates"'),
+    ('/api/items', None, '"title":["Topic one","Topic two"]'),
+    ('/search?q=topic', None, '"query":"topic"'),
+]
+
+
+EDIT = {'title': 'Topic one', 'hours_spent': '2', 'progress': '20',
+        'theory_confidence': '1', 'practical_confidence': '1'}
+
+
+def check(max_queries=1, out=print):
+    """Revalidate every route in ROUTES, print one line each and return the checks that failed."""
+    with dataset.temp_app('check', RESPONSE_CACHE=True) as (app, _):
+        from app import db
+
+        statements = []
+        renders = []
+        with app.app_context():
+            event.listen(db.engine, 'before_cursor_execute',
+                         lambda conn, cursor, statement, *rest: statements.append(statement))
+
+        def rendered(sender, template, context, **extra):
+            renders.append(template.name)
+
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['logged_in'] = True
+        for title in ('Topic one', 'Topic two'):
+            client.post('/add', data={'title': title, 'hours_spent': '1', 'progress': '10',
+                                      'theory_confidence': '1', 'practical_confidence': '1'})
+        client.get('/')  # consume the flash messages
+        time.sleep(1)  # Last-Modified is only sent once the second of the last write is over
+
+        failed = []
+
+        def report(ok, name, line):
+            if not ok:
+                failed.append(name)
+            out(f"{'ok  ' if ok else 'FAIL'} {name}: {line}")
+
+        with template_rendered.connected_to(rendered, app):
+            for url, template, text in ROUTES:
+                renders.clear()
+                app.extensions['response_cache'].clear()  # A cache hit renders nothing
+                first = client.get(url)
+                body = first.get_data(as_text=True).replace(': ', ':').replace(', ', ',')
+                ok = first.status_code == 200 and renders[:1] == ([template] if template else []) and text in body
+                report(ok, url, f"{first.status_code}, rendered {', '.join(renders) or 'JSON'}")
+                for name, headers in (('If-None-Match', {'If-None-Match': first.headers.get('ETag', '')}),
+                                      ('If-Modified-Since', {'If-Modified-Since': first.headers.get('Last-Modified', '')})):
+                    statements.clear()
+                    renders.clear()
+                    response = client.get(url, headers=headers)
+                    ok = (first.status_code == 200 and response.status_code == 304
+                          and len(statements) <= max_queries and not renders and not response.data)
+                    report(ok, f'{url} [{name}]', f'{response.status_code}, {len(statements)} queries, {len(renders)} renders')
+                    if not ok:
+                        for statement in statements:
+                            out('    ' + ' '.join(statement.split()))
+
+        etag = client.get('/').headers['ETag']
+        client.post('/edit/1', data=EDIT)
+        client.get('/')  # consume the flash message
+        response = client.get('/', headers={'If-None-Match': etag})
+        report(response.status_code == 200 and response.headers['ETag'] != etag, '/ after an edit',
+               str(response.status_code))
+
+        # Edits take milliseconds, the page between them is served in the same second as the first
+        last_modified = client.get('/').headers.get('Last-Modified')
+        client.post('/edit/1', data=dict(EDIT, progress='30'))
+        client.get('/')  # consume the flash message
+        response = client.get('/', headers={'If-Modified-Since': last_modified} if last_modified else {})
+        report(response.status_code == 200, '/ after two edits in a second [If-Modified-Since]',
+               f"{response.status_code}, Last-Modified {last_modified or 'not sent'}")
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--max-queries', type=int, default=1)
+    args = parser.parse_args()
+    sys.exit(1 if check(args.max_queries) else 0)
+
+
+if __name__ == '__main__':
+    main()
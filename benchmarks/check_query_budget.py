@@ -0,0 +1,230 @@
+"""Fail when a route runs more SQL statements or fetches more rows than budgeted.
+
+Seeds a temporary SQLite database with the synthetic dataset, requests every
+route of app.py through the Flask test client with the response cache off,
+and compares the statements issued and the rows their SELECTs return with
+the BUDGETS below, after one warm-up pass. Over-budget routes are printed
+with their full SQL, and the script exits non-zero, so N+1 queries and query
+regressions show up before deploy. tests/test_query_budget.py runs the same
+check under pytest.
+
+    python benchmarks/check_query_budget.py --items 2000
+"""
+import argparse
+import io
+import os
+import sys
+import threading
+
+from sqlalchemy import event
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+PAGE = 100  # ITEMS_PER_PAGE used for the run
+EDIT = {'title': 'Budget check', 'hours_spent': '99', 'progress': '99',
+        'theory_confidence': '5', 'practical_confidence': '5'}
+KEY_DATE = {'name': 'Budget check', 'date': '{day}', 'notes': ''}
+UPLOAD = 'UPLOAD'  # Replaced by a fresh copy of a small workbook
+
+# (method, url, client.open keyword arguments, max statements, max rows
+# fetched); {item}, {day}, {year}, {newest_day}, {key_date}, {asset}, {job},
+# the doomed_* ids and the all_* counts (plus one) are filled in from the
+# seeded data. {newest_day} is item 3's latest history day, an update dated
+# before it would be refused as backdated.
+# Cached routes spend one statement on the data version, the ETag and cache
+# key. Rows are counted once the route has returned, so rows it deleted
+# count as none. Routes that delete run last, on rows no other route uses.
+BUDGETS = [
+    ('GET', '/', {}, 4, PAGE + 10),
+    ('GET', '/?sort=title&order=asc', {}, 4, PAGE + 10),
+    ('GET', '/?sort=progress&order=desc&search=ospf', {}, 5, 2 * PAGE + 10),
+    ('GET', '/?sort=title&order=asc&filter=ospf lab', {}, 4, PAGE + 10),
+    ('GET', '/delete', {}, 1, PAGE + 1),
+    ('GET', '/search?q=bgp lab', {}, 2, 21),
+    ('GET', '/api/items', {}, 2, '{all_items}'),
+    ('GET', '/api/items?search=ospf', {}, 2, '{all_items}'),
+    ('GET', '/calendar', {}, 3, 60),
+    ('GET', '/calendar/day/{day}', {}, 3, 600),
+    ('GET', '/calendar/year/{year}', {}, 2, 367),
+    ('GET', '/calendar/year/{year}.json', {}, 2, 367),
+    ('GET', '/item/{item}/history', {}, 2, 51),
+    ('GET', '/api/items/{item}/series', {}, 2, 51),
+    ('GET', '/api/series?ids=1,2,3,4,5', {}, 2, 251),
+    ('GET', '/api/v1/items/{item}', {}, 1, 1),
+    ('GET', '/api/v1/key_dates', {}, 1, 50),
+    ('GET', '/export/items.csv', {}, 1, '{all_items}'),
+    ('GET', '/export/history.ndjson?search=ospf', {}, 1, '{all_history}'),
+    ('GET', '/export/key_dates.csv', {}, 1, '{all_key_dates}'),
+    ('GET', '/add', {}, 0, 0),
+    ('GET', '/edit/{item}', {}, 1, 1),
+    ('GET', '/key_date/add', {}, 0, 0),
+    ('GET', '/key_date/edit/{key_date}', {}, 1, 1),
+    ('GET', '/bulk_import', {}, 1, 0),
+    ('GET', '/bulk_import/jobs/{job}', {}, 1, 1),
+    ('GET', '/admin/backups', {}, 0, 0),
+    ('GET', '/assets/{asset}', {}, 0, 0),
+    ('GET', '/metrics', {}, 0, 0),
+    ('GET', '/healthz', {}, 0, 0),
+    ('GET', '/readyz', {}, 1, 1),
+    ('GET', '/login', {}, 0, 0),
+    ('POST', '/login', {'data': {'password': 'budget'}}, 0, 0),
+    ('GET', '/logout', {}, 0, 0),
+    ('POST', '/toggle_theme', {}, 0, 0),
+    ('POST', '/dashboard_state', {'json': {'sort': 'title', 'order': 'asc', 'search': 'ospf', 'filter': 'lab'}}, 0, 0),
+    ('POST', '/add', {'data': {'title': 'Budget check', 'hours_spent': '1', 'progress': '5',
+                               'theory_confidence': '1', 'practical_confidence': '1'}}, 3, 0),
+    ('POST', '/edit/{item}', {'data': EDIT}, 6, 3),
+    ('POST', '/key_date/add', {'data': KEY_DATE}, 2, 0),
+    ('POST', '/key_date/edit/{key_date}', {'data': KEY_DATE}, 3, 1),
+    ('POST', '/api/v1/items/batch', {'json': {
+        'create': [{'title': 'Budget check'}],
+        'update': [{'id': 2, 'progress': 50}, {'id': 3, 'progress': 50, 'date': '{newest_day}'}]}}, 7, 6),
+    ('POST', '/api/v1/key_dates/batch', {'json': {
+        'create': [{'name': 'Budget check', 'date': '{day}'}],
+        'update': [{'id': '{key_date}', 'notes': 'Budget check'}]}}, 4, 1),
+    ('POST', '/bulk_import', {'data': {'file': UPLOAD, 'sheet_name': 'Sheet', 'data_start_row': '2',
+                                       'title_columns': 'A', 'hours_column': 'B'}}, 1, 0),
+    ('POST', '/admin/backups', {}, 0, 0),
+    ('POST', '/delete/{doomed_item}', {}, 3, 1),
+    ('POST', '/bulk_delete', {'data': {'action': 'selected',
+                                       'item_ids': ['{doomed_selected}', '{doomed_selected_too}']}}, 2, 0),
+    ('POST', '/bulk_delete', {'data': {'action': 'all', 'search': '{doomed_search}'}}, 3, 2),
+    ('POST', '/key_date/delete/{doomed_key_date}', {}, 3, 1),
+]
+
+
+def workbook():
+    """Bytes of a two-row workbook for the bulk import route."""
+    from openpyxl import Workbook
+    book = Workbook()
+    sheet = book.active
+    sheet.title = 'Sheet'
+    sheet.append(['Title', 'Hours'])
+    sheet.append(['Budget check', 1])
+    sheet.append(['Budget check too', 2])
+    data = io.BytesIO()
+    book.save(data)
+    return data.getvalue()
+
+
+def fill(value, placeholders):
+    """value with the placeholders filled in, nested in dicts and lists."""
+    if isinstance(value, dict):
+        return {key: fill(item, placeholders) for key, item in value.items()}
+    if isinstance(value, list):
+        return [fill(item, placeholders) for item in value]
+    if not isinstance(value, str):
+        return value
+    if value.startswith('{') and value.endswith('}') and value[1:-1] in placeholders:
+        return placeholders[value[1:-1]]  # Keeps JSON ids numbers
+    return value.format(**placeholders)
+
+
+def wait_for_background_work():
+    """Join the backup thread and wait until the import workers have finished their jobs."""
+    from app import get_import_executor
+    for thread in threading.enumerate():
+        if thread.name == 'backup':
+            thread.join()
+    get_import_executor().submit(lambda: None).result()
+
+
+def check(items=2000, updates=20, verbose=False, out=print):
+    """Request every route in BUDGETS, print one line each and return the routes over budget."""
+    import dataset
+    with dataset.temp_app('budget', METRICS_ENABLED=True, ITEMS_PER_PAGE=PAGE, PASSWORD='budget') as (app, tmp):
+        from app import db, DailyActivity, ImportJob, KeyDate, UpdateHistory
+        import assets
+        result = app.test_cli_runner().invoke(args=['build-assets'])
+        if result.exit_code:
+            raise RuntimeError(result.output)
+
+        with app.app_context():
+            dataset.seed(db.engine, db.metadata, items=items, updates=updates)
+            busiest_day = db.session.query(DailyActivity.date).group_by(DailyActivity.date).order_by(
+                db.func.count().desc()).limit(1).scalar()
+            key_dates = db.session.scalars(db.select(KeyDate.id).order_by(KeyDate.id)).all()
+            newest_day = db.session.query(db.func.max(UpdateHistory.date)).filter_by(item_id=3).scalar()
+            db.session.add(ImportJob(id='budget', filename='budget.xlsx', status='done', errors=[]))
+            db.session.commit()
+            placeholders = {
+                'item': 1, 'day': busiest_day.isoformat(), 'year': busiest_day.year,
+                'newest_day': (newest_day or busiest_day).isoformat(),
+                'key_date': key_dates[0], 'job': 'budget',
+                'asset': next(iter(assets.load_manifest(os.path.join(tmp, 'assets')).values())),
+                'doomed_item': items, 'doomed_selected': items - 1, 'doomed_selected_too': items - 2,
+                'doomed_search': str(items - 3), 'doomed_key_date': key_dates[-1],
+                'all_items': items + 1, 'all_history': db.session.query(UpdateHistory).count() + 1,
+                'all_key_dates': len(key_dates) + 1,
+            }
+            statements = []
+            # Background imports and backups are not part of the route that started them
+            event.listen(db.engine, 'before_cursor_execute',
+                         lambda conn, cursor, statement, parameters, context, executemany:
+                         threading.current_thread().name.startswith('import')
+                         or statements.append((statement, parameters, executemany)))
+            raw = db.engine.raw_connection()
+        upload = workbook()
+
+        def rows_fetched(statement, parameters, executemany):
+            if executemany or not statement.lstrip().upper().startswith(('SELECT', 'WITH')):
+                return 0
+            cursor = raw.cursor()
+            cursor.execute(f'SELECT COUNT(*) FROM ({statement})', parameters)
+            return cursor.fetchone()[0]
+
+        def logged_in_client():
+            # A fresh session per route, the dashboard remembers sort and search in it
+            client = app.test_client()
+            with client.session_transaction() as session:
+                session['logged_in'] = True
+            return client
+
+        def request(method, url, kwargs):
+            kwargs = fill(kwargs, placeholders)
+            if kwargs.get('data', {}).get('file') == UPLOAD:
+                kwargs['data']['file'] = (io.BytesIO(upload), 'budget.xlsx')
+            response = logged_in_client().open(url.format(**placeholders), method=method, **kwargs)
+            response.get_data()  # Streamed responses run their queries while read
+            response.close()
+            return response
+
+        # One-off work, like probing the search backend, is not part of a route's budget
+        for method, url, kwargs, max_statements, max_rows in BUDGETS:
+            if method == 'GET':
+                request(method, url, kwargs)
+
+        failed = []
+        try:
+            for method, url, kwargs, max_statements, max_rows in BUDGETS:
+                max_rows = int(str(max_rows).format(**placeholders))
+                statements.clear()
+                response = request(method, url, kwargs)
+                issued = list(statements)
+                rows = [rows_fetched(*statement) for statement in issued]
+                ok = response.status_code < 400 and len(issued) <= max_statements and sum(rows) <= max_rows
+                if not ok:
+                    failed.append(f'{method} {url}')
+                out(f"{'ok  ' if ok else 'FAIL'} {method:4} {url.format(**placeholders)}: {response.status_code}, "
+                    f'{len(issued)}/{max_statements} statements, {sum(rows)}/{max_rows} rows')
+                if not ok or verbose:
+                    for (statement, parameters, executemany), count in zip(issued, rows):
+                        out(f'    [{count} rows] {" ".join(statement.split())}  {parameters!r:.200}')
+        finally:
+            wait_for_background_work()
+            raw.close()
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--items', type=int, default=2000)
+    parser.add_argument('--updates', type=int, default=20)
+    parser.add_argument('--verbose', action='store_true', help='print the SQL of every route')
+    args = parser.parse_args()
+    sys.exit(1 if check(args.items, args.updates, args.verbose) else 0)
+
+
+if __name__ == '__main__':
+    main()
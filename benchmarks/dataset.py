@@ -0,0 +1,148 @@
+"""Synthetic study tracker data for the benchmarks and checks.
+
+Items are created at random over the last DAYS days and updated on random
+later days, each update raising hours, progress and confidence a little,
+with a matching update_history row (previous_values and delta like the edit
+form writes them) and the daily_activity rows the app would have recorded.
+Key dates are spread around today. Rows are written in batches as they are
+generated, so millions of history rows fit in little memory.
+
+    from dataset import seed
+    seed(db.engine, db.metadata, items=1000, days=365, updates=10)
+
+temp_app() builds the app the benchmarks run against, on a database in a
+temporary directory:
+
+    with temp_app('bench', ITEMS_PER_PAGE=50) as (app, tmp):
+        ...
+"""
+import os
+import random
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta
+
+TOPICS = ['OSPF', 'BGP', 'EIGRP', 'IS-IS', 'MPLS', 'L3VPN', 'EVPN', 'VXLAN', 'QoS', 'Multicast',
+          'IPv6', 'DMVPN', 'SD-WAN', 'STP', 'LACP', 'NAT', 'IPsec', 'SNMP', 'NetFlow', 'Segment Routing']
+WORDS = ['lab', 'route', 'redistribution', 'filtering', 'summary', 'troubleshooting', 'design',
+         'convergence', 'policy', 'timers', 'authentication', 'scaling', 'review', 'notes']
+BATCH_SIZE = 10000
+
+# Preset sizes: items, days of history and updates per item
+SCALES = {
+    '1k': {'items': 1000, 'days': 365, 'updates': 20},
+    '10k': {'items': 10000, 'days': 365, 'updates': 30},
+    '100k': {'items': 100000, 'days': 730, 'updates': 30},
+}
+
+
+@contextmanager
+def temp_app(name='bench', overrides=None, **settings):
+    """Yield (app, tmp): create_app() on the SQLite file name.db in a new temporary directory.
+
+    settings replace Config attributes while the block runs and are restored
+    afterwards; os.environ is left alone, so this works after app was imported.
+    The response cache and metrics are off unless enabled in settings. Their
+    files, the built assets and the uploads go to tmp. overrides are passed to
+    create_app().
+    """
+    from config import Config
+    with tempfile.TemporaryDirectory() as tmp:
+        settings = dict({
+            'DATABASE_URL': f"sqlite:///{os.path.join(tmp, f'{name}.db')}",
+            'RESPONSE_CACHE': False,
+            'RESPONSE_CACHE_PATH': os.path.join(tmp, 'response_cache.db'),
+            'METRICS_ENABLED': False,
+            'METRICS_PATH': os.path.join(tmp, 'metrics.db'),
+            'ASSETS_DIR': os.path.join(tmp, 'assets'),
+        }, **settings)
+        saved = {key: getattr(Config, key) for key in settings}
+        try:
+            for key, value in settings.items():
+                setattr(Config, key, value)
+            from app import create_app, db
+            app = create_app(dict({'UPLOAD_FOLDER': os.path.join(tmp, 'uploads')}, **(overrides or {})))
+            try:
+                yield app, tmp
+            finally:
+                with app.app_context():
+                    db.engine.dispose()
+        finally:
+            for key, value in saved.items():
+                setattr(Config, key, value)
+
+
+def _insert(conn, table, rows):
+    for start in range(0, len(rows), BATCH_SIZE):
+        conn.execute(table.insert(), rows[start:start + BATCH_SIZE])
+
+
+def seed(engine, metadata, items=1000, days=365, updates=10, key_dates=20, seed=1):
+    """Fill an empty database, returns the number of rows written per table."""
+    rng = random.Random(seed)
+    today = datetime.utcnow().date()
+    first_day = today - timedelta(days=days - 1)
+    tables = metadata.tables
+    counts = {'study_item': items, 'update_history': 0, 'daily_activity': 0}
+
+    with engine.begin() as conn:
+        pending = {'study_item': [], 'update_history': [], 'daily_activity': []}
+
+        def write(force=False):
+            # Items go in before the history and activity that reference them
+            if force or len(pending['update_history']) + len(pending['daily_activity']) >= BATCH_SIZE:
+                for name, rows in pending.items():
+                    _insert(conn, tables[name], rows)
+                    rows.clear()
+
+        for item_id in range(1, items + 1):
+            created = first_day + timedelta(days=rng.randrange(days))
+            created_at = datetime.combine(created, time(rng.randrange(7, 23), rng.randrange(60)))
+            values = {'hours_spent': float(rng.randint(0, 8)), 'progress': rng.randint(0, 20),
+                      'theory_confidence': rng.randint(0, 2), 'practical_confidence': rng.randint(0, 2)}
+            pending['daily_activity'].append({
+                'date': created, 'item_id': item_id, 'operation_type': 'add', 'hours_added': values['hours_spent'],
+                'progress_gained': values['progress'], 'retrospective': False, 'last_activity': created_at})
+            # Distinct update days after the item was created
+            span = (today - created).days
+            update_days = sorted(rng.sample(range(1, span + 1), min(updates, span))) if span else []
+            last_modified = created_at
+            for offset in update_days:
+                day = created + timedelta(days=offset)
+                when = datetime.combine(day, time(rng.randrange(7, 23), rng.randrange(60)))
+                new_values = {
+                    'hours_spent': values['hours_spent'] + rng.randint(1, 12) / 4,
+                    'progress': min(values['progress'] + rng.randint(0, 10), 100),
+                    'theory_confidence': min(values['theory_confidence'] + (rng.random() < 0.2), 5),
+                    'practical_confidence': min(values['practical_confidence'] + (rng.random() < 0.2), 5),
+                }
+                pending['update_history'].append({
+                    'item_id': item_id, 'date': day, 'previous_values': values, 'created_at': when, 'updated_at': when,
+                    'delta': {field: {'old': values[field], 'new': new}
+                              for field, new in new_values.items() if new != values[field]},
+                })
+                pending['daily_activity'].append({
+                    'date': day, 'item_id': item_id, 'operation_type': 'modify',
+                    'hours_added': new_values['hours_spent'] - values['hours_spent'],
+                    'progress_gained': new_values['progress'] - values['progress'],
+                    'retrospective': False, 'last_activity': when})
+                values, last_modified = new_values, when
+            counts['update_history'] += len(update_days)
+            counts['daily_activity'] += 1 + len(update_days)
+            topic = rng.choice(TOPICS)
+            pending['study_item'].append(dict(
+                values, id=item_id, created_at=created_at, last_modified=last_modified,
+                operation_type='modify' if update_days else 'add',
+                title=f'{topic} {" ".join(rng.sample(WORDS, 2))} {item_id}',
+                notes=f'{topic} {" ".join(rng.choices(WORDS, k=rng.randint(3, 12)))}'))
+            write()
+        write(force=True)
+
+        _insert(conn, tables['key_date'], [{
+            'name': f'{rng.choice(["Exam", "Bootcamp", "Mock lab", "Review"])} {number}',
+            'date': today + timedelta(days=rng.randint(-days // 4, days // 4)),
+            'notes': ' '.join(rng.choices(WORDS, k=5)),
+            'created_at': datetime.utcnow(),
+        } for number in range(1, key_dates + 1)])
+        counts['key_date'] = key_dates
+    return counts
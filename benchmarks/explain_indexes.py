@@ -0,0 +1,106 @@
+"""Check that the hot queries are served by the secondary indexes.
+
+Runs EXPLAIN QUERY PLAN (SQLite) for the queries behind the dashboard,
+calendars, history and edit pages and exits non-zero when one of them
+falls back to a table scan or a temporary sort. The plans come from an empty
+temporary database, tests/test_explain_indexes.py runs the same check under
+pytest.
+
+    python benchmarks/explain_indexes.py
+"""
+import os
+import sys
+from datetime import date, datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import text  # noqa: E402
+
+import dataset  # noqa: E402
+from app import db, DailyActivity, StudyItem, UpdateHistory, KeyDate, seek_ranges, sort_columns  # noqa: E402
+
+# SQLite's index for the (date, item_id) primary key
+DAILY_ACTIVITY_KEY = 'sqlite_autoindex_daily_activity_1'
+
+
+def hot_queries():
+    day = date(2025, 3, 14)
+    start, end = datetime(2025, 3, 1), datetime(2025, 3, 31, 23, 59, 59)
+    yield 'history of one item on one day (edit_item)', 'uq_update_history_item_date', \
+        UpdateHistory.query.filter_by(item_id=1, date=day)
+    yield 'newer history for an item (edit_item)', 'uq_update_history_item_date', \
+        UpdateHistory.query.filter(UpdateHistory.item_id == 1, UpdateHistory.date > day)
+    yield 'item history series (item_history)', 'uq_update_history_item_date', \
+        UpdateHistory.query.filter_by(item_id=1).order_by(UpdateHistory.date.asc())
+    yield 'activity of a day (calendar_day_view)', DAILY_ACTIVITY_KEY, \
+        db.session.query(DailyActivity, StudyItem, UpdateHistory).join(
+            StudyItem, StudyItem.id == DailyActivity.item_id).outerjoin(
+            UpdateHistory, db.and_(UpdateHistory.item_id == DailyActivity.item_id,
+                                   UpdateHistory.date == DailyActivity.date)).filter(DailyActivity.date == day)
+    yield 'activity of a month (calendar_view)', DAILY_ACTIVITY_KEY, \
+        db.session.query(DailyActivity.date, db.func.count(DailyActivity.item_id)).filter(
+            DailyActivity.date.between(day.replace(day=1), day)).group_by(DailyActivity.date)
+    yield 'activity of a year (year_activity)', DAILY_ACTIVITY_KEY, \
+        db.session.query(DailyActivity.date, db.func.count()).filter(
+            DailyActivity.date.between(date(2025, 1, 1), date(2025, 12, 31))).group_by(
+            DailyActivity.date).order_by(DailyActivity.date)
+    yield 'activity of an item (cascading delete)', 'ix_daily_activity_item_id', \
+        DailyActivity.query.filter_by(item_id=1)
+    yield 'items modified in a month (calendar_view)', 'ix_study_item_last_modified', \
+        db.session.query(StudyItem.id, StudyItem.title, StudyItem.last_modified).filter(
+            StudyItem.last_modified.between(start, end))
+    yield 'upcoming key dates (index)', 'ix_key_date_date', \
+        KeyDate.query.filter(KeyDate.date >= day).order_by(KeyDate.date.asc()).limit(5)
+    yield 'key date of a day (calendar_day_view)', 'ix_key_date_date', \
+        KeyDate.query.filter_by(date=day)
+
+
+def explain(query):
+    sql = str(query.statement.compile(db.engine, compile_kwargs={'literal_binds': True}))
+    rows = db.session.execute(text(f'EXPLAIN QUERY PLAN {sql}')).all()
+    return [row[-1] for row in rows]
+
+
+def uses_index(plan, index):
+    """Whether plan reads through index, without a table scan or a temporary sort."""
+    return any(index in step for step in plan) and not any(
+        step.startswith('SCAN') and 'INDEX' not in step or 'TEMP B-TREE' in step for step in plan)
+
+
+def check(out=print):
+    """EXPLAIN every hot query, print one line each and return the names of those not using their index."""
+    failed = []
+    with dataset.temp_app('explain') as (app, _), app.app_context():
+        checks = list(hot_queries())
+        # Keyset pagination of the dashboard for every sortable column, the
+        # ranges paginate_items() seeks for a "next page" request, from a row
+        # with a sort value and from one without
+        for sort_by, column in sort_columns().items():
+            value = datetime(2025, 3, 14) if sort_by == 'last_modified' else 1
+            for key in ((value, 10), (None, 10)):
+                for ascending, nulls_first in ((False, False), (True, True)):
+                    ordering = (column.asc(), StudyItem.id.asc()) if ascending else \
+                        (column.desc(), StudyItem.id.desc())
+                    for run, seek in enumerate(seek_ranges(column, key, ascending, nulls_first), 1):
+                        checks.append((f"dashboard page sorted by {sort_by} {'asc' if ascending else 'desc'} "
+                                       f'from {key[0]}, range {run}', f'ix_study_item_{sort_by}',
+                                       StudyItem.query.filter(seek).order_by(*ordering).limit(101)))
+
+        for name, index, query in checks:
+            plan = explain(query)
+            ok = uses_index(plan, index)
+            if not ok:
+                failed.append(name)
+            out(f"{'ok  ' if ok else 'FAIL'} {name}: {' | '.join(plan)}")
+    return failed
+
+
+def main():
+    failed = check()
+    if failed:
+        sys.exit(f'{len(failed)} queries are not using their index')
+
+
+if __name__ == '__main__':
+    main()
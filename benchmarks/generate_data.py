@@ -0,0 +1,53 @@
+"""Fill an empty database with synthetic study items, history and key dates.
+
+Creates the schema through the app and writes the dataset of dataset.py at
+one of the preset scales (1k, 10k or 100k items) or an explicit size. The
+same --seed always produces the same rows, so results are comparable between
+runs. The 100k scale writes about three million history rows.
+
+    python benchmarks/generate_data.py --database-url sqlite:////tmp/load.db --scale 10k
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import dataset
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database-url', required=True)
+    parser.add_argument('--scale', choices=sorted(dataset.SCALES), default='1k')
+    parser.add_argument('--items', type=int, help='overrides the item count of --scale')
+    parser.add_argument('--days', type=int, help='overrides the days of history of --scale')
+    parser.add_argument('--updates', type=int, help='overrides the updates per item of --scale')
+    parser.add_argument('--key-dates', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    size = dict(dataset.SCALES[args.scale])
+    for name in ('items', 'days', 'updates'):
+        if getattr(args, name) is not None:
+            size[name] = getattr(args, name)
+
+    os.environ['DATABASE_URL'] = args.database_url
+    from app import create_app, db, StudyItem
+    app = create_app()
+
+    with app.app_context():
+        if db.session.query(StudyItem.id).first() is not None:
+            sys.exit(f'{args.database_url} already holds study items, use an empty database')
+        started = time.perf_counter()
+        counts = dataset.seed(db.engine, db.metadata, key_dates=args.key_dates, seed=args.seed, **size)
+        elapsed = time.perf_counter() - started
+    for table, count in counts.items():
+        print(f'{table}: {count} rows')
+    print(f'written in {elapsed:.1f}s')
+
+
+if __name__ == '__main__':
+    main()
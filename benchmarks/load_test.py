@@ -0,0 +1,211 @@
+"""Drive every main route with concurrent requests and report latency percentiles.
+
+By default seeds a temporary SQLite database with the synthetic dataset and
+runs the app in process through the Flask test client. With --url the same
+scenarios go over HTTP to a running server instead (for example gunicorn on
+a database filled by generate_data.py). Each scenario is requested
+--requests times from --concurrency threads, each thread logged in with its
+own session. p50/p95/p99 latency, throughput and errors per route are
+printed and written to --output as JSON.
+
+    python benchmarks/load_test.py --scale 1k --requests 200 --concurrency 4
+    python benchmarks/load_test.py --url http://127.0.0.1:5000 --items 10000
+"""
+import argparse
+import contextlib
+import http.cookiejar
+import io
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import dataset
+from bench_import import build_workbook
+
+SEARCH_TERMS = [word.lower() for word in dataset.TOPICS + dataset.WORDS]
+
+# (route, method, url, form data); {item}, {day}, {year}, {month} and {term}
+# are drawn at random for every request. Writes come last so the reads run
+# against the seeded data.
+SCENARIOS = [
+    ('dashboard', 'GET', '/', None),
+    ('sorted list', 'GET', '/?sort=progress&order=desc', None),
+    ('searched list', 'GET', '/?search={term}', None),
+    ('search', 'GET', '/search?q={term}', None),
+    ('calendar month', 'GET', '/calendar?year={year}&month={month}', None),
+    ('calendar day', 'GET', '/calendar/day/{day}', None),
+    ('item history', 'GET', '/item/{item}/history', None),
+    ('edit', 'POST', '/edit/{item}', {'title': 'Load test {item}', 'hours_spent': '{hours}', 'progress': '{progress}',
+                                       'theory_confidence': '2', 'practical_confidence': '2'}),
+    ('bulk import', 'POST', '/bulk_import', {'sheet_name': 'Tracking', 'data_start_row': '2', 'title_columns': 'B',
+                                             'notes_columns': 'C', 'hours_column': 'D', 'progress_column': 'E',
+                                             'theory_column': 'F', 'practical_column': 'G'}),
+]
+
+
+def fill(template, rng, items, days):
+    day = date.today() - timedelta(days=rng.randrange(days))
+    return template.format(item=rng.randint(1, items), day=day.isoformat(), year=day.year, month=day.month,
+                           term=urllib.parse.quote(rng.choice(SEARCH_TERMS)),
+                           hours=rng.randint(0, 400) / 4, progress=rng.randint(0, 100))
+
+
+class TestClientSession:
+    """A logged-in Flask test client."""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+        with self.client.session_transaction() as session:
+            session['logged_in'] = True
+
+    def request(self, method, url, data=None, upload=None):
+        if upload:
+            data = dict(data, file=(io.BytesIO(upload), 'load_test.xlsx'))
+        return self.client.open(url, method=method, data=data).status_code
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class HttpSession:
+    """A cookie session against a running server, logged in with the app password."""
+
+    def __init__(self, base_url, password):
+        self.base_url = base_url.rstrip('/')
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), _NoRedirect)
+        self.request('POST', '/login', {'password': password})
+
+    def request(self, method, url, data=None, upload=None):
+        body, headers = None, {}
+        if upload:
+            boundary = uuid.uuid4().hex
+            parts = [f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+                     for name, value in data.items()]
+            parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="load_test.xlsx"\r\n'
+                         'Content-Type: application/octet-stream\r\n\r\n'.encode() + upload + b'\r\n')
+            body = b''.join(parts) + f'--{boundary}--\r\n'.encode()
+            headers['Content-Type'] = f'multipart/form-data; boundary={boundary}'
+        elif data is not None:
+            body = urllib.parse.urlencode(data).encode()
+        try:
+            with self.opener.open(urllib.request.Request(self.base_url + url, body, headers, method=method)) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as error:
+            return error.code
+
+
+def percentile(latencies, p):
+    # Nearest rank on sorted latencies
+    return latencies[max(math.ceil(p / 100 * len(latencies)) - 1, 0)]
+
+
+def run_scenario(new_session, scenario, args, upload):
+    route, method, url, form = scenario
+    sessions = threading.local()
+    seeds = iter(range(args.requests))
+    lock = threading.Lock()
+
+    def one(_):
+        if not hasattr(sessions, 'session'):
+            # A fresh session per route, the lists keep their sort and search in it
+            sessions.session = new_session()
+        with lock:
+            rng = random.Random(f'{route}-{next(seeds)}')
+        data = {name: fill(value, rng, args.items, args.days) for name, value in form.items()} if form else None
+        started = time.perf_counter()
+        try:
+            status = sessions.session.request(method, fill(url, rng, args.items, args.days), data,
+                                              upload if route == 'bulk import' else None)
+        except OSError:
+            status = None
+        return time.perf_counter() - started, status
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrency) as executor:
+        results = list(executor.map(one, range(args.requests)))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for latency, status in results)
+    errors = sum(1 for latency, status in results if status is None or status >= 400)
+    return {
+        'route': route, 'method': method, 'url': url, 'requests': len(results), 'errors': errors,
+        'throughput_rps': round(len(results) / elapsed, 1),
+        **{f'p{p}_ms': round(percentile(latencies, p) * 1000, 2) for p in (50, 95, 99)},
+        'max_ms': round(latencies[-1] * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help='base URL of a running server, otherwise the app runs in process')
+    parser.add_argument('--password', default=os.getenv('APP_PASSWORD', 'admin'))
+    parser.add_argument('--scale', choices=sorted(dataset.SCALES), default='1k')
+    parser.add_argument('--items', type=int, help='item count of the dataset, defaults to that of --scale')
+    parser.add_argument('--days', type=int, help='days of history of the dataset, defaults to that of --scale')
+    parser.add_argument('--requests', type=int, default=200, help='requests per route')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--import-rows', type=int, default=50, help='rows of the uploaded bulk import workbook')
+    parser.add_argument('--routes', help='comma separated route names to run, defaults to all')
+    parser.add_argument('--output', default='load_test.json')
+    args = parser.parse_args()
+    size = dataset.SCALES[args.scale]
+    args.items = args.items or size['items']
+    args.days = args.days or size['days']
+    scenarios = [scenario for scenario in SCENARIOS
+                 if not args.routes or scenario[0] in args.routes.split(',')]
+
+    with contextlib.ExitStack() as stack:
+        tmp = stack.enter_context(tempfile.TemporaryDirectory())
+        workbook = os.path.join(tmp, 'load_test.xlsx')
+        build_workbook(workbook, args.import_rows)
+        with open(workbook, 'rb') as f:
+            upload = f.read()
+
+        if args.url:
+            new_session = lambda: HttpSession(args.url, args.password)
+            target = args.url
+        else:
+            # Served like production, with the response cache and metrics on
+            app, _ = stack.enter_context(dataset.temp_app('load', RESPONSE_CACHE=True, METRICS_ENABLED=True))
+            from app import db
+
+            with app.app_context():
+                print(f'seeding {args.items} items...', flush=True)
+                dataset.seed(db.engine, db.metadata, items=args.items, days=args.days, updates=size['updates'])
+            new_session = lambda: TestClientSession(app)
+            target = 'test client'
+
+        results = []
+        for scenario in scenarios:
+            result = run_scenario(new_session, scenario, args, upload)
+            results.append(result)
+            print(f"{result['route']:<15} {result['throughput_rps']:>8.1f} req/s  p50 {result['p50_ms']:>8.2f} ms  "
+                  f"p95 {result['p95_ms']:>8.2f} ms  p99 {result['p99_ms']:>8.2f} ms  errors {result['errors']}",
+                  flush=True)
+
+    with open(args.output, 'w') as f:
+        json.dump({'target': target, 'items': args.items, 'days': args.days, 'requests': args.requests,
+                   'concurrency': args.concurrency, 'routes': results}, f, indent=2)
+    print(f'results written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
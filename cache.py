@@ -0,0 +1,96 @@
+"""Response cache shared by every worker process, stored in a SQLite file.
+
+gunicorn forks independent workers, so an in-process dict would be cold in
+three of them; a small SQLite database next to the app is shared by all of
+them and survives restarts. Entries are keyed by the caller (route,
+parameters and the data version), evicted least recently used once the
+cache holds more than max_entries or max_bytes, and dropped as soon as a
+newer data version is stored. Hits and misses are counted in the same file.
+
+The cache is disposable: any SQLite error is logged and treated as a miss.
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = [
+    'CREATE TABLE IF NOT EXISTS entries ('
+    'key TEXT PRIMARY KEY, version INTEGER NOT NULL, mimetype TEXT NOT NULL, '
+    'body BLOB NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS ix_entries_accessed ON entries (accessed)',
+    'CREATE INDEX IF NOT EXISTS ix_entries_version ON entries (version)',
+    'CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)',
+    "INSERT OR IGNORE INTO stats (name, value) VALUES ('hits', 0), ('misses', 0)",
+]
+
+
+class ResponseCache:
+    def __init__(self, path, max_entries=1000, max_bytes=64 * 1024 * 1024):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+
+    def _connection(self):
+        # One connection per thread, reopened in forked workers
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=1)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=OFF')  # Losing the cache on a crash is fine
+            with connection:
+                for statement in SCHEMA:
+                    connection.execute(statement)
+            local.connection, local.pid = connection, os.getpid()
+        return local.connection
+
+    def get(self, key):
+        """(mimetype, body) stored under key, or None on a miss."""
+        try:
+            connection = self._connection()
+            with connection:
+                # Writing first takes the write lock up front, a read-then-write
+                # transaction could not wait for it under WAL
+                touched = connection.execute('UPDATE entries SET accessed = ? WHERE key = ?', (time.time(), key)).rowcount
+                row = connection.execute('SELECT mimetype, body FROM entries WHERE key = ?', (key,)).fetchone() if touched else None
+                connection.execute('UPDATE stats SET value = value + 1 WHERE name = ?',
+                                   ('hits' if row else 'misses',))
+            return row
+        except sqlite3.Error as error:
+            logger.warning('response cache read failed: %s', error)
+            return None
+
+    def set(self, key, version, mimetype, body):
+        """Store body under key, then drop stale versions and evict down to the size limits."""
+        try:
+            connection = self._connection()
+            with connection:
+                connection.execute(
+                    'INSERT OR REPLACE INTO entries (key, version, mimetype, body, size, accessed) '
+                    'VALUES (?, ?, ?, ?, ?, ?)', (key, version, mimetype, body, len(body), time.time()))
+                connection.execute('DELETE FROM entries WHERE version < ?', (version,))
+                connection.execute(
+                    'DELETE FROM entries WHERE key IN (SELECT key FROM ('
+                    'SELECT key, ROW_NUMBER() OVER recent AS position, SUM(size) OVER recent AS running '
+                    'FROM entries WINDOW recent AS (ORDER BY accessed DESC)) '
+                    'WHERE position > ? OR running > ?)', (self.max_entries, self.max_bytes))
+        except sqlite3.Error as error:
+            logger.warning('response cache write failed: %s', error)
+
+    def stats(self):
+        connection = self._connection()
+        counters = dict(connection.execute('SELECT name, value FROM stats'))
+        entries, size = connection.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries').fetchone()
+        return dict(counters, entries=entries, bytes=size,
+                    max_entries=self.max_entries, max_bytes=self.max_bytes)
+
+    def clear(self):
+        connection = self._connection()
+        with connection:
+            connection.execute('DELETE FROM entries')
+            connection.execute('UPDATE stats SET value = 0')
@@ -0,0 +1,155 @@
+"""Compaction of update_history into weekly and monthly rows.
+
+Every active day leaves one update_history row per item, and nothing was
+ever removed. compact() keeps the rows of the last daily_days days as they
+are, rolls older days into one row per week, and days older than
+weekly_days into one row per month. The row kept for a period is the one of
+its last active day; it gets the values the item had before the period
+(previous_values) and the changes over the whole period (delta), so the
+history series read at the end of every week or month is unchanged.
+Compacting again is harmless, periods already down to one row are skipped.
+
+daily_activity keeps its per-day rows, so the calendars are not affected.
+The last compacted day is recorded in history_compaction: daily_activity
+can no longer be derived from the history up to it.
+"""
+from datetime import timedelta
+from itertools import groupby
+
+from sqlalchemy import bindparam, func, select, text
+from sqlalchemy.exc import OperationalError
+
+CHUNK_ITEMS = 500  # Items compacted per transaction, keeps the write lock short
+
+
+def period(day, today, daily_days, weekly_days):
+    """(resolution, first day) of the period day is rolled into, None while it stays daily."""
+    age = (today - day).days
+    if age < daily_days:
+        return None
+    if age < weekly_days:
+        return 'week', day - timedelta(days=day.weekday())
+    return 'month', day.replace(day=1)
+
+
+def merge(rows):
+    """(previous_values, delta) of one row standing for rows, in date order."""
+    # The same fold series.load does: delta wins, previous_values otherwise
+    state = {}
+    for row in rows:
+        previous_values, delta = row.previous_values or {}, row.delta or {}
+        for field in set(previous_values) | set(delta):
+            state[field] = delta[field].get('new') if field in delta else previous_values[field]
+    previous_values = rows[0].previous_values or {}
+    delta = {
+        field: {'old': previous_values.get(field), 'new': value}
+        for field, value in state.items()
+        if field not in previous_values or previous_values[field] != value
+    }
+    return previous_values, delta
+
+
+def compact_items(conn, metadata, low, high, today, daily_days, weekly_days):
+    """Compact the history of items low..high, returns the number of rows removed."""
+    history = metadata.tables['update_history']
+    rows = conn.execute(
+        select(history.c.id, history.c.item_id, history.c.date, history.c.previous_values,
+               history.c.delta, history.c.created_at, history.c.updated_at)
+        .where(history.c.item_id.between(low, high), history.c.date <= today - timedelta(days=daily_days))
+        .order_by(history.c.item_id, history.c.date)
+    ).all()
+
+    kept, removed = [], []
+    periods = groupby(rows, lambda row: (row.item_id, period(row.date, today, daily_days, weekly_days)))
+    for (_, key), group in periods:
+        group = list(group)
+        if key is None or len(group) == 1:
+            continue
+        previous_values, delta = merge(group)
+        kept.append({'row_id': group[-1].id, 'merged_previous_values': previous_values, 'merged_delta': delta,
+                     'first_created_at': group[0].created_at, 'last_updated_at': group[-1].updated_at})
+        removed.extend({'row_id': row.id} for row in group[:-1])
+
+    if kept:
+        conn.execute(history.delete().where(history.c.id == bindparam('row_id')), removed)
+        conn.execute(history.update().where(history.c.id == bindparam('row_id')).values(
+            previous_values=bindparam('merged_previous_values'), delta=bindparam('merged_delta'),
+            created_at=bindparam('first_created_at'), updated_at=bindparam('last_updated_at')), kept)
+    return len(removed)
+
+
+def compact(engine, metadata, today, daily_days=90, weekly_days=365, chunk_items=CHUNK_ITEMS):
+    """Compact every item's history, CHUNK_ITEMS items per transaction.
+
+    Returns {'rows_before', 'rows_removed', 'rows_after'}.
+    """
+    history = metadata.tables['update_history']
+    with engine.connect() as conn:
+        rows_before, first, last = conn.execute(
+            select(func.count(), func.min(history.c.item_id), func.max(history.c.item_id))).one()
+    removed = 0
+    for low in range(first or 0, (last or -1) + 1, chunk_items):
+        with engine.begin() as conn:
+            removed += compact_items(conn, metadata, low, low + chunk_items - 1, today, daily_days, weekly_days)
+    with engine.begin() as conn:
+        record_compaction(conn, metadata, today - timedelta(days=daily_days))
+    return {'rows_before': rows_before, 'rows_removed': removed, 'rows_after': rows_before - removed}
+
+
+def compacted_through(conn, metadata):
+    """The last day whose history may be compacted, None if it never was."""
+    return conn.execute(select(metadata.tables['history_compaction'].c.compacted_through)).scalar()
+
+
+def record_compaction(conn, metadata, through):
+    table = metadata.tables['history_compaction']
+    current = compacted_through(conn, metadata)
+    if current is None:
+        conn.execute(table.insert().values(id=1, compacted_through=through))
+    elif through > current:
+        conn.execute(table.update().values(compacted_through=through))
+
+
+def sqlite_size(conn):
+    """(file bytes, free bytes) of a SQLite database."""
+    page_size = conn.execute(text('PRAGMA page_size')).scalar()
+    page_count = conn.execute(text('PRAGMA page_count')).scalar()
+    free_pages = conn.execute(text('PRAGMA freelist_count')).scalar()
+    return page_count * page_size, free_pages * page_size
+
+
+def sqlite_table_bytes(conn, table_name):
+    """Bytes of row data held by a table and its indexes, None without the dbstat table."""
+    try:
+        return conn.execute(text(
+            'SELECT SUM(payload) FROM dbstat WHERE name = :table OR name IN '
+            '(SELECT name FROM sqlite_master WHERE type = \'index\' AND tbl_name = :table)'
+        ), {'table': table_name}).scalar()
+    except OperationalError:
+        return None
+
+
+def sqlite_vacuum(engine, full=False):
+    """Return the free pages of a SQLite database to the file system.
+
+    Incremental vacuum only works in auto_vacuum=INCREMENTAL databases, which
+    new databases are; older ones need one full VACUUM (full=True) to switch,
+    which rewrites the file and locks it meanwhile. Only pages left empty are
+    freed, VACUUM also packs the half-empty ones compaction leaves behind.
+    Returns False when nothing could be done.
+    """
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        if full:
+            conn.execute(text('PRAGMA auto_vacuum=INCREMENTAL'))
+            conn.execute(text('VACUUM'))
+            return True
+        if conn.execute(text('PRAGMA auto_vacuum')).scalar() != 2:
+            return False
+    # Every step of the pragma frees a single page and the driver only steps
+    # once per execute(); executescript() runs it to completion
+    connection = engine.raw_connection()
+    try:
+        connection.driver_connection.executescript('PRAGMA incremental_vacuum')
+    finally:
+        connection.close()
+    return True
@@ -18,8 +18,101 @@ class Config:
     DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///study_tracker.db')
     DATABASE_TRACK_MODIFICATIONS = os.getenv('DATABASE_TRACK_MODIFICATIONS','False').lower() == 'true'
 
+    # SQLite connection profile, applied as PRAGMAs on every new connection
+    SQLITE_JOURNAL_MODE = os.getenv('SQLITE_JOURNAL_MODE', 'WAL')  # WAL lets readers and a writer work concurrently
+    SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')  # NORMAL is durable enough with WAL
+    SQLITE_BUSY_TIMEOUT = int(os.getenv('SQLITE_BUSY_TIMEOUT', '5000'))  # ms to wait for a lock before "database is locked"
+    SQLITE_CACHE_SIZE = int(os.getenv('SQLITE_CACHE_SIZE', '-16000'))  # Pages, or KiB when negative
+    SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', str(128 * 1024 * 1024)))  # Bytes, 0 disables memory mapping
+    SQLITE_TEMP_STORE = os.getenv('SQLITE_TEMP_STORE', 'MEMORY')  # DEFAULT, FILE or MEMORY
+
+    # Connection pool settings for server databases (PostgreSQL/MySQL)
+    DATABASE_POOL_SIZE = int(os.getenv('DATABASE_POOL_SIZE', '5'))
+    DATABASE_MAX_OVERFLOW = int(os.getenv('DATABASE_MAX_OVERFLOW', '10'))
+    DATABASE_POOL_PRE_PING = os.getenv('DATABASE_POOL_PRE_PING', 'true').lower() == 'true'
+    DATABASE_POOL_RECYCLE = int(os.getenv('DATABASE_POOL_RECYCLE', '1800'))  # Seconds, -1 disables
+
+    @classmethod
+    def is_sqlite(cls):
+        return cls.DATABASE_URL.startswith('sqlite')
+
+    @classmethod
+    def engine_options(cls):
+        """SQLALCHEMY_ENGINE_OPTIONS for the configured database"""
+        if cls.is_sqlite():
+            # The sqlite3 driver's timeout is its busy handler, keep it in line with busy_timeout
+            return {'connect_args': {'timeout': cls.SQLITE_BUSY_TIMEOUT / 1000}}
+        return {
+            'pool_size': cls.DATABASE_POOL_SIZE,
+            'max_overflow': cls.DATABASE_MAX_OVERFLOW,
+            'pool_pre_ping': cls.DATABASE_POOL_PRE_PING,
+            'pool_recycle': cls.DATABASE_POOL_RECYCLE,
+        }
+
+    @classmethod
+    def sqlite_pragmas(cls):
+        """PRAGMA statements run on every new SQLite connection"""
+        return [
+            'PRAGMA auto_vacuum=INCREMENTAL',  # Only takes effect on new databases, or after a VACUUM
+            'PRAGMA foreign_keys=ON',  # Off by default in SQLite, deleting an item cascades to its history
+            f'PRAGMA journal_mode={cls.SQLITE_JOURNAL_MODE}',
+            f'PRAGMA synchronous={cls.SQLITE_SYNCHRONOUS}',
+            f'PRAGMA busy_timeout={cls.SQLITE_BUSY_TIMEOUT}',
+            f'PRAGMA cache_size={cls.SQLITE_CACHE_SIZE}',
+            f'PRAGMA mmap_size={cls.SQLITE_MMAP_SIZE}',
+            f'PRAGMA temp_store={cls.SQLITE_TEMP_STORE}',
+        ]
+
     # App settings
     APP_NAME = 'Study Tracker'
 
+    # Bulk import settings
+    IMPORT_WORKERS = int(os.getenv('IMPORT_WORKERS', '1'))  # Background import threads per worker process
+    IMPORT_MAX_ERRORS = int(os.getenv('IMPORT_MAX_ERRORS', '500'))  # Row errors kept per import job
+    IMPORT_STALE_SECONDS = int(os.getenv('IMPORT_STALE_SECONDS', '300'))  # Unfinished jobs that stop heartbeating are failed after this
+
+    # Bulk deletes run in batches of DELETE_BATCH_ITEMS items, one transaction each, so other writers get the lock in between
+    DELETE_BATCH_ITEMS = int(os.getenv('DELETE_BATCH_ITEMS', '200'))
+    DELETE_PAUSE_MS = float(os.getenv('DELETE_PAUSE_MS', '10'))
+
+    # JSON API settings
+    API_TOKEN = os.getenv('API_TOKEN', '')  # Bearer token for /api/v1 clients without a session, empty disables it
+    API_BATCH_LIMIT = int(os.getenv('API_BATCH_LIMIT', '5000'))  # Entries per batch request
+
+    # Response cache shared by all worker processes, invalidated by every write
+    RESPONSE_CACHE = os.getenv('RESPONSE_CACHE', 'true').lower() == 'true'
+    RESPONSE_CACHE_PATH = os.getenv('RESPONSE_CACHE_PATH', '')  # SQLite file, defaults to instance/response_cache.db
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', '1000'))
+    RESPONSE_CACHE_MAX_BYTES = int(os.getenv('RESPONSE_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+
+    # Instrumentation: Server-Timing headers, /metrics and the slow request log
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+    METRICS_PATH = os.getenv('METRICS_PATH', '')  # SQLite file shared by the workers, defaults to instance/metrics.db
+    METRICS_FLUSH_SECONDS = float(os.getenv('METRICS_FLUSH_SECONDS', '5'))  # How often a worker adds its counts to the file
+    SLOW_REQUEST_MS = int(os.getenv('SLOW_REQUEST_MS', '1000'))  # Log requests slower than this with their SQL, 0 disables
+
+    # History compaction: daily rows are kept for HISTORY_DAILY_DAYS, weekly ones up to HISTORY_WEEKLY_DAYS, monthly after
+    HISTORY_DAILY_DAYS = int(os.getenv('HISTORY_DAILY_DAYS', '90'))
+    HISTORY_WEEKLY_DAYS = int(os.getenv('HISTORY_WEEKLY_DAYS', '365'))
+    HISTORY_COMPACTION_HOURS = float(os.getenv('HISTORY_COMPACTION_HOURS', '0'))  # Run it in the app every N hours, 0 disables
+
+    # Online SQLite backups, see backup.py
+    BACKUP_DIR = os.getenv('BACKUP_DIR', '')  # Defaults to a backups directory next to the database file
+    BACKUP_KEEP = int(os.getenv('BACKUP_KEEP', '7'))  # Generations kept, older ones are removed
+    BACKUP_HOURS = float(os.getenv('BACKUP_HOURS', '0'))  # Back up in the app every N hours, 0 disables
+    BACKUP_PAGES_PER_STEP = int(os.getenv('BACKUP_PAGES_PER_STEP', '256'))  # Pages copied between pauses
+    BACKUP_STEP_PAUSE_MS = float(os.getenv('BACKUP_STEP_PAUSE_MS', '5'))  # Pause between steps, leaves room for requests
+
+    # Static assets and compression, see assets.py
+    ASSETS_DIR = os.getenv('ASSETS_DIR', '')  # Output of build-assets, defaults to static/build
+    COMPRESS_RESPONSES = os.getenv('COMPRESS_RESPONSES', 'true').lower() == 'true'  # gzip/brotli for HTML and JSON
+    COMPRESS_MIN_BYTES = int(os.getenv('COMPRESS_MIN_BYTES', '512'))  # Smaller responses are sent as they are
+    COMPRESS_LEVEL = int(os.getenv('COMPRESS_LEVEL', '6'))  # gzip level of dynamic responses, 1-9
+
+    # /healthz and /readyz
+    HEALTH_CACHE_SECONDS = float(os.getenv('HEALTH_CACHE_SECONDS', '5'))  # How long a worker reuses a check's result
+    READYZ_TIMEOUT = float(os.getenv('READYZ_TIMEOUT', '2'))  # Seconds before a hanging database counts as not ready
+
     # UI settings
     DEFAULT_THEME = os.getenv('DEFAULT_THEME', 'light')  # 'light' or 'dark'
+    ITEMS_PER_PAGE = int(os.getenv('ITEMS_PER_PAGE', '100'))  # Rows per page on the dashboard and delete page
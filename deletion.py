@@ -0,0 +1,74 @@
+"""Deletion of study items in bounded batches, and of orphaned rows.
+
+update_history and daily_activity reference study_item with ON DELETE
+CASCADE, so deleting an item removes its history and calendar activity in
+the same statement. Deleting thousands of items in one statement would hold
+the database's write lock (all of SQLite) until it finished; delete_items()
+deletes BATCH_ITEMS items per transaction instead and pauses between them,
+so other writers get their turn. Every batch bumps the data version, cached
+pages never show items that are gone.
+
+Databases written with foreign keys off (the sqlite3 shell's default, or
+this app before the cascade) may hold history and activity of items that no
+longer exist; delete_orphans() removes them the same way.
+"""
+import time
+from datetime import datetime
+
+from sqlalchemy import func, select
+
+BATCH_ITEMS = 200  # Items per transaction, with up to a few hundred history and activity rows each
+PAUSE = 0.01  # Seconds between transactions
+CHILD_TABLES = ('update_history', 'daily_activity')
+
+
+def _bump_data_version(conn, metadata):
+    table = metadata.tables['data_version']
+    conn.execute(table.update().values(version=table.c.version + 1, updated_at=datetime.utcnow()))
+
+
+def delete_items(engine, metadata, item_ids, batch_items=BATCH_ITEMS, pause=PAUSE):
+    """Delete items with their history and activity, returns the number of items deleted."""
+    items = metadata.tables['study_item']
+    item_ids = sorted(set(item_ids))
+    deleted = 0
+    for start in range(0, len(item_ids), batch_items):
+        if start:
+            time.sleep(pause)
+        with engine.begin() as conn:
+            count = conn.execute(items.delete().where(items.c.id.in_(item_ids[start:start + batch_items]))).rowcount
+            if count:
+                _bump_data_version(conn, metadata)
+        deleted += count
+    return deleted
+
+
+def _orphan_item_ids(metadata, table_name):
+    table = metadata.tables[table_name]
+    items = metadata.tables['study_item']
+    return select(table.c.item_id).where(~select(items.c.id).where(items.c.id == table.c.item_id).exists())
+
+
+def count_orphans(conn, metadata):
+    """{table: rows whose item no longer exists}"""
+    return {name: conn.execute(select(func.count()).select_from(_orphan_item_ids(metadata, name).subquery())).scalar()
+            for name in CHILD_TABLES}
+
+
+def delete_orphans(engine, metadata, batch_items=BATCH_ITEMS, pause=PAUSE):
+    """Delete history and activity rows of missing items, batch_items items at a time.
+
+    Returns {table: rows deleted}.
+    """
+    deleted = {}
+    for name in CHILD_TABLES:
+        table = metadata.tables[name]
+        deleted[name] = 0
+        while True:
+            with engine.begin() as conn:
+                item_ids = conn.execute(_orphan_item_ids(metadata, name).distinct().limit(batch_items)).scalars().all()
+                if not item_ids:
+                    break
+                deleted[name] += conn.execute(table.delete().where(table.c.item_id.in_(item_ids))).rowcount
+            time.sleep(pause)
+    return deleted
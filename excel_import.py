@@ -0,0 +1,149 @@
+"""Streaming Excel ingestion used by the bulk import route.
+
+Rows are streamed from the selected sheet with openpyxl in read-only mode and
+processed in fixed-size chunks: title/notes are assembled per row, while the
+numeric columns are coerced and clamped for the whole chunk at once with numpy.
+"""
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+
+CHUNK_SIZE = 2000
+
+# Numeric columns: (field, default, lower bound, upper bound, integer)
+NUMERIC_FIELDS = [
+    ('hours_spent', 0.0, None, None, False),
+    ('progress', 0, 0, 100, True),
+    ('theory_confidence', 0, 0, 5, True),
+    ('practical_confidence', 0, 0, 5, True),
+]
+
+
+def col_letter_to_index(col_letter):
+    """Convert an Excel column letter (A, B, ..., AA) to a 0-based index."""
+    if not col_letter:
+        return None
+    index = 0
+    for char in col_letter.upper():
+        index = index * 26 + (ord(char) - ord('A') + 1)
+    return index - 1
+
+
+def build_mapping(form):
+    """Read the column mapping posted by bulk_import.html."""
+    return {
+        'title': [col_letter_to_index(col) for col in form.getlist('title_columns') if col],
+        'notes': [col_letter_to_index(col) for col in form.getlist('notes_columns') if col],
+        'hours_spent': col_letter_to_index(form.get('hours_column')),
+        'progress': col_letter_to_index(form.get('progress_column')),
+        'theory_confidence': col_letter_to_index(form.get('theory_column')),
+        'practical_confidence': col_letter_to_index(form.get('practical_column')),
+    }
+
+
+def open_sheet(filepath, sheet_name=None, data_start_row=1):
+    """Open a sheet for streaming.
+
+    Returns (row_count, rows) where rows yields raw row tuples starting at the
+    1-based data_start_row and row_count is the number of data rows according
+    to the sheet dimensions (None when the workbook does not record them).
+    """
+    first_row = max(data_start_row, 1)
+    if filepath.endswith('.xls'):
+        # openpyxl cannot read the legacy format, let pandas (xlrd) handle it
+        df = pd.read_excel(filepath, sheet_name=sheet_name or 0, header=None,
+                           skiprows=first_row - 1)
+        rows = (tuple(None if pd.isna(value) else value for value in row)
+                for row in df.itertuples(index=False, name=None))
+        return len(df), rows
+
+    workbook = load_workbook(filepath, read_only=True, data_only=True)
+    worksheet = workbook[sheet_name] if sheet_name else workbook.worksheets[0]
+    row_count = max(worksheet.max_row - first_row + 1, 0) if worksheet.max_row else None
+
+    def rows():
+        try:
+            yield from worksheet.iter_rows(min_row=first_row, values_only=True)
+        finally:
+            workbook.close()
+
+    return row_count, rows()
+
+
+def _join_cells(row, indices, separator):
+    parts = []
+    for idx in indices:
+        if idx is not None and idx < len(row):
+            value = row[idx]
+            if value is not None and value != '':
+                parts.append(str(value))
+    return separator.join(parts)
+
+
+def _coerce_column(values, default, low, high, integer):
+    """Vectorised float()/int(float()) coercion with clamping and defaults.
+
+    Returns the coerced values and a mask of cells that held a value which
+    could not be converted to a number.
+    """
+    series = pd.Series(values, dtype=object)
+    numbers = np.array(pd.to_numeric(series, errors='coerce'), dtype=float)
+    invalid = ~np.isfinite(numbers)
+    unparsable = invalid & np.array(series.notna() & (series != ''), dtype=bool)
+    if integer:
+        numbers = np.trunc(numbers)
+    if low is not None or high is not None:
+        numbers = np.clip(numbers, low, high)
+    numbers[invalid] = default
+    if integer:
+        return numbers.astype(np.int64).tolist(), unparsable
+    return numbers.tolist(), unparsable
+
+
+def _build_chunk(rows, mapping, first_row):
+    titles, notes, row_numbers = [], [], []
+    raw = {field: [] for field, *_ in NUMERIC_FIELDS}
+    for offset, row in enumerate(rows):
+        title = _join_cells(row, mapping['title'], ' ')
+        if not title.strip():
+            continue
+        titles.append(title)
+        notes.append(_join_cells(row, mapping['notes'], '\n') or None)
+        row_numbers.append(first_row + offset)
+        for field in raw:
+            idx = mapping[field]
+            raw[field].append(row[idx] if idx is not None and idx < len(row) else None)
+
+    columns = {'title': titles, 'notes': notes}
+    errors = []
+    for field, default, low, high, integer in NUMERIC_FIELDS:
+        columns[field], unparsable = _coerce_column(raw[field], default, low, high, integer)
+        for position in np.flatnonzero(unparsable):
+            errors.append({
+                'row': row_numbers[position],
+                'field': field,
+                'value': str(raw[field][position]),
+                'error': f'not a number, defaulted to {default}',
+            })
+    errors.sort(key=lambda error: error['row'])
+    items = [dict(zip(columns, values)) for values in zip(*columns.values())]
+    return items, errors
+
+
+def iter_item_chunks(rows, mapping, chunk_size=CHUNK_SIZE, first_row=1):
+    """Group raw rows into chunks of StudyItem column dicts.
+
+    Yields (rows_read, items, errors) tuples. Rows with an empty title are
+    dropped; errors list the cells that could not be coerced, by sheet row
+    number (first_row is the sheet row of the first streamed row).
+    """
+    buffer = []
+    for row in rows:
+        buffer.append(row)
+        if len(buffer) >= chunk_size:
+            yield (len(buffer),) + _build_chunk(buffer, mapping, first_row)
+            first_row += len(buffer)
+            buffer = []
+    if buffer:
+        yield (len(buffer),) + _build_chunk(buffer, mapping, first_row)
+
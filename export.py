@@ -0,0 +1,105 @@
+"""Streaming writers for the CSV, NDJSON and XLSX exports.
+
+Each writer takes the column names and an iterator of row tuples and yields
+the file as byte chunks, so a response or a file can be written while the
+rows are still being fetched and memory stays flat however many rows there
+are. XLSX is a zip archive and can only be finished once every row is in:
+openpyxl's write-only mode spools the rows to a temporary file, and the
+finished workbook is read back in chunks.
+"""
+import csv
+import io
+import json
+import os
+import tempfile
+from datetime import date, datetime
+
+CHUNK_ROWS = 1000  # Rows per yielded chunk
+READ_SIZE = 64 * 1024
+XLSX_MAX_ROWS = 1048576  # Rows per worksheet, the header included; the rest continues on another sheet
+
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+
+def _text(value):
+    # Flat formats get dates in ISO form and JSON columns as JSON text
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, separators=(',', ':'))
+    return value
+
+
+def _json_default(value):
+    return value.isoformat() if isinstance(value, (date, datetime)) else str(value)
+
+
+def write_csv(columns, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for count, row in enumerate(rows, 1):
+        writer.writerow([_text(value) for value in row])
+        if count % CHUNK_ROWS == 0:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+def write_ndjson(columns, rows):
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(dict(zip(columns, row)), default=_json_default, separators=(',', ':')))
+        if len(lines) == CHUNK_ROWS:
+            yield ('\n'.join(lines) + '\n').encode()
+            lines = []
+    if lines:
+        yield ('\n'.join(lines) + '\n').encode()
+
+
+def write_xlsx(columns, rows, title='Export'):
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+
+    workbook = Workbook(write_only=True)
+    sheet = None
+    sheet_rows = XLSX_MAX_ROWS
+    for row in rows:
+        if sheet_rows == XLSX_MAX_ROWS:
+            sheet = workbook.create_sheet(title if not workbook.worksheets else f'{title} {len(workbook.worksheets) + 1}')
+            sheet.append(columns)
+            sheet_rows = 1
+        values = []
+        for value in row:
+            value = _text(value) if isinstance(value, (dict, list)) else value
+            if isinstance(value, str) and value.startswith('='):
+                # openpyxl would write it as a formula
+                value = WriteOnlyCell(sheet, value)
+                value.data_type = 's'
+            values.append(value)
+        sheet.append(values)
+        sheet_rows += 1
+    if sheet is None:
+        workbook.create_sheet(title).append(columns)
+
+    handle, path = tempfile.mkstemp(suffix='.xlsx')
+    os.close(handle)
+    try:
+        workbook.save(path)
+        with open(path, 'rb') as f:
+            while chunk := f.read(READ_SIZE):
+                yield chunk
+    finally:
+        os.remove(path)
+
+
+def write(fmt, columns, rows, title='Export'):
+    """Byte chunks of rows in fmt, one of FORMATS; title names the XLSX sheet."""
+    if fmt == 'xlsx':
+        return write_xlsx(columns, rows, title)
+    return write_csv(columns, rows) if fmt == 'csv' else write_ndjson(columns, rows)
@@ -1,11 +1,48 @@
 import multiprocessing
-workers = 4
-threads = 2
+import os
+import sys
+
+# gunicorn does not put this file's directory on the path, config.py lives next to it
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from config import Config  # noqa: E402
+
+
+def cpu_count():
+    # CPUs this process may run on, a container's cpuset rather than the host's
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return multiprocessing.cpu_count()
+
+
+cpus = cpu_count()
+
+# SQLite has a single writer, more processes only queue on its lock: a few
+# workers with threads for the reads. A server database takes the usual
+# (2 x CPUs) + 1 workers.
+if Config.is_sqlite():
+    default_workers, default_threads = min(cpus, 4), 4
+else:
+    default_workers, default_threads = cpus * 2 + 1, 2
+
+# sync, gthread, or an event loop worker (gevent or eventlet, installed separately)
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+workers = int(os.getenv('GUNICORN_WORKERS', default_workers))
+# Any threads > 1 would turn sync workers into gthread ones
+threads = int(os.getenv('GUNICORN_THREADS', default_threads)) if worker_class == 'gthread' else 1
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', '100'))  # Event loop workers only
+
+# Recycle workers after a number of requests, the jitter keeps them from restarting together.
+# Off by default: a recycled worker is killed after `timeout` seconds, with any bulk import it is
+# running, and the import page polls often enough to recycle workers mid-import.
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '0'))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', '100'))
+
 preload_app = True
-bind = '0.0.0.0:5000'
-timeout = 30
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '30'))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '30'))  # Also bounds a running bulk import on restart
 keepalive = 2
-accesslog = '-'  # stdout
-errorlog = '-'   # stderr
+accesslog = '-'
+errorlog = '-'
 loglevel = 'info'
-
@@ -0,0 +1,203 @@
+"""Per-request instrumentation and a Prometheus text exposition.
+
+install() hooks Flask's request and template signals and SQLAlchemy's
+cursor events. Every request records its latency (a histogram per route),
+the number of SQL statements and the time spent in them, and the template
+render time. The totals go out in a Server-Timing header, and requests
+slower than the threshold are logged with their SQL.
+
+gunicorn runs several worker processes, so a worker's counters are useless
+on their own. Each worker adds its counts up in memory and, every few
+seconds, adds them to the rows of a SQLite file shared by all workers, in
+the same way as the response cache. /metrics renders that file, so every
+worker answers a scrape with the total of all of them.
+"""
+import atexit
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+
+from flask import before_render_template, g, has_request_context, request, template_rendered
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+MAX_LOGGED_STATEMENTS = 200
+
+METRICS = {
+    'http_requests_total': ('counter', 'Requests by route, method and status code.'),
+    'http_request_duration_seconds': ('histogram', 'Request latency by route.'),
+    'sql_statements_total': ('counter', 'SQL statements run by route.'),
+    'sql_duration_seconds_total': ('counter', 'Time spent running SQL by route.'),
+    'template_render_seconds_total': ('counter', 'Time spent rendering templates by route.'),
+}
+
+SCHEMA = [
+    'CREATE TABLE IF NOT EXISTS samples ('
+    'sample TEXT NOT NULL, labels TEXT NOT NULL, value REAL NOT NULL, PRIMARY KEY (sample, labels))',
+]
+
+
+def _format_value(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def _format_labels(labels):
+    escape = lambda value: value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return ','.join(f'{name}="{escape(value)}"' for name, value in labels)
+
+
+class MetricsStore:
+    def __init__(self, path, flush_seconds=5):
+        self.path = path
+        self.flush_seconds = flush_seconds
+        self._pending = defaultdict(float)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._flushed_at = time.monotonic()
+
+    def _connection(self):
+        # One connection per thread, reopened in forked workers
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=5)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=OFF')
+            with connection:
+                for statement in SCHEMA:
+                    connection.execute(statement)
+            local.connection, local.pid = connection, os.getpid()
+        return local.connection
+
+    def inc(self, sample, labels, value=1):
+        with self._lock:
+            self._pending[(sample, json.dumps(labels))] += value
+
+    def observe(self, name, labels, value):
+        """Add value to the histogram name, buckets are stored cumulatively."""
+        for le in BUCKETS:
+            self.inc(f'{name}_bucket', labels + [['le', str(le)]], 1 if value <= le else 0)
+        self.inc(f'{name}_bucket', labels + [['le', '+Inf']])
+        self.inc(f'{name}_sum', labels, value)
+        self.inc(f'{name}_count', labels)
+
+    def flush(self, force=False):
+        """Add this process' pending counts to the shared file, at most every flush_seconds."""
+        if not force and time.monotonic() - self._flushed_at < self.flush_seconds:
+            return
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(float)
+            self._flushed_at = time.monotonic()
+        if not pending:
+            return
+        try:
+            connection = self._connection()
+            with connection:
+                connection.executemany(
+                    'INSERT INTO samples (sample, labels, value) VALUES (?, ?, ?) '
+                    'ON CONFLICT (sample, labels) DO UPDATE SET value = value + excluded.value',
+                    [(sample, labels, value) for (sample, labels), value in pending.items()])
+        except sqlite3.Error as error:
+            logger.warning('metrics flush failed: %s', error)
+            with self._lock:
+                for key, value in pending.items():
+                    self._pending[key] += value
+
+    def render(self, extra=()):
+        """Prometheus text format of every worker's samples, plus (name, type, help, value) extras."""
+        self.flush(force=True)
+        samples = defaultdict(list)
+        for sample, labels, value in self._connection().execute('SELECT sample, labels, value FROM samples'):
+            samples[sample].append((json.loads(labels), value))
+
+        lines = []
+        for name, (kind, help_text) in METRICS.items():
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+            suffixes = ('_bucket', '_sum', '_count') if kind == 'histogram' else ('',)
+            for suffix in suffixes:
+                rows = samples.get(name + suffix, [])
+                if suffix == '_bucket':
+                    # Buckets in increasing order of le within each label set
+                    rows.sort(key=lambda row: ([label for label in row[0] if label[0] != 'le'],
+                                               float(dict(row[0])['le'])))
+                else:
+                    rows.sort(key=lambda row: row[0])
+                for labels, value in rows:
+                    lines.append(f'{name}{suffix}{{{_format_labels(labels)}}} {_format_value(value)}')
+        for name, kind, help_text, value in extra:
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}', f'{name} {_format_value(value)}']
+        return '\n'.join(lines) + '\n'
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_started'].pop()
+    if has_request_context() and 'request_metrics' in g:
+        timings = g.request_metrics
+        timings['sql_count'] += 1
+        timings['sql_time'] += elapsed
+        if len(timings['statements']) < MAX_LOGGED_STATEMENTS:
+            timings['statements'].append((elapsed, statement))
+
+
+def install(app, engine, store, slow_request_ms=0):
+    """Record every request of app and the SQL it runs on engine into store."""
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+    atexit.register(store.flush, force=True)
+
+    @app.before_request
+    def start_request_metrics():
+        g.request_metrics = {'started': time.perf_counter(), 'sql_count': 0, 'sql_time': 0.0,
+                             'template_time': 0.0, 'statements': []}
+
+    def template_started(sender, template, context, **extra):
+        if 'request_metrics' in g:
+            g.request_metrics['template_started'] = time.perf_counter()
+
+    def template_finished(sender, template, context, **extra):
+        if 'request_metrics' not in g:
+            return
+        timings = g.request_metrics
+        timings['template_time'] += time.perf_counter() - timings.pop('template_started', time.perf_counter())
+
+    # Strong references, the receivers only live in this closure
+    before_render_template.connect(template_started, app, weak=False)
+    template_rendered.connect(template_finished, app, weak=False)
+
+    @app.after_request
+    def record_request_metrics(response):
+        timings = g.pop('request_metrics', None)
+        if timings is None:
+            return response
+        elapsed = time.perf_counter() - timings['started']
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        labels = [['route', route]]
+        store.inc('http_requests_total', labels + [['method', request.method], ['status', str(response.status_code)]])
+        store.observe('http_request_duration_seconds', labels, elapsed)
+        store.inc('sql_statements_total', labels, timings['sql_count'])
+        store.inc('sql_duration_seconds_total', labels, timings['sql_time'])
+        store.inc('template_render_seconds_total', labels, timings['template_time'])
+        store.flush()
+
+        response.headers['Server-Timing'] = (
+            f'db;dur={timings["sql_time"] * 1000:.1f};desc="{timings["sql_count"]} queries", '
+            f'tpl;dur={timings["template_time"] * 1000:.1f}, total;dur={elapsed * 1000:.1f}')
+
+        if slow_request_ms and elapsed * 1000 >= slow_request_ms:
+            app.logger.warning(
+                'Slow request %s %s (%s): %.0f ms, %d queries in %.0f ms, templates %.0f ms\n%s',
+                request.method, request.full_path.rstrip('?'), response.status_code, elapsed * 1000,
+                timings['sql_count'], timings['sql_time'] * 1000, timings['template_time'] * 1000,
+                '\n'.join(f'  {duration * 1000:8.1f} ms  {" ".join(statement.split())}'
+                          for duration, statement in timings['statements']))
+        return response
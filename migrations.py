@@ -0,0 +1,198 @@
+"""Versioned schema migrations, applied at startup.
+
+Every migration is a (version, name, function) entry in MIGRATIONS. The
+function receives an open connection and the models' metadata, and must be
+idempotent: migration 1 runs create_all() on fresh databases, which already
+builds the current schema, so later steps have to tolerate finding their
+tables and indexes in place. Applied versions are recorded in the
+schema_migrations table; only versions above the recorded maximum run.
+"""
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, inspect, select, text
+from sqlalchemy.schema import AddConstraint
+
+import activity
+import search
+
+migration_metadata = MetaData()
+schema_migrations = Table(
+    'schema_migrations', migration_metadata,
+    Column('version', Integer, primary_key=True),
+    Column('name', String(200), nullable=False),
+    Column('applied_at', DateTime, nullable=False),
+)
+
+
+def _create_indexes(conn, metadata, table_name, *index_names):
+    table = metadata.tables[table_name]
+    for index in table.indexes:
+        if index.name in index_names:
+            index.create(conn, checkfirst=True)
+
+
+def _baseline(conn, metadata):
+    metadata.create_all(conn)
+
+
+def _secondary_indexes(conn, metadata):
+    # One history row per item and day is enforced from now on, keep the
+    # latest row of any duplicates left behind by concurrent saves
+    conn.execute(text(
+        'DELETE FROM update_history WHERE id NOT IN '
+        '(SELECT MAX(id) FROM update_history GROUP BY item_id, date)'
+    ))
+    # ix_update_history_date (date, item_id) was created here too, migration 10 drops it
+    _create_indexes(conn, metadata, 'update_history', 'uq_update_history_item_date')
+    _create_indexes(conn, metadata, 'study_item',
+                    'ix_study_item_last_modified', 'ix_study_item_title',
+                    'ix_study_item_hours_spent', 'ix_study_item_progress',
+                    'ix_study_item_theory_confidence', 'ix_study_item_practical_confidence')
+    _create_indexes(conn, metadata, 'key_date', 'ix_key_date_date')
+
+
+def _full_text_search(conn, metadata):
+    search.install(conn)
+
+
+def _daily_activity(conn, metadata):
+    metadata.tables['daily_activity'].create(conn, checkfirst=True)
+    activity.rebuild(conn, metadata)
+
+
+def _data_version(conn, metadata):
+    table = metadata.tables['data_version']
+    table.create(conn, checkfirst=True)
+    if conn.execute(select(func.count()).select_from(table)).scalar() == 0:
+        conn.execute(table.insert().values(id=1, version=0))
+
+
+def _add_column(conn, column):
+    table = column.table.name
+    if column.name not in {existing['name'] for existing in inspect(conn).get_columns(table)}:
+        conn.execute(text(f'ALTER TABLE {table} ADD COLUMN {column.name} {column.type.compile(dialect=conn.dialect)}'))
+
+
+def _data_version_timestamp(conn, metadata):
+    _add_column(conn, metadata.tables['data_version'].c.updated_at)
+
+
+def _schedule(conn, metadata, name):
+    table = metadata.tables['scheduled_task']
+    if conn.execute(select(func.count()).select_from(table).where(table.c.name == name)).scalar() == 0:
+        conn.execute(table.insert().values(name=name, last_run=datetime(1970, 1, 1)))
+
+
+def _scheduled_tasks(conn, metadata):
+    metadata.tables['scheduled_task'].create(conn, checkfirst=True)
+    _schedule(conn, metadata, 'compact-history')
+
+
+def _backup_schedule(conn, metadata):
+    _schedule(conn, metadata, 'backup')
+
+
+def _rebuild_sqlite_table(conn, table):
+    # SQLite cannot alter a constraint: recreate the table from the model and copy the rows over
+    old_name = f'_{table.name}_old'
+    conn.execute(text(f'ALTER TABLE {table.name} RENAME TO {old_name}'))
+    for index in inspect(conn).get_indexes(old_name):
+        conn.execute(text(f'DROP INDEX {index["name"]}'))
+    table.create(conn)
+    columns = ', '.join(column.name for column in table.columns)
+    conn.execute(text(f'INSERT INTO {table.name} ({columns}) SELECT {columns} FROM {old_name}'))
+    conn.execute(text(f'DROP TABLE {old_name}'))
+
+
+def _cascading_deletes(conn, metadata):
+    items = metadata.tables['study_item']
+    for name in ('update_history', 'daily_activity'):
+        table = metadata.tables[name]
+        # Rows of items removed by bulk deletes, which bypassed the ORM cascade; they would violate the constraint
+        conn.execute(table.delete().where(~select(items.c.id).where(items.c.id == table.c.item_id).exists()))
+        existing = [fk for fk in inspect(conn).get_foreign_keys(name) if fk['referred_table'] == 'study_item']
+        if any((fk['options'].get('ondelete') or '').upper() == 'CASCADE' for fk in existing):
+            continue
+        if conn.dialect.name == 'sqlite':
+            _rebuild_sqlite_table(conn, table)
+            continue
+        for fk in existing:
+            conn.execute(text(f"ALTER TABLE {name} DROP {'FOREIGN KEY' if conn.dialect.name == 'mysql' else 'CONSTRAINT'} {fk['name']}"))
+        conn.execute(AddConstraint(next(iter(table.foreign_key_constraints))))
+    # Each cascade looks the item's activity up by item_id
+    _create_indexes(conn, metadata, 'daily_activity', 'ix_daily_activity_item_id')
+
+
+def _drop_history_date_index(conn, metadata):
+    # The calendars read daily_activity since migration 4, nothing looks history up by date alone any more
+    if any(index['name'] == 'ix_update_history_date' for index in inspect(conn).get_indexes('update_history')):
+        conn.execute(text(f"DROP INDEX ix_update_history_date{' ON update_history' if conn.dialect.name == 'mysql' else ''}"))
+
+
+def _import_job_heartbeat(conn, metadata):
+    _add_column(conn, metadata.tables['import_job'].c.heartbeat_at)
+
+
+def _history_compaction(conn, metadata):
+    metadata.tables['history_compaction'].create(conn, checkfirst=True)
+
+
+MIGRATIONS = [
+    (1, 'baseline tables', _baseline),
+    (2, 'secondary indexes and unique daily history', _secondary_indexes),
+    (3, 'full-text search over titles and notes', _full_text_search),
+    (4, 'materialised daily activity', _daily_activity),
+    (5, 'data version counter for the response cache', _data_version),
+    (6, 'data version timestamp for Last-Modified', _data_version_timestamp),
+    (7, 'schedule of the background maintenance tasks', _scheduled_tasks),
+    (8, 'schedule of the backups', _backup_schedule),
+    (9, 'cascading deletes of item history and activity', _cascading_deletes),
+    (10, 'drop the unused history date index', _drop_history_date_index),
+    (11, 'heartbeat of the import jobs', _import_job_heartbeat),
+    (12, 'last compacted day of the history', _history_compaction),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(conn):
+    schema_migrations.create(conn, checkfirst=True)
+    return conn.execute(select(func.coalesce(func.max(schema_migrations.c.version), 0))).scalar()
+
+
+def applied_version(conn):
+    """Latest applied version, without creating the table; one cheap query for readiness checks."""
+    return conn.execute(select(func.coalesce(func.max(schema_migrations.c.version), 0))).scalar()
+
+
+def upgrade(engine, metadata):
+    """Apply every pending migration, each in its own transaction.
+
+    Returns the list of applied versions.
+    """
+    applied = []
+    with engine.connect() as conn:
+        with conn.begin():
+            version = current_version(conn)
+        if version >= LATEST_VERSION:
+            return applied
+        sqlite = conn.dialect.name == 'sqlite'
+        if sqlite:
+            # Older databases hold history of deleted items, which migration 9 removes; until then the
+            # rebuilds in between must not trip over them. The pragma is a no-op inside a transaction.
+            conn.exec_driver_sql('PRAGMA foreign_keys=OFF')
+            conn.commit()
+        try:
+            for number, name, migrate in MIGRATIONS:
+                if number <= version:
+                    continue
+                with conn.begin():
+                    migrate(conn, metadata)
+                    conn.execute(schema_migrations.insert().values(
+                        version=number, name=name, applied_at=datetime.utcnow()))
+                applied.append(number)
+        finally:
+            if sqlite:
+                conn.exec_driver_sql('PRAGMA foreign_keys=ON')
+                conn.commit()
+    return applied
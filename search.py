@@ -0,0 +1,154 @@
+"""Full-text search over study item titles and notes.
+
+SQLite databases get an FTS5 external-content table kept in sync by triggers,
+PostgreSQL databases a generated tsvector column with a GIN index. Both are
+installed by the migration runner; any other backend (or a SQLite build
+without FTS5) falls back to the LIKE filter on the title.
+"""
+import re
+
+from markupsafe import Markup, escape
+from sqlalchemy import column, func, inspect, literal_column, select, table, text
+
+FTS_TABLE = 'study_item_fts'
+TSVECTOR_COLUMN = 'search_vector'
+
+# Highlight markers, swapped for <mark> tags once the text has been escaped
+MARK_START = '\x02'
+MARK_END = '\x03'
+
+fts_table = table(FTS_TABLE, column('rowid'), column('title'), column('notes'))
+
+SQLITE_SCHEMA = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "title, notes, content='study_item', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON study_item BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, title, notes) VALUES (new.id, new.title, new.notes); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON study_item BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, notes) VALUES ('delete', old.id, old.title, old.notes); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF title, notes ON study_item BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, notes) VALUES ('delete', old.id, old.title, old.notes); "
+    f"INSERT INTO {FTS_TABLE}(rowid, title, notes) VALUES (new.id, new.title, new.notes); END",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+POSTGRESQL_SCHEMA = [
+    f"ALTER TABLE study_item ADD COLUMN IF NOT EXISTS {TSVECTOR_COLUMN} tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(notes, '')), 'B')) STORED",
+    f"CREATE INDEX IF NOT EXISTS ix_study_item_{TSVECTOR_COLUMN} ON study_item USING GIN ({TSVECTOR_COLUMN})",
+]
+
+_backends = {}
+
+
+def install(conn):
+    """Create the search index for the connection's dialect (idempotent)."""
+    dialect = conn.dialect.name
+    if dialect == 'sqlite':
+        try:
+            with conn.begin_nested():
+                for statement in SQLITE_SCHEMA:
+                    conn.execute(text(statement))
+        except Exception:
+            # SQLite built without FTS5, searches keep using LIKE
+            pass
+    elif dialect == 'postgresql':
+        for statement in POSTGRESQL_SCHEMA:
+            conn.execute(text(statement))
+    _backends.clear()
+
+
+def backend(engine):
+    """Return 'fts5', 'tsvector' or 'like' for the engine's database."""
+    if engine not in _backends:
+        inspector = inspect(engine)
+        if engine.dialect.name == 'sqlite' and inspector.has_table(FTS_TABLE):
+            _backends[engine] = 'fts5'
+        elif engine.dialect.name == 'postgresql' and TSVECTOR_COLUMN in {
+                col['name'] for col in inspector.get_columns('study_item')}:
+            _backends[engine] = 'tsvector'
+        else:
+            _backends[engine] = 'like'
+    return _backends[engine]
+
+
+def tokenize(search_query):
+    return re.findall(r'\w+', search_query.lower())
+
+
+def fts5_query(terms):
+    # Every term must match, the last one (still being typed) as a prefix
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def tsquery(terms):
+    return ' & '.join(f'{term}:*' for term in terms)
+
+
+def match_clause(model, search_query, search_backend):
+    """WHERE clause selecting the items matching a search query."""
+    terms = tokenize(search_query)
+    if search_backend == 'fts5' and terms:
+        matching = select(fts_table.c.rowid).where(
+            text(f'{FTS_TABLE} MATCH :fts_query').bindparams(fts_query=fts5_query(terms)))
+        return model.id.in_(matching)
+    if search_backend == 'tsvector' and terms:
+        return literal_column(f'study_item.{TSVECTOR_COLUMN}').op('@@')(
+            func.to_tsquery('simple', tsquery(terms)))
+    return model.title.ilike(f'%{search_query}%')
+
+
+def ranked(session, model, search_query, search_backend, ids=None, limit=20):
+    """Best matches first, with highlighted title and notes snippet.
+
+    Returns a list of dicts {id, rank, title, snippet}; title and snippet are
+    Markup with the matched terms wrapped in <mark>. ids restricts the search
+    to the given items (e.g. the rows of the current page).
+    """
+    terms = tokenize(search_query)
+    if not terms:
+        return []
+    if search_backend == 'fts5':
+        statement = select(
+            fts_table.c.rowid,
+            literal_column(f'bm25({FTS_TABLE}, 10.0, 1.0)').label('rank'),
+            literal_column(f"highlight({FTS_TABLE}, 0, char(2), char(3))").label('title'),
+            literal_column(f"snippet({FTS_TABLE}, 1, char(2), char(3), '…', 16)").label('snippet'),
+        ).where(text(f'{FTS_TABLE} MATCH :fts_query').bindparams(fts_query=fts5_query(terms)))
+        if ids is not None:
+            statement = statement.where(fts_table.c.rowid.in_(ids))
+        statement = statement.order_by(literal_column('rank')).limit(limit)
+    elif search_backend == 'tsvector':
+        query = func.to_tsquery('simple', tsquery(terms))
+        options = f'StartSel={MARK_START}, StopSel={MARK_END}, MaxWords=20, MinWords=8'
+        vector = literal_column(f'study_item.{TSVECTOR_COLUMN}')
+        statement = select(
+            model.id,
+            (-func.ts_rank(vector, query)).label('rank'),
+            func.ts_headline('simple', model.title, query, f'{options}, HighlightAll=true').label('title'),
+            func.ts_headline('simple', func.coalesce(model.notes, ''), query, options).label('snippet'),
+        ).where(vector.op('@@')(query))
+        if ids is not None:
+            statement = statement.where(model.id.in_(ids))
+        statement = statement.order_by(literal_column('rank')).limit(limit)
+    else:
+        statement = select(model.id, literal_column('0').label('rank'), model.title,
+                           literal_column("''").label('snippet'))
+        statement = statement.where(match_clause(model, search_query, search_backend))
+        if ids is not None:
+            statement = statement.where(model.id.in_(ids))
+        statement = statement.order_by(model.title).limit(limit)
+
+    return [{
+        'id': row[0],
+        'rank': row[1],
+        'title': highlight(row[2]),
+        'snippet': highlight(row[3]),
+    } for row in session.execute(statement)]
+
+
+def highlight(value):
+    """Escape a marked-up search result and turn the markers into <mark> tags."""
+    escaped = str(escape(value or ''))
+    return Markup(escaped.replace(MARK_START, '<mark>').replace(MARK_END, '</mark>'))
@@ -0,0 +1,77 @@
+"""Columnar time series of item values, built from update_history.
+
+Every history row stores the values an item had at the start of the day
+(previous_values) and what changed during it (delta), so the state at the
+end of the day is previous_values overlaid with the delta's new values.
+Fields a row does not mention carry forward from the previous row; before
+the first row they fall back to the item's current value.
+
+Series are returned as columns: one list of dates and one list per field,
+which is what the charts consume and keeps the JSON small.
+"""
+from datetime import datetime
+
+from sqlalchemy import select
+
+FIELDS = ('hours_spent', 'progress', 'theory_confidence', 'practical_confidence')
+
+
+def load(conn, metadata, item_ids, fields=FIELDS):
+    """Series of each item in item_ids, with a single query.
+
+    Returns {item_id: {'id', 'title', 'dates', <field>: [...], ...}} for the
+    items that exist. Items without history get one point, today, holding
+    their current values.
+    """
+    items = metadata.tables['study_item']
+    history = metadata.tables['update_history']
+    rows = conn.execute(
+        select(items.c.id, items.c.title, *(items.c[field] for field in fields),
+               history.c.date, history.c.delta, history.c.previous_values)
+        .select_from(items.outerjoin(history, history.c.item_id == items.c.id))
+        .where(items.c.id.in_(item_ids))
+        .order_by(items.c.id, history.c.date)
+    )
+
+    result = {}
+    state = {}
+    for row in rows:
+        item = result.get(row.id)
+        if item is None:
+            item = result[row.id] = {'id': row.id, 'title': row.title, 'dates': []}
+            item.update((field, []) for field in fields)
+            state = {field: row._mapping[field] for field in fields}
+        if row.date is None:
+            item['dates'].append(datetime.utcnow().date().isoformat())
+        else:
+            previous_values = row.previous_values or {}
+            delta = row.delta or {}
+            for field in fields:
+                if field in delta:
+                    state[field] = delta[field].get('new')
+                elif field in previous_values:
+                    state[field] = previous_values[field]
+            item['dates'].append(row.date.isoformat())
+        for field in fields:
+            item[field].append(state[field])
+    return result
+
+
+def align(series, fields=FIELDS):
+    """Put several item series on one shared date axis.
+
+    Values carry forward onto dates an item has no point for, and are None
+    before its first point. Returns {'dates': [...], 'items': [...]}.
+    """
+    dates = sorted({day for item in series for day in item['dates']})
+    aligned = []
+    for item in series:
+        points = dict(zip(item['dates'], zip(*(item[field] for field in fields))))
+        columns = {field: [] for field in fields}
+        last = (None,) * len(fields)
+        for day in dates:
+            last = points.get(day, last)
+            for field, value in zip(fields, last):
+                columns[field].append(value)
+        aligned.append(dict(columns, id=item['id'], title=item['title']))
+    return {'dates': dates, 'items': aligned}
@@ -20,19 +20,13 @@ document.addEventListener('DOMContentLoaded', function() {
     // Ensure localStorage matches the active theme
     try { localStorage.setItem('theme', savedTheme); } catch (e) {}
 
-    // Sorting functionality
+    // Sorting functionality, the dashboard sorts in the browser (see below)
     const sortableHeaders = document.querySelectorAll('th.sortable');
     sortableHeaders.forEach(header => {
+        if (header.closest('#item-table')) return;
         header.addEventListener('click', function() {
-            const sortBy = this.dataset.sort;
             const currentOrder = this.classList.contains('sorted-asc') ? 'asc' : 'desc';
-            const newOrder = currentOrder === 'asc' ? 'desc' : 'asc';
-
-            // Update URL with sort parameters
-            const url = new URL(window.location);
-            url.searchParams.set('sort', sortBy);
-            url.searchParams.set('order', newOrder);
-            window.location.href = url.toString();
+            window.location.href = sortUrl(this.dataset.sort, currentOrder === 'asc' ? 'desc' : 'asc');
         });
     });
 
@@ -46,6 +40,17 @@ document.addEventListener('DOMContentLoaded', function() {
     });
 });
 
+function sortUrl(sortBy, order) {
+    // Update URL with sort parameters
+    const url = new URL(window.location);
+    url.searchParams.set('sort', sortBy);
+    url.searchParams.set('order', order);
+    // Page cursors belong to the previous ordering
+    url.searchParams.delete('after');
+    url.searchParams.delete('before');
+    return url.toString();
+}
+
 function toggleTheme() {
     const currentTheme = document.documentElement.getAttribute('data-theme') || 'light';
     const newTheme = currentTheme === 'light' ? 'dark' : 'light';
@@ -148,4 +153,238 @@ document.addEventListener('DOMContentLoaded', function() {
 
     // Initialize button state
     updateDeleteButton();
-});
\ No newline at end of file
+});
+
+// Dashboard: sort and filter in the browser over the /api/items dataset
+document.addEventListener('DOMContentLoaded', function() {
+    const table = document.getElementById('item-table');
+    if (!table) return;
+    const searchInput = document.getElementById('search-input');
+    const headers = table.querySelectorAll('th.sortable');
+    const tbody = table.querySelector('tbody');
+    const pagination = document.getElementById('pagination');
+    const pageSize = parseInt(table.dataset.pageSize, 10) || 100;
+    const state = {
+        sort: table.dataset.sort,
+        order: table.dataset.order,
+        search: table.dataset.search,  // Full-text search of the server-rendered rows
+        filter: table.dataset.filter || null,  // Title filter typed since, searches all items
+        page: 0
+    };
+    const datasets = {};
+    // Snippets of the server-rendered rows, shown while their search is
+    const snippets = {};
+    tbody.querySelectorAll('tr[data-id]').forEach(row => {
+        const snippet = row.querySelector('.search-snippet');
+        if (snippet) snippets[row.dataset.id] = snippet;
+    });
+    let unsaved = false;
+    let filterTimer = null;
+
+    function loadDataset(search) {
+        if (!datasets[search]) {
+            const url = new URL(table.dataset.datasetUrl, window.location);
+            if (search) url.searchParams.set('search', search);
+            // The browser revalidates with the ETag, unchanged data costs the server one query
+            datasets[search] = fetch(url, {headers: {'Accept': 'application/json'}})
+                .then(response => {
+                    const type = response.headers.get('Content-Type') || '';
+                    // A login redirect answers with HTML
+                    if (!response.ok || !type.includes('json')) throw new Error(`dataset: ${response.status}`);
+                    return response.json();
+                })
+                .then(columns => columns.id.map((id, i) => {
+                    const row = {};
+                    Object.keys(columns).forEach(field => {
+                        if (Array.isArray(columns[field])) row[field] = columns[field][i];
+                    });
+                    return row;
+                }))
+                .catch(error => {
+                    delete datasets[search];
+                    throw error;
+                });
+        }
+        return datasets[search];
+    }
+
+    // SQL order: NULL first, ties broken by id
+    function compare(a, b) {
+        if (a === b) return 0;
+        if (a === null) return -1;
+        if (b === null) return 1;
+        return a < b ? -1 : 1;
+    }
+
+    function visibleRows(rows) {
+        const terms = (state.filter || '').toLowerCase().split(/\s+/).filter(Boolean);
+        const direction = state.order === 'asc' ? 1 : -1;
+        return rows
+            .filter(row => terms.every(term => row.title.toLowerCase().includes(term)))
+            .sort((a, b) => direction * (compare(a[state.sort], b[state.sort]) || compare(a.id, b.id)));
+    }
+
+    // Search and filter are separate parameters, the server would read a filter as a full-text search
+    function setListParams(params) {
+        params.set('sort', state.sort);
+        params.set('order', state.order);
+        params.set('search', state.search);
+        params.set('filter', state.filter === null ? '' : state.filter.trim());
+    }
+
+    // Python's round() as the server prints it, 12.0 rather than 12
+    function formatRounded(value, digits) {
+        const text = String(Math.round(value * 10 ** digits) / 10 ** digits);
+        return text.includes('.') ? text : `${text}.0`;
+    }
+
+    function formatDate(value) {
+        if (!value) return '-';
+        return `${value.slice(0, 10).replace(/-/g, '.')} ${value.slice(11, 16)}`;
+    }
+
+    function element(tag, className, text) {
+        const node = document.createElement(tag);
+        if (className) node.className = className;
+        if (text !== undefined) node.textContent = text;
+        return node;
+    }
+
+    function barCell(barClass, fillClass, percent, label) {
+        const cell = element('td');
+        const bar = element('div', barClass);
+        const fill = element('div', fillClass);
+        fill.style.width = `${percent}%`;
+        bar.appendChild(fill);
+        cell.appendChild(bar);
+        cell.appendChild(document.createTextNode(` ${label}`));
+        return cell;
+    }
+
+    function renderRow(item) {
+        const row = element('tr');
+        row.dataset.id = item.id;
+        const titleCell = element('td');
+        const link = element('a', 'title-link', item.title.length > 50 ? `${item.title.slice(0, 50)}...` : item.title);
+        const url = new URL(table.dataset.editUrl.replace(/0$/, item.id), window.location);
+        setListParams(url.searchParams);
+        link.href = url.pathname + url.search;
+        link.title = item.title;
+        titleCell.appendChild(link);
+        if (state.filter === null && state.search && snippets[item.id]) titleCell.appendChild(snippets[item.id]);
+        row.appendChild(titleCell);
+        row.appendChild(element('td', null, (item.hours_spent || 0).toFixed(1)));
+        row.appendChild(barCell('progress-bar', 'progress-fill', item.progress, `${item.progress}%`));
+        row.appendChild(barCell('confidence-bar', 'confidence-fill theory', item.theory_confidence / 5 * 100,
+                                `${item.theory_confidence}/5`));
+        row.appendChild(barCell('confidence-bar', 'confidence-fill practical', item.practical_confidence / 5 * 100,
+                                `${item.practical_confidence}/5`));
+        row.appendChild(element('td', null, formatDate(item.last_modified)));
+        return row;
+    }
+
+    function pageButton(label, page) {
+        const button = element('button', 'btn btn-secondary', label);
+        button.type = 'button';
+        button.addEventListener('click', () => {
+            state.page = page;
+            render();
+            table.scrollIntoView();
+        });
+        return button;
+    }
+
+    function render() {
+        return loadDataset(state.filter === null ? state.search : '').then(rows => {
+            rows = visibleRows(rows);
+            const pages = Math.max(Math.ceil(rows.length / pageSize), 1);
+            state.page = Math.min(state.page, pages - 1);
+
+            const hours = rows.reduce((sum, row) => sum + (row.hours_spent || 0), 0);
+            const progress = rows.reduce((sum, row) => sum + (row.progress || 0), 0);
+            document.getElementById('total-items').textContent = rows.length;
+            document.getElementById('total-hours').textContent = rows.length ? formatRounded(hours, 2) : 0;
+            document.getElementById('avg-progress').textContent = rows.length ? formatRounded(progress / rows.length, 1) : 0;
+
+            headers.forEach(header => {
+                header.classList.remove('sorted-asc', 'sorted-desc');
+                if (header.dataset.sort === state.sort) header.classList.add(`sorted-${state.order}`);
+            });
+            if (searchInput) {
+                // A server search submitted next keeps this order
+                searchInput.form.elements.sort.value = state.sort;
+                searchInput.form.elements.order.value = state.order;
+            }
+            tbody.replaceChildren(...rows.slice(state.page * pageSize, (state.page + 1) * pageSize).map(renderRow));
+            pagination.replaceChildren();
+            if (state.page > 0) pagination.appendChild(pageButton('← Previous', state.page - 1));
+            if (state.page < pages - 1) pagination.appendChild(pageButton('Next →', state.page + 1));
+
+            document.querySelectorAll('.export-links a').forEach(link => {
+                const url = new URL(link.href);
+                setListParams(url.searchParams);
+                link.href = url.toString();
+            });
+        });
+    }
+
+    function postState() {
+        if (!unsaved) return;
+        unsaved = false;
+        fetch(table.dataset.stateUrl, {
+            method: 'POST',
+            headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify({sort: state.sort, order: state.order, search: state.search,
+                                  filter: state.filter === null ? '' : state.filter.trim()}),
+            keepalive: true
+        }).catch(error => console.log('Saving the dashboard state failed:', error));
+    }
+
+    // The URL keeps sort, search and filter for a reload, the session gets them once the page is left
+    function saveState() {
+        const url = new URL(window.location);
+        url.searchParams.delete('after');
+        url.searchParams.delete('before');
+        setListParams(url.searchParams);
+        history.replaceState(null, '', url);
+        unsaved = true;
+    }
+
+    // keepalive lets the request outlive the page
+    window.addEventListener('pagehide', postState);
+    document.addEventListener('visibilitychange', () => {
+        if (document.visibilityState === 'hidden') postState();
+    });
+
+    headers.forEach(header => {
+        header.addEventListener('click', function() {
+            const sortBy = this.dataset.sort;
+            const order = this.classList.contains('sorted-asc') ? 'desc' : 'asc';
+            const previous = {sort: state.sort, order: state.order, page: state.page};
+            Object.assign(state, {sort: sortBy, order: order, page: 0});
+            render().then(saveState, () => {
+                // Without the dataset the server sorts
+                Object.assign(state, previous);
+                window.location.href = sortUrl(sortBy, order);
+            });
+        });
+    });
+
+    if (searchInput) {
+        // Typing filters titles here, submitting the form searches titles and notes on the server
+        searchInput.addEventListener('input', function() {
+            clearTimeout(filterTimer);
+            filterTimer = setTimeout(() => {
+                if (searchInput.value.trim()) {
+                    state.filter = searchInput.value;
+                } else {
+                    // An emptied box drops the search too, as a cleared search lists every item
+                    state.filter = null;
+                    state.search = '';
+                }
+                state.page = 0;
+                render().then(saveState, error => console.log('Filtering failed:', error));
+            }, 150);
+        });
+    }
+});
@@ -0,0 +1,7 @@
+"""The app modules and benchmarks/ on sys.path for the tests, which reuse the benchmark checks."""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
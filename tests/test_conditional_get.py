@@ -0,0 +1,11 @@
+"""Revalidation of the read routes, see benchmarks/check_conditional_get.py.
+
+    python -m pytest tests
+"""
+import check_conditional_get
+
+
+def test_revalidation_returns_304_without_rendering():
+    # The failing checks and their SQL are printed, pytest shows them with the failure
+    failed = check_conditional_get.check(max_queries=1)
+    assert not failed, f'failed: {", ".join(failed)}'
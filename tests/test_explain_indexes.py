@@ -0,0 +1,12 @@
+"""Query plans of the hot queries, see benchmarks/explain_indexes.py.
+
+    python -m pytest tests
+"""
+import explain_indexes
+
+
+def test_hot_queries_use_their_index():
+    plans = []
+    failed = explain_indexes.check(out=plans.append)
+    assert not failed, 'not using their index:\n' + '\n'.join(
+        line for line in plans if line.startswith('FAIL'))
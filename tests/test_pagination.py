@@ -0,0 +1,41 @@
+"""Keyset pagination of the dashboard over sort values with NULLs, see paginate_items() in app.py.
+
+    python -m pytest tests
+"""
+import pytest
+
+import dataset
+from app import db, paginate_items, StudyItem
+
+
+@pytest.fixture(scope='module')
+def app():
+    with dataset.temp_app('pagination', ITEMS_PER_PAGE=3) as (app, _):
+        with app.app_context():
+            db.session.add_all(StudyItem(title=f'Topic {i}', progress=i % 4) for i in range(1, 15))
+            db.session.flush()
+            # The column default would replace a None given to the model
+            db.session.execute(db.update(StudyItem).where(StudyItem.id % 3 == 0).values(progress=None))
+            db.session.commit()
+        yield app
+
+
+@pytest.mark.parametrize('sort_order', ['asc', 'desc'])
+def test_pages_walk_every_item_once_both_ways(app, sort_order):
+    with app.app_context():
+        expected = [item.id for item in StudyItem.query.order_by(
+            getattr(StudyItem.progress, sort_order)(), getattr(StudyItem.id, sort_order)())]
+        pages, cursor = [], None
+        while True:
+            items, cursor, prev_cursor = paginate_items(StudyItem.query, 'progress', sort_order, after=cursor)
+            pages.append([item.id for item in items])
+            if not cursor:
+                break
+        assert sum(pages, []) == expected
+
+        # Back from the last page, each page must be the one walked forward
+        back = []
+        while prev_cursor:
+            items, _, prev_cursor = paginate_items(StudyItem.query, 'progress', sort_order, before=prev_cursor)
+            back.insert(0, [item.id for item in items])
+        assert back == pages[:-1]
@@ -0,0 +1,18 @@
+"""Query budgets of every route, see benchmarks/check_query_budget.py.
+
+    python -m pytest tests
+"""
+import os
+
+import check_query_budget
+from config import Config
+
+
+def test_routes_stay_within_query_budget():
+    environ, database_url = dict(os.environ), Config.DATABASE_URL
+    # The SQL of routes over budget is printed, pytest shows it with the failure
+    failed = check_query_budget.check(items=500, updates=10)
+    assert not failed, f'over budget: {", ".join(failed)}'
+    # The check configures its app without leaking settings into the next test
+    assert dict(os.environ) == environ
+    assert Config.DATABASE_URL == database_url